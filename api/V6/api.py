@@ -1,21 +1,43 @@
 import os
 import sys
+import json
+import shutil
 import asyncio
+import threading
 import subprocess
+import unicodedata
+from collections import Counter
+from itertools import islice
+from contextlib import asynccontextmanager
+from dataclasses import asdict
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from urllib.parse import urlparse
 
 import httpx
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from supabase import create_client
-
-from schemas import ScrapeRequest, JobResponse, JobResult, ContentResponse, JobStatus
+from supabase import Client, create_client
+
+from schemas import (
+    ScrapeRequest,
+    JobResponse,
+    JobResult,
+    ContentResponse,
+    JobStatus,
+    ScrapeMode,
+    BatchScrapeRequest,
+    BatchResponse,
+    BatchResult,
+)
 from services import job_manager
+from ferramentas.relatorio import ler_paginas, iterar_arquivo
+from ferramentas.lista_urls import ler_lista_urls
+from ferramentas.cache import CacheTTL
 
 # ---------------------------------------------------------------------------
 # Configuração de caminhos e ambiente
@@ -39,8 +61,38 @@ WEBHOOK_URL = os.getenv(
 SUPABASE_URL = os.getenv("SUPABASE_URL") or ""
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY") or ""
 
+# Tempo máximo da ingestão, por arquivo Markdown
+INGEST_TIMEOUT_POR_ARQUIVO = int(os.getenv("INGEST_TIMEOUT_POR_ARQUIVO", "300"))
+# Lista de pipelines (/api/pipelines): cache curto, invalidado a cada ingestão
+PIPELINES_CACHE_TTL = float(os.getenv("PIPELINES_CACHE_TTL", "60"))
+PIPELINES_TABLE = "marketing_rag"
+PIPELINES_RPC = "contar_faqs_por_conta"
+PIPELINES_PAGE_SIZE = 1000
+
+# Chat: cliente HTTP compartilhado (keep-alive/HTTP2) e cache de respostas por ID_Conta
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "30"))
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "600"))  # 0 desativa o cache
+CHAT_CACHE_MAX_ITENS = int(os.getenv("CHAT_CACHE_MAX_ITENS", "5000"))
+# Chat em streaming com o agente RAG local: memória da conversa por sessão
+CHAT_SESSAO_TTL = float(os.getenv("CHAT_SESSAO_TTL", "1800"))
+CHAT_SESSAO_MAX_ITENS = int(os.getenv("CHAT_SESSAO_MAX_ITENS", "1000"))
+
+try:
+    import h2  # noqa: F401  (habilita HTTP/2 no httpx)
+    HTTP2_DISPONIVEL = True
+except ImportError:
+    HTTP2_DISPONIVEL = False
+
 PORT = int(os.getenv("PORT", "3000"))
 
+# Limites do scrape em lote
+MAX_URLS_POR_LOTE = int(os.getenv("MAX_URLS_POR_LOTE", "1000"))
+BATCH_POLL_INTERVAL = 1.0
+
+# Paginação do conteúdo do scrape múltiplo (/job/{id}/content): páginas por resposta
+CONTENT_PAGE_SIZE = int(os.getenv("CONTENT_PAGE_SIZE", "50"))
+CONTENT_PAGE_SIZE_MAX = 500
+
 # Origens permitidas: inclui o Vite dev (5173), o antigo front (8080)
 # e qualquer origem extra definida via FRONT_ORIGIN no .env
 _extra_origin = os.getenv("FRONT_ORIGIN", "")
@@ -58,6 +110,13 @@ if _extra_origin and _extra_origin not in ALLOWED_ORIGINS:
 class ChatRequest(BaseModel):
     message: str
     ID_Conta: str
+    use_cache: bool = True
+
+
+class ChatStreamRequest(BaseModel):
+    message: str
+    ID_Conta: str
+    session_id: Optional[str] = None  # mantém a memória da conversa entre requisições
 
 
 class ChatResponse(BaseModel):
@@ -71,10 +130,33 @@ class IngestResponse(BaseModel):
     data: dict
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Cria os recursos compartilhados na subida da API e os libera no desligamento.
+    """
+    app.state.http_client = httpx.AsyncClient(
+        http2=HTTP2_DISPONIVEL,
+        timeout=WEBHOOK_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=100,
+            max_keepalive_connections=20,
+            keepalive_expiry=60.0,
+        ),
+    )
+    try:
+        yield
+    finally:
+        await app.state.http_client.aclose()
+        # Espera os jobs e fecha os navegadores nas threads donas, fora do event loop
+        await asyncio.to_thread(job_manager.encerrar)
+
+
 app = FastAPI(
     title="API de Raspagem de Dados",
     description="API para realizar raspagem de páginas web de forma assíncrona, ingestão de markdown e chat via webhook.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -106,18 +188,83 @@ def sanitize_id_conta(name: str) -> str:
     return sanitized
 
 
-def executar_ingestao(input_path: str, table: str, clear: bool) -> dict:
+_supabase_client: Optional[Client] = None
+_supabase_lock = threading.Lock()
+cache_pipelines = CacheTTL(ttl=PIPELINES_CACHE_TTL, max_itens=1)
+cache_chat = CacheTTL(ttl=CHAT_CACHE_TTL, max_itens=CHAT_CACHE_MAX_ITENS)
+sessoes_chat = CacheTTL(ttl=CHAT_SESSAO_TTL, max_itens=CHAT_SESSAO_MAX_ITENS)
+_agente_rag_lock = threading.Lock()
+_sessoes_chat_lock = threading.Lock()
+
+
+def obter_supabase() -> Client:
+    """
+    Retorna o cliente Supabase compartilhado pelo processo (criado na primeira chamada).
+    """
+    global _supabase_client
+    if _supabase_client is None:
+        if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+            raise HTTPException(
+                status_code=500,
+                detail="Credenciais Supabase não configuradas",
+            )
+        with _supabase_lock:
+            if _supabase_client is None:
+                _supabase_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+    return _supabase_client
+
+
+def contar_faqs_por_conta(supabase: Client) -> dict:
+    """
+    Conta os FAQs por ID_Conta. Usa a função SQL `contar_faqs_por_conta`
+    (ver sql/contar_faqs_por_conta.sql); se ela ainda não existir no banco,
+    baixa apenas id e ID_Conta, paginados por id (ordem estável entre as páginas),
+    e conta localmente.
+    """
+    try:
+        result = supabase.rpc(PIPELINES_RPC).execute()
+        return {
+            row["ID_Conta"]: int(row["total_faqs"])
+            for row in (result.data or [])
+            if row.get("ID_Conta")
+        }
+    except Exception as e:
+        print(f"[pipelines] RPC {PIPELINES_RPC} indisponível ({e}); contando localmente.")
+
+    contagem = Counter()
+    inicio = 0
+    while True:
+        result = (
+            supabase.table(PIPELINES_TABLE)
+            .select("id, ID_Conta")
+            .order("id")
+            .range(inicio, inicio + PIPELINES_PAGE_SIZE - 1)
+            .execute()
+        )
+        rows = result.data or []
+        contagem.update(row["ID_Conta"] for row in rows if row.get("ID_Conta"))
+        if len(rows) < PIPELINES_PAGE_SIZE:
+            return dict(contagem)
+        inicio += PIPELINES_PAGE_SIZE
+
+
+def executar_ingestao(input_paths, table: str, clear: bool) -> dict:
     """
     Executa o script Agente_FAQ.py e captura o resultado.
+    Aceita um caminho ou uma lista: vários arquivos são ingeridos no mesmo processo
+    (clientes e caches carregados uma única vez).
     """
     if not INGEST_SCRIPT.exists():
         raise RuntimeError(f"Script de ingestão não encontrado: {INGEST_SCRIPT}")
 
+    if isinstance(input_paths, (str, Path)):
+        input_paths = [input_paths]
+
     args = [
         PYTHON_BIN,
         str(INGEST_SCRIPT),
         "--input",
-        str(input_path),
+        *[str(p) for p in input_paths],
         "--table",
         table,
     ]
@@ -135,10 +282,16 @@ def executar_ingestao(input_path: str, table: str, clear: bool) -> dict:
         text=True,
         encoding="utf-8",
         errors="replace",
-        timeout=300,
+        timeout=INGEST_TIMEOUT_POR_ARQUIVO * len(input_paths),
         env=env,
     )
 
+    # Mesmo com falha, parte dos dados pode ter sido gravada: a lista de pipelines é recalculada
+    # e as respostas de chat em cache dessas contas deixam de valer
+    cache_pipelines.limpar()
+    contas = {Path(p).stem.strip() for p in input_paths}
+    cache_chat.invalidar_onde(lambda chave: chave[0] in contas)
+
     if result.returncode != 0:
         raise RuntimeError(
             f"Ingestão falhou com código {result.returncode}. "
@@ -152,6 +305,48 @@ def executar_ingestao(input_path: str, table: str, clear: bool) -> dict:
     }
 
 
+def obter_agente_rag():
+    """
+    Importa o agent_rag (langchain/) sob demanda: LangChain, LangGraph e Gemini
+    só são carregados se o chat em streaming for usado.
+    """
+    with _agente_rag_lock:
+        if str(LANGCHAIN_DIR) not in sys.path:
+            sys.path.append(str(LANGCHAIN_DIR))
+        import agent_rag
+    return agent_rag
+
+
+def obter_memoria_chat(agente, request: ChatStreamRequest):
+    """
+    Memória da conversa da sessão (ID_Conta + session_id).
+    Sem session_id, cada requisição é uma conversa nova. Requisições da mesma
+    sessão recebem o mesmo objeto, e os turnos são serializados por `memoria.turn_lock`.
+    """
+    if not request.session_id:
+        return agente.create_memory()
+    chave = (request.ID_Conta, request.session_id)
+    # Buscar-ou-criar atômico: duas requisições simultâneas não criam memórias diferentes
+    with _sessoes_chat_lock:
+        memoria = sessoes_chat.obter(chave)
+        if memoria is None:
+            memoria = agente.create_memory()
+        # Regrava a cada uso para renovar o TTL da sessão
+        sessoes_chat.definir(chave, memoria)
+    return memoria
+
+
+def normalizar_pergunta(texto: str) -> str:
+    """
+    Normaliza a pergunta para a chave do cache de chat:
+    minúsculas, sem acentos, sem pontuação e com espaços simples.
+    """
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    texto = "".join(ch if ch.isalnum() else " " for ch in texto)
+    return " ".join(texto.split())
+
+
 def extrair_reply(data) -> str:
     """
     Tenta extrair texto útil de resposta JSON do webhook.
@@ -192,6 +387,81 @@ def scrape_multi(request: ScrapeRequest):
     return JobResponse(job_id=job_id, status=JobStatus.PENDING)
 
 
+def iniciar_lote(urls: list, mode: ScrapeMode) -> BatchResponse:
+    """
+    Valida a lista de URLs e agenda o lote no gerenciador de jobs.
+    """
+    if not urls:
+        raise HTTPException(status_code=400, detail="Nenhuma URL informada para o lote.")
+    if len(urls) > MAX_URLS_POR_LOTE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Lote com {len(urls)} URLs excede o limite de {MAX_URLS_POR_LOTE}.",
+        )
+    batch_id = job_manager.start_batch_scrape_job(urls, mode)
+    return BatchResponse(batch_id=batch_id, status=JobStatus.PENDING, total=len(urls))
+
+
+@app.post("/scrape/batch", response_model=BatchResponse, status_code=202)
+def scrape_batch(request: BatchScrapeRequest):
+    """
+    Inicia a raspagem de um lote de URLs (cada URL vira um job).
+    """
+    urls = ler_lista_urls("\n".join(request.urls))
+    return iniciar_lote(urls, request.mode)
+
+
+@app.post("/scrape/batch/upload", response_model=BatchResponse, status_code=202)
+async def scrape_batch_upload(
+    urlsFile: UploadFile = File(...),
+    mode: ScrapeMode = Form(ScrapeMode.MULTI),
+):
+    """
+    Inicia a raspagem de um lote a partir de um arquivo texto (uma URL por linha).
+    """
+    content = await urlsFile.read()
+    urls = ler_lista_urls(content.decode("utf-8", errors="replace"))
+    return iniciar_lote(urls, mode)
+
+
+@app.get("/scrape/batch/{batch_id}", response_model=BatchResult)
+def get_batch_status(batch_id: str):
+    """
+    Retorna o progresso agregado de um lote.
+    """
+    batch = job_manager.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Lote não encontrado")
+    return batch
+
+
+@app.get("/scrape/batch/{batch_id}/results")
+async def get_batch_results(batch_id: str):
+    """
+    Retorna os resultados do lote em streaming (NDJSON), um job por linha,
+    na ordem em que forem finalizados. A conexão fecha quando o lote termina.
+    """
+    batch = job_manager.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Lote não encontrado")
+
+    async def iterar_resultados():
+        pendentes = list(batch.job_ids)
+        while pendentes:
+            restantes = []
+            for job_id in pendentes:
+                job = job_manager.get_job(job_id)
+                if job.status in (JobStatus.COMPLETED, JobStatus.FAILED):
+                    yield job.model_dump_json() + "\n"
+                else:
+                    restantes.append(job_id)
+            pendentes = restantes
+            if pendentes:
+                await asyncio.sleep(BATCH_POLL_INTERVAL)
+
+    return StreamingResponse(iterar_resultados(), media_type="application/x-ndjson")
+
+
 @app.get("/job/{job_id}", response_model=JobResult)
 def get_job_status(job_id: str):
     """
@@ -204,9 +474,15 @@ def get_job_status(job_id: str):
 
 
 @app.get("/job/{job_id}/content", response_model=ContentResponse)
-def get_job_content(job_id: str):
+def get_job_content(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(CONTENT_PAGE_SIZE, ge=1, le=CONTENT_PAGE_SIZE_MAX),
+):
     """
     Retorna o conteúdo extraído pelo job (se concluído).
+    No scrape múltiplo, devolve só as páginas [offset, offset + limit), lidas do .ndjson
+    sob demanda; para o site inteiro de uma vez use /job/{job_id}/pages (streaming).
     """
     job = job_manager.get_job(job_id)
     if not job:
@@ -233,14 +509,66 @@ def get_job_content(job_id: str):
                 "metadata": job.result.get("metadata"),
             },
         )
-    # Para scrape múltiplo, retornamos a lista de conteúdos
-    if "content" in job.result:
-        return ContentResponse(job_id=job_id, content=job.result["content"])
+    # Para scrape múltiplo, só a página pedida é lida do disco (o arquivo é percorrido
+    # linha a linha e a leitura para em offset + limit)
+    if "pages_path" in job.result:
+        paginas = list(islice(ler_paginas(job.result["pages_path"]), offset, offset + limit))
+        return ContentResponse(
+            job_id=job_id,
+            content=paginas,
+            offset=offset,
+            limit=limit,
+            total=job.result.get("total_pages"),
+        )
 
     # Fallback
     return ContentResponse(job_id=job_id, content=job.result)
 
 
+def obter_job_multi_concluido(job_id: str):
+    """
+    Retorna o job de scrape múltiplo concluído ou levanta o HTTPException adequado.
+    """
+    job = job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(
+            status_code=400,
+            detail="Job ainda não foi concluído ou falhou.",
+        )
+    if not job.result or "report_path" not in job.result:
+        raise HTTPException(
+            status_code=400,
+            detail="Job não possui relatório consolidado (apenas scrape múltiplo).",
+        )
+    return job
+
+
+@app.get("/job/{job_id}/report")
+def get_job_report(job_id: str):
+    """
+    Retorna o relatório consolidado (markdown) do scrape múltiplo em streaming.
+    """
+    job = obter_job_multi_concluido(job_id)
+    return StreamingResponse(
+        iterar_arquivo(job.result["report_path"]),
+        media_type="text/markdown; charset=utf-8",
+    )
+
+
+@app.get("/job/{job_id}/pages")
+def get_job_pages(job_id: str):
+    """
+    Retorna as páginas do scrape múltiplo em streaming, um registro JSON por linha (NDJSON).
+    """
+    job = obter_job_multi_concluido(job_id)
+    return StreamingResponse(
+        iterar_arquivo(job.result["pages_path"]),
+        media_type="application/x-ndjson",
+    )
+
+
 # ---------------------------------------------------------------------------
 # Health check
 # ---------------------------------------------------------------------------
@@ -259,16 +587,22 @@ def health():
 # ---------------------------------------------------------------------------
 
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     try:
+        chave_cache = (request.ID_Conta, normalizar_pergunta(request.message))
+        if request.use_cache:
+            cached = cache_chat.obter(chave_cache)
+            if cached is not None:
+                return ChatResponse(success=True, data={**cached, "cached": True})
+
         payload = {"message": request.message, "ID_Conta": request.ID_Conta}
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                WEBHOOK_URL,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-            )
+        client: httpx.AsyncClient = http_request.app.state.http_client
+        response = await client.post(
+            WEBHOOK_URL,
+            json=payload,
+            headers={"Content-Type": "application/json"},
+        )
 
         if response.status_code != 200:
             raise HTTPException(
@@ -284,10 +618,11 @@ async def chat_endpoint(request: ChatRequest):
             raw_data = response.text
             reply = raw_data
 
-        return ChatResponse(
-            success=True,
-            data={"reply": reply, "raw": raw_data, "ID_Conta": request.ID_Conta},
-        )
+        data = {"reply": reply, "raw": raw_data, "ID_Conta": request.ID_Conta}
+        if request.use_cache and reply.strip():
+            cache_chat.definir(chave_cache, data)
+
+        return ChatResponse(success=True, data={**data, "cached": False})
     except httpx.TimeoutException:
         raise HTTPException(
             status_code=504,
@@ -299,6 +634,43 @@ async def chat_endpoint(request: ChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/chat/stream")
+def chat_stream_endpoint(request: ChatStreamRequest):
+    """
+    Chat direto com o agente RAG (langchain/agent_rag.py), sem o webhook N8N.
+    Resposta em streaming (NDJSON), um evento por linha:
+    token, tool_call, tool_result e, ao final, done (ou error).
+    """
+    try:
+        agent_rag = obter_agente_rag()
+        agente = agent_rag.get_account_agent(request.ID_Conta)
+        memoria = obter_memoria_chat(agente, request)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Agente RAG indisponível: {e}")
+
+    # Gerador síncrono: o StreamingResponse o consome em uma thread, sem bloquear o event loop
+    def iterar_eventos():
+        try:
+            for evento in agente.chat_stream(request.message, memoria):
+                if evento["type"] == "done":
+                    mensagem = evento["message"]
+                    evento = {
+                        "type": "done",
+                        "reply": agent_rag.message_text(mensagem) if mensagem else "",
+                        "ID_Conta": request.ID_Conta,
+                        "session_id": request.session_id,
+                        "ttft_ms": evento["ttft_ms"],
+                        "total_ms": evento["total_ms"],
+                        # Contabilidade deste turno (não a do último turno da sessão, que pode ser de outra requisição)
+                        "usage": asdict(evento["stats"]),
+                    }
+                yield json.dumps(evento, ensure_ascii=False, default=str) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(iterar_eventos(), media_type="application/x-ndjson")
+
+
 # ---------------------------------------------------------------------------
 # Pipeline completo: scrape URL → salva markdown → ingere no Supabase
 # ---------------------------------------------------------------------------
@@ -349,9 +721,9 @@ async def run_pipeline(request: PipelineRequest):
         id_conta = domain or "site"
         target_path = UPLOAD_DIR / f"{id_conta}.md"
 
-        if "full_report" in result:
-            # Scrape multi já traz o relatório consolidado
-            target_path.write_text(result["full_report"], encoding="utf-8")
+        if "report_path" in result:
+            # Scrape multi já gravou o relatório consolidado em disco
+            shutil.copyfile(result["report_path"], target_path)
         elif "markdown" in result:
             # Scrape único
             target_path.write_text(result["markdown"], encoding="utf-8")
@@ -362,7 +734,7 @@ async def run_pipeline(request: PipelineRequest):
             )
 
         # 4. Executa a ingestão
-        ingest_result = executar_ingestao(str(target_path), request.table, request.clear)
+        ingest_result = await asyncio.to_thread(executar_ingestao, str(target_path), request.table, request.clear)
 
         return IngestResponse(
             success=True,
@@ -401,7 +773,7 @@ async def ingest_markdown(
         target_path.write_bytes(content)
 
         clear_flag = str(clear or "").lower() == "true"
-        ingest_result = executar_ingestao(str(target_path), table, clear_flag)
+        ingest_result = await asyncio.to_thread(executar_ingestao, str(target_path), table, clear_flag)
 
         return IngestResponse(
             success=True,
@@ -420,6 +792,54 @@ async def ingest_markdown(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/ingest-markdown/batch", response_model=IngestResponse)
+async def ingest_markdown_batch(
+    markdownFiles: List[UploadFile] = File(...),
+    clear: Optional[str] = Form("false"),
+    table: str = Form("marketing_rag"),
+):
+    """
+    Ingere vários arquivos Markdown em uma única execução do Agente_FAQ.py
+    (cada arquivo continua gerando o seu próprio ID_Conta).
+    """
+    try:
+        # O ID_Conta vem do nome do arquivo: dois uploads com o mesmo nome sanitizado
+        # sobrescreveriam um ao outro (e a sincronização apagaria os FAQs do primeiro)
+        ids_conta = [sanitize_id_conta(f.filename or "arquivo.md") for f in markdownFiles]
+        repetidos = sorted(id_conta for id_conta, total in Counter(ids_conta).items() if total > 1)
+        if repetidos:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Arquivos com o mesmo ID_Conta no lote: {', '.join(repetidos)}",
+            )
+
+        target_paths = []
+        for id_conta, markdownFile in zip(ids_conta, markdownFiles):
+            target_path = UPLOAD_DIR / f"{id_conta}.md"
+            target_path.write_bytes(await markdownFile.read())
+            target_paths.append(target_path)
+
+        clear_flag = str(clear or "").lower() == "true"
+        # A ingestão (subprocess, até INGEST_TIMEOUT_POR_ARQUIVO por arquivo) roda fora do event loop
+        ingest_result = await asyncio.to_thread(executar_ingestao, target_paths, table, clear_flag)
+
+        return IngestResponse(
+            success=True,
+            message=f"Ingestão de {len(target_paths)} arquivos concluída com sucesso",
+            data={
+                "ID_Contas": [p.stem for p in target_paths],
+                "filePaths": [str(p) for p in target_paths],
+                "table": table,
+                "clear": clear_flag,
+                "output": ingest_result,
+            },
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ---------------------------------------------------------------------------
 # Pipelines (Supabase / RAG)
 # ---------------------------------------------------------------------------
@@ -430,46 +850,27 @@ def list_pipelines():
     Lista todos os pipelines já executados (ID_Conta únicos do Supabase).
     """
     try:
-        if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
-            raise HTTPException(
-                status_code=500,
-                detail="Credenciais Supabase não configuradas",
-            )
+        pipelines_list = cache_pipelines.obter(PIPELINES_TABLE)
+        if pipelines_list is None:
+            contagem = contar_faqs_por_conta(obter_supabase())
 
-        supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-        result = (
-            supabase.table("marketing_rag")
-            .select("ID_Conta, metadata")
-            .execute()
-        )
-
-        if not result.data:
-            return {"success": True, "data": []}
-
-        pipelines_map = {}
-        for row in result.data:
-            id_conta = row.get("ID_Conta")
-            if id_conta and id_conta not in pipelines_map:
+            pipelines_list = []
+            for id_conta, total_faqs in contagem.items():
                 domain_parts = (
                     id_conta.split("_")[0] if "_" in id_conta else id_conta
                 )
                 url_inferido = domain_parts.replace("-", ".")
-                pipelines_map[id_conta] = {
+                pipelines_list.append({
                     "ID_Conta": id_conta,
                     "url_inferido": (
                         f"https://{url_inferido}"
                         if not url_inferido.startswith("http")
                         else url_inferido
                     ),
-                    "total_faqs": 0,
-                }
-
-        for row in result.data:
-            id_conta = row.get("ID_Conta")
-            if id_conta in pipelines_map:
-                pipelines_map[id_conta]["total_faqs"] += 1
+                    "total_faqs": total_faqs,
+                })
+            cache_pipelines.definir(PIPELINES_TABLE, pipelines_list)
 
-        pipelines_list = list(pipelines_map.values())
         return {"success": True, "data": pipelines_list}
     except HTTPException:
         raise
@@ -0,0 +1,202 @@
+"""
+Gera o corpus de páginas servido pelo benchmark do scraper (scraper_bench.py).
+
+Cada cenário imita um tipo de site que a API encontra:
+- estatico:  site institucional com menu no <header>, páginas internas, CNPJ,
+             formas de pagamento e redes sociais no rodapé
+- spa:       HTML quase vazio + bundle JS externo (Requests falha, cai no Playwright)
+- aninhado:  page builders com <div> muito aninhadas (uma delas acima do limite
+             de recursão do markdownify)
+- base64:    páginas com imagens embutidas em data URI (pesa no markdownify e no limpar_markdown)
+- sitemap:   mapa do site em HTML com milhares de links no rodapé + sitemap.xml
+
+O conteúdo é determinístico (semente fixa). Um corpus gravado de sites reais pode
+ser usado no lugar, desde que siga o mesmo formato: uma pasta por cenário e o
+arquivo cenarios.json com o caminho de entrada de cada um.
+"""
+
+import json
+import base64
+import random
+from pathlib import Path
+
+
+MANIFESTO = "cenarios.json"
+
+PALAVRAS = (
+    "monitoramento plantas sensor umidade irrigação automática aplicativo plataforma "
+    "relatório alerta solo temperatura luminosidade estufa jardim vaso cultivo colheita "
+    "assinatura plano suporte instalação configuração dispositivo bateria conexão wifi"
+).split()
+
+CNPJ_VALIDO = "11.222.333/0001-81"
+
+
+# Função para gerar um parágrafo pseudo-aleatório (determinístico pela semente do gerador)
+def _paragrafo(rng, palavras=60):
+    texto = " ".join(rng.choice(PALAVRAS) for _ in range(palavras))
+    return texto[0].upper() + texto[1:] + "."
+
+
+# Função para montar o corpo de uma página de conteúdo típica
+def _conteudo(rng, secoes=6):
+    partes = []
+    for i in range(secoes):
+        partes.append(f"<h2>Seção {i + 1}</h2>")
+        partes.extend(f"<p>{_paragrafo(rng)}</p>" for _ in range(3))
+        partes.append("<ul>" + "".join(f"<li>{_paragrafo(rng, 8)}</li>" for _ in range(5)) + "</ul>")
+    partes.append(
+        "<table><tr><th>Plano</th><th>Preço</th></tr>"
+        + "".join(f"<tr><td>Plano {i}</td><td>R$ {19 + i * 10},90</td></tr>" for i in range(5))
+        + "</table>"
+    )
+    return "\n".join(partes)
+
+
+def _rodape():
+    return (
+        "<footer>"
+        f"<p>Plantie Tecnologia LTDA - CNPJ {CNPJ_VALIDO}</p>"
+        "<p>Aceitamos pix, boleto, cartão de crédito e cartão de débito.</p>"
+        '<img alt="Visa" src="/img/visa.png"><img alt="Mastercard" src="/img/master.png">'
+        '<a href="https://instagram.com/plantie">Instagram</a> '
+        '<a href="https://facebook.com/plantie">Facebook</a> '
+        '<a href="https://linkedin.com/company/plantie">LinkedIn</a>'
+        "</footer>"
+    )
+
+
+def _pagina(titulo, corpo, cabecalho="", rodape=""):
+    return (
+        "<!DOCTYPE html><html lang=\"pt-BR\"><head><meta charset=\"utf-8\">"
+        f"<title>{titulo}</title>"
+        f"<meta name=\"description\" content=\"{titulo} - Plantie\">"
+        f"<meta property=\"og:title\" content=\"{titulo}\">"
+        "</head><body>"
+        f"{cabecalho}<main>{corpo}</main>{rodape}"
+        "</body></html>"
+    )
+
+
+def _menu(links):
+    itens = "".join(f'<li><a href="{href}">{texto}</a></li>' for texto, href in links)
+    return f"<header><nav><ul>{itens}</ul></nav></header>"
+
+
+def _escrever(caminho, conteudo):
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.write_text(conteudo, encoding="utf-8")
+
+
+# Função para gerar o cenário de site estático (menu com páginas internas)
+def _gerar_estatico(raiz, rng, escala):
+    paginas = [f"pagina-{i}.html" for i in range(20)]
+    menu = _menu([(f"Página {i}", nome) for i, nome in enumerate(paginas)] + [("Topo", "#topo")])
+    _escrever(raiz / "estatico" / "index.html",
+              _pagina("Plantie", _conteudo(rng, 8 * escala), menu, _rodape()))
+    for i, nome in enumerate(paginas):
+        _escrever(raiz / "estatico" / nome,
+                  _pagina(f"Página {i}", _conteudo(rng, 4 * escala), menu, _rodape()))
+    return "/estatico/"
+
+
+# Função para gerar o cenário SPA (conteúdo só aparece depois do JavaScript)
+def _gerar_spa(raiz, rng, escala):
+    blocos = [_paragrafo(rng) for _ in range(40 * escala)]
+    bundle = (
+        "const blocos = " + json.dumps(blocos, ensure_ascii=False) + ";\n"
+        "const root = document.getElementById('root');\n"
+        "root.innerHTML = '<main><h1>Plantie App</h1>' + "
+        "blocos.map(b => '<p>' + b + '</p>').join('') + '</main>';\n"
+        # Código morto para dar ao bundle um tamanho realista
+        + "\n".join(f"function m{i}(x){{return x*{i}+{rng.randint(0, 999)};}}" for i in range(2000 * escala))
+    )
+    _escrever(raiz / "spa" / "app.js", bundle)
+    _escrever(raiz / "spa" / "index.html",
+              "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Plantie App</title>"
+              "<script src=\"app.js\" defer></script></head>"
+              "<body><div id=\"root\"></div><noscript>Ative o JavaScript.</noscript></body></html>")
+    return "/spa/"
+
+
+# Função para gerar o cenário de HTML muito aninhado
+def _gerar_aninhado(raiz, rng, escala):
+    def aninhar(profundidade):
+        abre = "".join(f'<div class="wrap-{i % 7}">' for i in range(profundidade))
+        fecha = "</div>" * profundidade
+        return abre + _conteudo(rng, 2 * escala) + fecha
+
+    menu = _menu([("Extremo", "extremo.html"), ("Médio", "medio.html")])
+    _escrever(raiz / "aninhado" / "index.html", _pagina("Aninhado", aninhar(60), menu, _rodape()))
+    _escrever(raiz / "aninhado" / "medio.html", _pagina("Médio", aninhar(200), menu, _rodape()))
+    # Acima do limite de recursão do markdownify (exercita o caminho de RecursionError)
+    _escrever(raiz / "aninhado" / "extremo.html", _pagina("Extremo", aninhar(1500), menu, _rodape()))
+    return "/aninhado/"
+
+
+# Função para gerar o cenário com imagens embutidas em base64
+def _gerar_base64(raiz, rng, escala):
+    def imagem(tamanho):
+        dados = base64.b64encode(rng.randbytes(tamanho)).decode("ascii")
+        return f'<p><img alt="Foto do produto" src="data:image/png;base64,{dados}"></p>'
+
+    menu = _menu([("Galeria", "galeria.html")])
+    corpo = _conteudo(rng, 3) + "".join(imagem(20_000) for _ in range(10 * escala))
+    _escrever(raiz / "base64" / "index.html", _pagina("Produtos", corpo, menu, _rodape()))
+    galeria = "".join(imagem(150_000) for _ in range(8 * escala)) + _conteudo(rng, 1)
+    _escrever(raiz / "base64" / "galeria.html", _pagina("Galeria", galeria, menu, _rodape()))
+    return "/base64/"
+
+
+# Função para gerar o cenário de mapa do site enorme (sem <header>: links vêm do rodapé)
+def _gerar_sitemap(raiz, rng, escala):
+    total = 20_000 * escala
+    # Âncoras e redes sociais primeiro: o scrape_completo precisa percorrer muitos links até achar 20 válidos
+    links = [f'<a href="#secao-{i}">Seção {i}</a>' for i in range(total // 2)]
+    links += [f'<a href="https://www.youtube.com/c/plantie{i}">Vídeo {i}</a>' for i in range(total // 4)]
+    links += [f'<a href="produto-{i}.html">Produto {i}</a>' for i in range(total // 4)]
+    rodape = "<footer>" + " ".join(links) + "</footer>"
+    _escrever(raiz / "sitemap" / "index.html", _pagina("Mapa do site", _conteudo(rng, 2), "", rodape))
+    for i in range(20):
+        _escrever(raiz / "sitemap" / f"produto-{i}.html", _pagina(f"Produto {i}", _conteudo(rng, 2), "", _rodape()))
+    urls = "".join(f"<url><loc>https://plantie.example/produto-{i}.html</loc></url>" for i in range(total * 5))
+    _escrever(raiz / "sitemap" / "sitemap.xml",
+              f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>')
+    return "/sitemap/"
+
+
+GERADORES = {
+    "estatico": _gerar_estatico,
+    "spa": _gerar_spa,
+    "aninhado": _gerar_aninhado,
+    "base64": _gerar_base64,
+    "sitemap": _gerar_sitemap,
+}
+
+
+def gerar_corpus(diretorio, escala=1, semente=42):
+    """
+    Gera todos os cenários em `diretorio` e grava o manifesto (cenário -> caminho de entrada).
+    `escala` multiplica o tamanho das páginas.
+    """
+    raiz = Path(diretorio)
+    rng = random.Random(semente)
+    cenarios = {nome: gerar(raiz, rng, escala) for nome, gerar in GERADORES.items()}
+    (raiz / MANIFESTO).write_text(json.dumps(cenarios, indent=2), encoding="utf-8")
+    return cenarios
+
+
+def ler_manifesto(diretorio):
+    """Lê o manifesto de um corpus (gerado ou gravado de sites reais)."""
+    return json.loads((Path(diretorio) / MANIFESTO).read_text(encoding="utf-8"))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gera o corpus do benchmark do scraper")
+    parser.add_argument("diretorio")
+    parser.add_argument("--escala", type=int, default=1)
+    args = parser.parse_args()
+    for nome, entrada in gerar_corpus(args.diretorio, args.escala).items():
+        print(f"{nome}: {entrada}")
@@ -0,0 +1,327 @@
+"""
+Benchmark offline do scraper: serve um corpus de páginas (ver corpus.py) em um
+servidor HTTP local e mede cada etapa sem depender da rede.
+
+Etapas:
+- scrape_unico:       processar_scrape_unico(url) na página de entrada de cada cenário
+- scrape_completo:    processar_scrape_completo(url) (página principal + links)
+- html_para_markdown: conversão de todos os HTML do corpus
+- limpar_markdown:    limpeza do markdown convertido
+- extratores:         extrair_informacoes_estruturadas(html)
+
+Cada etapa roda em um processo separado, então o tempo de CPU e o pico de RSS
+são só dela. A saída é JSON (pages/s, p50/p95 por item, CPU, pico de RSS, também
+por cenário) e pode ser comparada com uma execução anterior (--baseline).
+
+Uso (da pasta api/V6/):
+    python benchmarks/scraper_bench.py --saida atual.json
+    python benchmarks/scraper_bench.py --baseline atual.json --saida novo.json
+    python benchmarks/scraper_bench.py --corpus gravado/ --etapas html_para_markdown limpar_markdown
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import subprocess
+from pathlib import Path
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+from corpus import gerar_corpus, ler_manifesto  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+ETAPAS = ["scrape_unico", "scrape_completo", "html_para_markdown", "limpar_markdown", "extratores"]
+ETAPAS_HTTP = {"scrape_unico", "scrape_completo"}
+# Métricas comparadas com o baseline: (nome, True se maior é melhor)
+METRICAS_COMPARADAS = [("paginas_por_s", True), ("p95_ms", False), ("cpu_s", False), ("pico_rss_mb", False)]
+
+
+# ---------------------------------------------------------------------------
+# Servidor local do corpus
+# ---------------------------------------------------------------------------
+
+class _HandlerSilencioso(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def servir_corpus(diretorio):
+    """Serve o corpus (roda em um processo próprio) e anuncia a porta escolhida no stdout."""
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), partial(_HandlerSilencioso, directory=str(diretorio)))
+    print(servidor.server_address[1], flush=True)
+    servidor.serve_forever()
+
+
+@contextlib.contextmanager
+def servidor_local(diretorio):
+    """Sobe o servidor em outro processo (não conta no CPU/RSS das etapas) e devolve a URL base."""
+    processo = subprocess.Popen(
+        [sys.executable, __file__, "--_servidor", "--corpus", str(diretorio)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        porta = int(processo.stdout.readline())
+        yield f"http://127.0.0.1:{porta}"
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+# ---------------------------------------------------------------------------
+# Medição (processo da etapa)
+# ---------------------------------------------------------------------------
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    base = int(posicao)
+    proximo = min(base + 1, len(ordenados) - 1)
+    return ordenados[base] + (ordenados[proximo] - ordenados[base]) * (posicao - base)
+
+
+def pico_rss_mb():
+    """Pico de memória residente do processo atual (MB)."""
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa em KB, macOS em bytes
+        return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def resumir(latencias_ms, paginas, erros, tempo_s):
+    return {
+        "itens": len(latencias_ms),
+        "paginas": paginas,
+        "erros": erros,
+        "tempo_s": round(tempo_s, 4),
+        "paginas_por_s": round(paginas / tempo_s, 3) if tempo_s else 0.0,
+        "p50_ms": round(percentil(latencias_ms, 50), 3),
+        "p95_ms": round(percentil(latencias_ms, 95), 3),
+    }
+
+
+def arquivos_html(corpus):
+    """Todos os HTML do corpus, agrupados pelo cenário (primeira pasta do caminho)."""
+    return [
+        (caminho.relative_to(corpus).parts[0], caminho.read_text(encoding="utf-8", errors="replace"))
+        for caminho in sorted(Path(corpus).rglob("*.html"))
+    ]
+
+
+def preparar_etapa(etapa, corpus, base_url, sem_playwright):
+    """
+    Devolve a lista de itens (cenário, entrada) e a função medida, que retorna
+    (páginas processadas, houve erro). A preparação não entra na medição.
+    """
+    if etapa in ETAPAS_HTTP:
+        from modos import scrape_unico, scrape_completo
+        if sem_playwright:
+            # Mede só o caminho do Requests (SPA conta como erro)
+            for modulo in (scrape_unico, scrape_completo):
+                modulo.iniciar_playwright = lambda url: (False, None)
+        itens = [(cenario, base_url + entrada) for cenario, entrada in ler_manifesto(corpus).items()]
+        if etapa == "scrape_unico":
+            def executar(url):
+                status = scrape_unico.processar_scrape_unico(url)[0]
+                return (1, False) if status else (0, True)
+        else:
+            def executar(url):
+                status, paginas = scrape_completo.processar_scrape_completo(url)
+                if not status:
+                    return 0, True
+                return sum(1 for p in paginas if p["status"]), any(not p["status"] for p in paginas)
+        return itens, executar
+
+    from ferramentas.converter import html_para_markdown
+    itens = arquivos_html(corpus)
+    if etapa == "html_para_markdown":
+        def executar(html):
+            markdown = html_para_markdown(html)
+            return 1, markdown.startswith("[ERRO")
+        return itens, executar
+    if etapa == "limpar_markdown":
+        from ferramentas.limpeza import limpar_markdown
+        # A conversão prévia entra no pico de RSS desta etapa, mas não no tempo medido
+        itens = [(cenario, html_para_markdown(html)) for cenario, html in itens]
+        return itens, lambda markdown: (1, not limpar_markdown(markdown))
+    if etapa == "extratores":
+        from extratores_informacoes.main import extrair_informacoes_estruturadas
+        return itens, lambda html: (1, not extrair_informacoes_estruturadas(html))
+    raise ValueError(f"Etapa desconhecida: {etapa}")
+
+
+def medir_etapa(etapa, corpus, base_url, repeticoes, sem_playwright):
+    itens, executar = preparar_etapa(etapa, corpus, base_url, sem_playwright)
+    total = {"lat": [], "paginas": 0, "erros": 0, "tempo": 0.0}
+    por_cenario = {}
+
+    cpu_inicio = time.process_time()
+    # Os prints do scraper não entram na saída (nem no tempo de terminal)
+    with contextlib.redirect_stdout(io.StringIO()) as saida:
+        for _ in range(repeticoes):
+            for cenario, entrada in itens:
+                inicio = time.perf_counter()
+                paginas, erro = executar(entrada)
+                decorrido = time.perf_counter() - inicio
+                for acumulado in (total, por_cenario.setdefault(cenario, {"lat": [], "paginas": 0, "erros": 0, "tempo": 0.0})):
+                    acumulado["lat"].append(decorrido * 1000)
+                    acumulado["paginas"] += paginas
+                    acumulado["erros"] += int(erro)
+                    acumulado["tempo"] += decorrido
+            saida.seek(0)
+            saida.truncate()
+    cpu_s = time.process_time() - cpu_inicio
+
+    resultado = resumir(total["lat"], total["paginas"], total["erros"], total["tempo"])
+    resultado["cpu_s"] = round(cpu_s, 4)
+    rss = pico_rss_mb()
+    resultado["pico_rss_mb"] = round(rss, 1) if rss is not None else None
+    resultado["por_cenario"] = {
+        cenario: resumir(dados["lat"], dados["paginas"], dados["erros"], dados["tempo"])
+        for cenario, dados in por_cenario.items()
+    }
+    return resultado
+
+
+def rodar_etapa_isolada(etapa, corpus, base_url, repeticoes, sem_playwright):
+    """Executa uma etapa em um processo novo e lê o JSON que ele imprime."""
+    comando = [
+        sys.executable, __file__, "--_etapa", etapa,
+        "--corpus", str(corpus), "--_base-url", base_url or "",
+        "--repeticoes", str(repeticoes),
+    ]
+    if sem_playwright:
+        comando.append("--sem-playwright")
+    processo = subprocess.run(comando, capture_output=True, text=True, encoding="utf-8", cwd=str(BENCH_DIR.parent))
+    if processo.returncode != 0:
+        raise RuntimeError(f"Etapa {etapa} falhou:\n{processo.stderr}")
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+# ---------------------------------------------------------------------------
+# Comparação com baseline
+# ---------------------------------------------------------------------------
+
+def comparar(atual, baseline, tolerancia):
+    """Lista as regressões (piora maior que `tolerancia`) por etapa e métrica."""
+    regressoes = []
+    for etapa, metricas in atual["etapas"].items():
+        anterior = baseline.get("etapas", {}).get(etapa)
+        if not anterior:
+            continue
+        for nome, maior_melhor in METRICAS_COMPARADAS:
+            novo, velho = metricas.get(nome), anterior.get(nome)
+            if not novo or not velho:
+                continue
+            variacao = (novo - velho) / velho
+            piora = -variacao if maior_melhor else variacao
+            if piora > tolerancia:
+                regressoes.append({
+                    "etapa": etapa,
+                    "metrica": nome,
+                    "baseline": velho,
+                    "atual": novo,
+                    "variacao_pct": round(variacao * 100, 1),
+                })
+    return regressoes
+
+
+def imprimir_tabela(resultados):
+    print(f"\n{'etapa':<20} {'págs':>6} {'págs/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'CPU s':>8} {'RSS MB':>8} {'erros':>6}")
+    for etapa, m in resultados.items():
+        rss = f"{m['pico_rss_mb']:.1f}" if m["pico_rss_mb"] is not None else "-"
+        print(f"{etapa:<20} {m['paginas']:>6} {m['paginas_por_s']:>9.2f} {m['p50_ms']:>9.2f} "
+              f"{m['p95_ms']:>9.2f} {m['cpu_s']:>8.2f} {rss:>8} {m['erros']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline do scraper (corpus servido localmente)")
+    parser.add_argument("--corpus", help="Pasta de um corpus existente (padrão: gera um temporário)")
+    parser.add_argument("--escala", type=int, default=1, help="Tamanho do corpus gerado")
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=ETAPAS)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-playwright", action="store_true", help="Não usa o Playwright como fallback")
+    parser.add_argument("--saida", help="Grava os resultados em JSON")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="Piora aceita antes de acusar regressão (0.10 = 10%%)")
+    parser.add_argument("--_servidor", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--_etapa", help=argparse.SUPPRESS)
+    parser.add_argument("--_base-url", dest="base_url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Modos internos (processos filhos)
+    if args._servidor:
+        servir_corpus(args.corpus)
+        return
+    if args._etapa:
+        resultado = medir_etapa(args._etapa, args.corpus, args.base_url, args.repeticoes, args.sem_playwright)
+        print(json.dumps(resultado))
+        return
+
+    with tempfile.TemporaryDirectory() as temporario:
+        corpus = Path(args.corpus) if args.corpus else Path(temporario)
+        if not args.corpus:
+            print(f"📦 Gerando corpus (escala {args.escala})...")
+            gerar_corpus(corpus, args.escala)
+
+        resultados = {}
+        with servidor_local(corpus) as base_url:
+            print(f"🌐 Corpus servido em {base_url}")
+            for etapa in args.etapas:
+                print(f"⏱️ Medindo {etapa}...")
+                resultados[etapa] = rodar_etapa_isolada(etapa, corpus, base_url, args.repeticoes, args.sem_playwright)
+
+    imprimir_tabela(resultados)
+    relatorio = {
+        "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "parametros": {
+            "corpus": args.corpus or f"gerado (escala {args.escala})",
+            "repeticoes": args.repeticoes,
+            "sem_playwright": args.sem_playwright,
+            "python": sys.version.split()[0],
+            "cpus": os.cpu_count(),
+        },
+        "etapas": resultados,
+    }
+
+    codigo_saida = 0
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        relatorio["regressoes"] = comparar(relatorio, baseline, args.tolerancia)
+        if relatorio["regressoes"]:
+            print(f"\n❌ {len(relatorio['regressoes'])} regressão(ões) acima de {args.tolerancia:.0%}:")
+            for r in relatorio["regressoes"]:
+                print(f"   {r['etapa']}.{r['metrica']}: {r['baseline']} -> {r['atual']} ({r['variacao_pct']:+}%)")
+            codigo_saida = 1
+        else:
+            print(f"\n✅ Sem regressões acima de {args.tolerancia:.0%} em relação a {args.baseline}")
+
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n[OK] Resultados em {args.saida}")
+    sys.exit(codigo_saida)
+
+
+if __name__ == "__main__":
+    main()
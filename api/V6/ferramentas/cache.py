@@ -0,0 +1,60 @@
+import time
+import threading
+
+
+class CacheTTL:
+    """
+    Cache em memória com expiração por tempo (TTL), seguro para uso entre threads.
+    Um TTL <= 0 desativa o cache (todo `obter` é um miss).
+    """
+
+    def __init__(self, ttl, max_itens=1024):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._itens = {}
+        self._lock = threading.Lock()
+
+    # Função para obter um valor (devolve None se não existir ou tiver expirado)
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+            return valor
+
+    # Função para guardar um valor
+    def definir(self, chave, valor):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if len(self._itens) >= self.max_itens and chave not in self._itens:
+                self._remover_expirados()
+                if len(self._itens) >= self.max_itens:
+                    # Remove o item mais antigo (dicionários preservam a ordem de inserção)
+                    self._itens.pop(next(iter(self._itens)))
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+
+    # Função para invalidar uma chave específica
+    def invalidar(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    # Função para invalidar todas as chaves que atendem a um critério
+    def invalidar_onde(self, criterio):
+        with self._lock:
+            for chave in [c for c in self._itens if criterio(c)]:
+                del self._itens[chave]
+
+    # Função para limpar o cache inteiro
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def _remover_expirados(self):
+        agora = time.monotonic()
+        for chave in [c for c, (expira_em, _) in self._itens.items() if expira_em < agora]:
+            del self._itens[chave]
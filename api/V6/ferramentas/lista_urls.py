@@ -0,0 +1,17 @@
+def ler_lista_urls(texto):
+    """
+    Lê uma lista de URLs (uma por linha), ignorando linhas vazias,
+    comentários (#) e URLs repetidas, mantendo a ordem original
+    """
+    urls = []
+    vistas = set()
+    for linha in texto.splitlines():
+        url = linha.strip()
+        if not url or url.startswith('#'):
+            continue
+        if not url.startswith(('http://', 'https://')):
+            url = f"https://{url}"
+        if url not in vistas:
+            vistas.add(url)
+            urls.append(url)
+    return urls
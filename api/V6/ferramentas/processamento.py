@@ -0,0 +1,110 @@
+import os
+import logging
+import threading
+import concurrent.futures
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+
+from ferramentas.converter import html_para_markdown
+from ferramentas.limpeza import limpar_markdown
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de processos dedicados à conversão (0 = um por núcleo da máquina)
+CONVERSAO_WORKERS = int(os.getenv("CONVERSAO_WORKERS", "0")) or os.cpu_count() or 1
+# Cada processo é reciclado após N páginas convertidas para conter o crescimento de memória
+CONVERSAO_MAX_TAREFAS = int(os.getenv("CONVERSAO_MAX_TAREFAS", "50"))
+
+
+def converter_pagina(html_bytes, link):
+    """
+    Converte o HTML de uma página (bytes UTF-8) em markdown limpo.
+    Executada dentro dos processos do pool de conversão.
+    """
+    html = html_bytes.decode("utf-8", errors="replace")
+    conteudo_bruto = html_para_markdown(html)
+    return {
+        "link": link,
+        "conteudo": limpar_markdown(conteudo_bruto),
+    }
+
+
+class PoolConversao:
+    """
+    Pool de processos para a etapa CPU-bound (HTML -> Markdown + limpeza).
+    Os processos só sobem na primeira submissão e são reciclados a cada
+    `max_tarefas` páginas. Se o pool quebrar (ex.: worker morto por falta
+    de memória), ele é recriado e a página é convertida localmente.
+    """
+
+    def __init__(self, max_workers=None, max_tarefas=None):
+        self.max_workers = max_workers or CONVERSAO_WORKERS
+        self.max_tarefas = max_tarefas or CONVERSAO_MAX_TAREFAS
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _obter_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    max_tasks_per_child=self.max_tarefas,
+                )
+            return self._executor
+
+    def _descartar_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # Função para submeter uma página (o HTML vai como bytes, sem objetos do BeautifulSoup)
+    def submeter(self, html, link):
+        executor = self._obter_executor()
+        try:
+            return executor, executor.submit(converter_pagina, html.encode("utf-8"), link)
+        except BrokenProcessPool:
+            self._descartar_executor(executor)
+            executor = self._obter_executor()
+            return executor, executor.submit(converter_pagina, html.encode("utf-8"), link)
+
+    # Função para aguardar o resultado de uma página submetida
+    def resultado(self, submissao, html, link):
+        executor, futuro = submissao
+        try:
+            return futuro.result()
+        except BrokenProcessPool:
+            logger.warning(f"Pool de conversão quebrado, convertendo localmente: {link.get('url')}")
+            self._descartar_executor(executor)
+            return converter_pagina(html.encode("utf-8"), link)
+
+    # Função para converter uma lista de páginas preservando a ordem original
+    def converter_paginas(self, paginas):
+        paginas_validas = [p for p in paginas if p['status'] == True and p['html']]
+        submissoes = [self.submeter(p['html'], p['link']) for p in paginas_validas]
+        return [
+            self.resultado(submissao, p['html'], p['link'])
+            for p, submissao in zip(paginas_validas, submissoes)
+        ]
+
+    # Função para converter páginas vindas de um gerador, mantendo no máximo `janela`
+    # páginas em conversão ao mesmo tempo (a memória não cresce com o tamanho do site)
+    def converter_stream(self, paginas, janela=None):
+        janela = janela or self.max_workers * 2
+        pendentes = deque()
+        for p in paginas:
+            if p['status'] != True or not p['html']:
+                continue
+            pendentes.append((p['html'], p['link'], self.submeter(p['html'], p['link'])))
+            if len(pendentes) >= janela:
+                html, link, submissao = pendentes.popleft()
+                yield self.resultado(submissao, html, link)
+        while pendentes:
+            html, link, submissao = pendentes.popleft()
+            yield self.resultado(submissao, html, link)
+
+    def encerrar(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,72 @@
+import os
+import json
+
+TAMANHO_BLOCO_LEITURA = 64 * 1024
+
+
+def formatar_bloco_pagina(item):
+    """
+    Formata uma página (link + conteúdo) no bloco usado pelo relatório consolidado
+    """
+    return (
+        f"\n{'='*40}\n"
+        f"TÍTULO: {item['link']['texto']}\n"
+        f"LINK: {item['link']['url']}\n"
+        f"{'='*40}\n\n"
+        "--- CONTEÚDO PRINCIPAL IDENTIFICADO ---\n\n"
+        f"{item['conteudo']}\n\n"
+    )
+
+
+class RelatorioStream:
+    """
+    Escreve o relatório de um scrape página a página, direto em disco:
+    - `<nome>.md`: relatório consolidado (mesmo formato de sempre)
+    - `<nome>.ndjson`: um registro JSON por página (link + conteúdo)
+    Assim só a página atual fica em memória, independente do tamanho do site.
+    """
+
+    def __init__(self, nome_arquivo, nome_pasta="resultados"):
+        os.makedirs(nome_pasta, exist_ok=True)
+        self.caminho_relatorio = os.path.join(nome_pasta, f"{nome_arquivo}.md")
+        self.caminho_paginas = os.path.join(nome_pasta, f"{nome_arquivo}.ndjson")
+        self.total_paginas = 0
+        self._relatorio = None
+        self._paginas = None
+
+    def __enter__(self):
+        self._relatorio = open(self.caminho_relatorio, 'w', encoding='utf-8')
+        self._paginas = open(self.caminho_paginas, 'w', encoding='utf-8')
+        return self
+
+    def __exit__(self, *exc):
+        self._relatorio.close()
+        self._paginas.close()
+        if exc[0] is None:
+            print(f"✅ Salvo em '{self.caminho_relatorio}'")
+        return False
+
+    # Função para acrescentar uma página convertida ao relatório
+    def adicionar(self, item):
+        self._relatorio.write(formatar_bloco_pagina(item))
+        self._paginas.write(json.dumps(item, ensure_ascii=False) + "\n")
+        self.total_paginas += 1
+
+
+def ler_paginas(caminho_paginas):
+    """
+    Lê os registros de página de um arquivo .ndjson, um por vez
+    """
+    with open(caminho_paginas, 'r', encoding='utf-8') as f:
+        for linha in f:
+            if linha.strip():
+                yield json.loads(linha)
+
+
+def iterar_arquivo(caminho, tamanho_bloco=TAMANHO_BLOCO_LEITURA):
+    """
+    Lê um arquivo em blocos de bytes (para respostas HTTP em streaming)
+    """
+    with open(caminho, 'rb') as f:
+        while bloco := f.read(tamanho_bloco):
+            yield bloco
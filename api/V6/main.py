@@ -1,12 +1,74 @@
 from modos.scrape_unico import processar_scrape_unico
-from modos.scrape_completo import processar_scrape_completo
+from modos.scrape_completo import iterar_scrape_completo
 from ferramentas.converter import html_para_markdown
 from ferramentas.salvamento import salvar_arquivo_local
 from ferramentas.nome_arquivo import gerar_nome_arquivo_da_url
 from ferramentas.limpeza import limpar_markdown
+from ferramentas.relatorio import RelatorioStream, formatar_bloco_pagina
+from ferramentas.lista_urls import ler_lista_urls
+from scrapers.scrape_playwright import fechar_navegador_da_thread
+from datetime import datetime
+import argparse
 import json
+import time
+import os
+
+def converter_paginas(url):
+    """
+    Raspa o site e gera as páginas já convertidas para markdown, uma a uma (sem acumular o site em memória)
+    """
+    for paginas_html in iterar_scrape_completo(url):
+        if paginas_html['status'] == True:
+            conteudo_bruto = html_para_markdown(paginas_html['html'])
+            conteudo_pagina = limpar_markdown(conteudo_bruto)
+            yield {
+                "link": paginas_html['link'], 
+                "conteudo": conteudo_pagina, 
+            }
+
+def executar_lote(caminho_arquivo, modo):
+    """
+    Modo não interativo: raspa todas as URLs de um arquivo (uma por linha)
+    usando o mesmo gerenciador de jobs da API (executor, sessão HTTP e navegadores compartilhados)
+    """
+    from services import job_manager
+    from schemas import ScrapeMode, JobStatus
+
+    with open(caminho_arquivo, 'r', encoding='utf-8') as f:
+        urls = ler_lista_urls(f.read())
+    if not urls:
+        print("❌ Nenhuma URL encontrada no arquivo!")
+        return
+
+    print(f"=== Lote com {len(urls)} URLs ===\n")
+    batch_id = job_manager.start_batch_scrape_job(urls, ScrapeMode.SINGLE if modo == 1 else ScrapeMode.MULTI)
+
+    while True:
+        lote = job_manager.get_batch(batch_id)
+        print(f"🔄️ Progresso: {lote.completed + lote.failed}/{lote.total} (✅ {lote.completed} | ❌ {lote.failed})")
+        if lote.status == JobStatus.COMPLETED:
+            break
+        time.sleep(2)
+
+    # Resumo do lote: um job por linha
+    os.makedirs("resultados", exist_ok=True)
+    caminho_resumo = os.path.join("resultados", f"lote_{datetime.now().strftime('%d-%m-%Y_%H-%M-%S')}.ndjson")
+    with open(caminho_resumo, 'w', encoding='utf-8') as f:
+        for job_id in lote.job_ids:
+            f.write(job_manager.get_job(job_id).model_dump_json() + "\n")
+    print(f"\n=== LOTE FINALIZADO ===\n✅ Resumo salvo em '{caminho_resumo}'")
+    job_manager.encerrar()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Web Scraper para Markdown")
+    parser.add_argument("--arquivo", help="Arquivo texto com uma URL por linha (executa sem perguntas)")
+    parser.add_argument("--modo", type=int, choices=[1, 2], default=2, help="1 - página única, 2 - várias páginas (padrão)")
+    args = parser.parse_args()
+
+    if args.arquivo:
+        executar_lote(args.arquivo, args.modo)
+        raise SystemExit(0)
+
     print("=== Web Scraper para Markdown ===\n")
 
     url = input("Digite a URL da página: ")
@@ -29,13 +91,7 @@ if __name__ == "__main__":
                     })
                     print("\n=== SCRAPPE DAS PÁGINAS FINALIZADO ===\n")
 
-                    conteudo_completo = ""
-                    conteudo_completo += f"\n{'='*40}\n"
-                    conteudo_completo += f"TÍTULO: {markdown['link']['texto']}\n"
-                    conteudo_completo += f"LINK: {markdown['link']['url']}\n"
-                    conteudo_completo += f"{'='*40}\n\n"
-                    conteudo_completo += "--- CONTEÚDO PRINCIPAL IDENTIFICADO ---\n\n"
-                    conteudo_completo += str(markdown['conteudo']) + "\n\n"
+                    conteudo_completo = formatar_bloco_pagina(markdown)
                     # Salvar em arquivo (opcional)
                     salvar_arquivo = input("\nDeseja salvar em arquivo? (s/n): ")
                     if salvar_arquivo.lower() == 's':
@@ -45,42 +101,33 @@ if __name__ == "__main__":
                 else:
                     print("❌ Erro não foi possível raspar a página!")
             case 2: 
-                status, html_processado = processar_scrape_completo(url)
+                # As perguntas vêm antes da raspagem: cada página é gravada assim que é convertida
+                salvar_arquivo = input("\nDeseja salvar os arquivo? (s/n): ")
+                salvar_arquivos_unico = 'n'
+                if salvar_arquivo.lower() == 's':
+                    salvar_arquivos_unico = input("\nDeseja salvar os arquivos em um único arquivo (s) ou um arquivo para cada página (n)? (s/n): ")
+
+                paginas = converter_paginas(url)
+                total_paginas = 0
+                if salvar_arquivo.lower() == 's' and salvar_arquivos_unico.lower() == 's':
+                    nome_arquivo_unico = f"{gerar_nome_arquivo_da_url(url)}_relatorio_completo_multi"
+                    with RelatorioStream(nome_arquivo=nome_arquivo_unico) as relatorio:
+                        for arquivo in paginas:
+                            relatorio.adicionar(arquivo)
+                    total_paginas = relatorio.total_paginas
+                elif salvar_arquivo.lower() == 's':
+                    for idx, arquivo in enumerate(paginas, 1):
+                        # Tenta usar o texto do link, se não existir, usa o índice
+                        texto_link = arquivo['link'].get('texto') if isinstance(arquivo['link'], dict) and 'texto' in arquivo['link'] else f'pagina_{idx}'
+                        nome_arquivo = f"{gerar_nome_arquivo_da_url(url)}_{texto_link}"
+                        conteudo = f"{'='*40}\nTÍTULO: {texto_link}\n{'='*40}\n\n--- CONTEÚDO PRINCIPAL IDENTIFICADO ---\n\n{arquivo['conteudo']}\n\n"
+                        salvar_arquivo_local(conteudo=conteudo, nome_arquivo=nome_arquivo)
+                        total_paginas = idx
+                else:
+                    total_paginas = sum(1 for _ in paginas)
+
                 print("\n=== SCRAPPE DAS PÁGINAS FINALIZADO ===\n")
-                if status and html_processado:
-                    markdown = [] 
-
-                    for paginas_html in html_processado:
-                        if paginas_html['status'] == True:
-                            conteudo_bruto = html_para_markdown(paginas_html['html'])
-                            conteudo_pagina = limpar_markdown(conteudo_bruto)
-                            markdown.append({
-                                "link": paginas_html['link'], 
-                                "conteudo": conteudo_pagina, 
-                            })
-                    
-                    # Salvar em arquivo (opcional)
-                    salvar_arquivo = input("\nDeseja salvar os arquivo? (s/n): ")
-                    if salvar_arquivo.lower() == 's':
-                        salvar_arquivos_unico = input("\nDeseja salvar os arquivos em um único arquivo (s) ou um arquivo para cada página (n)? (s/n): ")
-                        if salvar_arquivos_unico.lower() == 's':
-                            conteudo_completo = ""
-                            for arquivo in markdown:
-                                conteudo_completo += f"\n{'='*40}\n"
-                                conteudo_completo += f"TÍTULO: {arquivo['link']['texto']}\n"
-                                conteudo_completo += f"LINK: {arquivo['link']['url']}\n"
-                                conteudo_completo += f"{'='*40}\n\n"
-                                conteudo_completo += "--- CONTEÚDO PRINCIPAL IDENTIFICADO ---\n\n"
-                                conteudo_completo += str(arquivo['conteudo']) + "\n\n"
-                            nome_arquivo_unico = f"{gerar_nome_arquivo_da_url(url)}_relatorio_completo_multi"
-                            salvar_arquivo_local(conteudo=conteudo_completo, nome_arquivo=nome_arquivo_unico)
-                        else:
-                            for idx, arquivo in enumerate(markdown, 1):
-                                # Tenta usar o texto do link, se não existir, usa o índice
-                                texto_link = arquivo['link'].get('texto') if isinstance(arquivo['link'], dict) and 'texto' in arquivo['link'] else f'pagina_{idx}'
-                                nome_arquivo = f"{gerar_nome_arquivo_da_url(url)}_{texto_link}"
-                                conteudo = f"{'='*40}\nTÍTULO: {texto_link}\n{'='*40}\n\n--- CONTEÚDO PRINCIPAL IDENTIFICADO ---\n\n{arquivo['conteudo']}\n\n"
-                                salvar_arquivo_local(conteudo=conteudo, nome_arquivo=nome_arquivo)
+                if total_paginas > 0:
                     break
                 else:
                     print("❌ Erro não foi possível raspar a página!")
@@ -91,3 +138,6 @@ if __name__ == "__main__":
             case _: 
                 print("Comando desconhecido")
         modo = int(input("Digite 1 - Para o scrape de uma página única\nDigite 2 - Para o scrape de várias páginas\nEscolha: "))
+
+    # O modo interativo raspa na thread principal: o navegador dela é fechado aqui mesmo
+    fechar_navegador_da_thread()
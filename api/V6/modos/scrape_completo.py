@@ -5,6 +5,19 @@ from scrapers.scrape_playwright import iniciar_playwright
 from scrapers.scrape_request import iniciar_request
 
 def processar_scrape_completo(url):
+    """
+    Raspa a página principal e os links encontrados, devolvendo todas as páginas em memória.
+    """
+    paginas = list(iterar_scrape_completo(url))
+    if not paginas:
+        return False, None
+    return True, paginas
+
+def iterar_scrape_completo(url):
+    """
+    Gera as páginas raspadas uma a uma (a principal primeiro), sem acumular o HTML do site todo.
+    Não gera nada se a página principal falhar.
+    """
     print("🔍 Tentando com Requests ...")
     status, html = iniciar_request(url)
 
@@ -13,16 +26,16 @@ def processar_scrape_completo(url):
         status, html = iniciar_playwright(url)
         if not status or html is None:
             print("⚠️ Falha playwright")
-            return False, None
+            return
 
     print("✅ Sucesso com raspagem!")
 
-    # Adiciona a página principal como a primeira da lista
-    paginas = [{
+    # Página principal (enviada só depois de extrair os links dela)
+    pagina_principal = {
         'link': {'texto': 'Página Principal', 'url': url},
         'html': html,
         'status': True
-    }]
+    }
 
     print("🔄️ Capturando links das páginas")
     html_formatado = BeautifulSoup(html, 'html.parser')
@@ -74,6 +87,11 @@ def processar_scrape_completo(url):
                 })
                 print(f"{link.get_text()}: {url_completa}")
 
+    # Libera a árvore do BeautifulSoup antes de seguir para as próximas páginas
+    del html_formatado, header, footer, links_a, html
+    yield pagina_principal
+    del pagina_principal
+
     print('\n🔄️ Iniciando Scrape dos links das páginas coletadas\n')
 
     for link in links_http:
@@ -86,17 +104,15 @@ def processar_scrape_completo(url):
             status, html = iniciar_playwright(link['url'])
             if not status or html is None:
                 print("⚠️ Falha playwright")
-                paginas.append({'link': link, 'html': None, 'status': False})
+                yield {'link': link, 'html': None, 'status': False}
                 continue
 
         print("✅ Sucesso com raspagem!")
 
-        paginas.append({
+        yield {
             'link': link,
             'html': html,
             'status': True
-        })
-
-        print(f"⚠️ Finalizando procedimento de scrape para o link: {link['texto']}\n")
+        }
 
-    return True, paginas
\ No newline at end of file
+        print(f"⚠️ Finalizando procedimento de scrape para o link: {link['texto']}\n")
\ No newline at end of file
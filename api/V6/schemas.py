@@ -5,6 +5,14 @@ from enum import Enum
 class ScrapeRequest(BaseModel):
     url: str
 
+class ScrapeMode(str, Enum):
+    SINGLE = "single"
+    MULTI = "multi"
+
+class BatchScrapeRequest(BaseModel):
+    urls: List[str]
+    mode: ScrapeMode = ScrapeMode.MULTI
+
 class JobStatus(str, Enum):
     PENDING = "PENDING"
     PROCESSING = "PROCESSING"
@@ -18,6 +26,7 @@ class JobResponse(BaseModel):
 class JobResult(BaseModel):
     job_id: str
     status: JobStatus
+    url: Optional[str] = None
     created_at: str
     completed_at: Optional[str] = None
     result: Optional[Any] = None
@@ -26,3 +35,25 @@ class JobResult(BaseModel):
 class ContentResponse(BaseModel):
     job_id: str
     content: Union[str, List[dict], dict]
+    # Paginação (apenas scrape múltiplo)
+    offset: Optional[int] = None
+    limit: Optional[int] = None
+    total: Optional[int] = None
+
+class BatchResponse(BaseModel):
+    batch_id: str
+    status: JobStatus
+    total: int
+
+class BatchResult(BaseModel):
+    batch_id: str
+    status: JobStatus
+    mode: ScrapeMode
+    created_at: str
+    completed_at: Optional[str] = None
+    total: int
+    pending: int
+    processing: int
+    completed: int
+    failed: int
+    job_ids: List[str]
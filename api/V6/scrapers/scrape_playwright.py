@@ -1,25 +1,67 @@
+import threading
 from playwright.sync_api import sync_playwright 
 
+# A API síncrona do Playwright não pode ser compartilhada entre threads:
+# cada thread de job mantém o seu navegador aberto e o reaproveita entre páginas
+_local = threading.local()
+
+def _obter_navegador():
+    """
+    Devolve o navegador da thread atual, abrindo um novo se necessário
+    """
+    navegador = getattr(_local, 'navegador', None)
+    if navegador is not None and navegador.is_connected():
+        return navegador
+
+    if getattr(_local, 'playwright', None) is None:
+        _local.playwright = sync_playwright().start()
+    _local.navegador = _local.playwright.chromium.launch(
+        headless=True,
+        args=['--disable-blink-features=AutomationControlled']
+    )
+    return _local.navegador
+
+def fechar_navegador_da_thread():
+    """
+    Fecha o navegador e o Playwright da thread atual (se houver).
+    Precisa rodar na própria thread que os abriu: a API síncrona do Playwright é presa a ela
+    """
+    navegador = getattr(_local, 'navegador', None)
+    playwright = getattr(_local, 'playwright', None)
+    _local.navegador = None
+    _local.playwright = None
+    try:
+        if navegador is not None:
+            navegador.close()
+    except Exception as e:
+        print(f"⚠️ Não foi possível fechar o navegador: {e}")
+    try:
+        if playwright is not None:
+            playwright.stop()
+    except Exception as e:
+        print(f"⚠️ Não foi possível encerrar o Playwright: {e}")
+
 def iniciar_playwright(url):
     """
     Faz scraping de uma URL usando Playwright
     """
     try:
-        with sync_playwright() as p:
-            navegador = p.chromium.launch(
-                headless=True,
-                args=['--disable-blink-features=AutomationControlled']
-            )
-            pagina = navegador.new_page()
+        navegador = _obter_navegador()
+        # Contexto isolado por página (cookies/cache não vazam entre sites)
+        contexto = navegador.new_context()
+        try:
+            pagina = contexto.new_page()
             
             pagina.goto(url, wait_until='networkidle', timeout=30000) #30s
             
             pagina.wait_for_timeout(2000) #2s
             
             conteudo_html = pagina.content()
+        finally:
+            contexto.close()
 
         return True, conteudo_html
 
     except Exception as e:
         print(f"❌ Playwright falhou: {e}")
-        return False, None
\ No newline at end of file
+        return False, None
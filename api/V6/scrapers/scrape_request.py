@@ -1,15 +1,25 @@
+import os
 import requests 
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 
+# Sessão compartilhada entre todos os jobs: reaproveita conexões (keep-alive) por host
+POOL_CONEXOES = int(os.getenv("REQUEST_POOL_CONEXOES", "50"))
+
+sessao = requests.Session()
+sessao.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+})
+_adaptador = HTTPAdapter(pool_connections=POOL_CONEXOES, pool_maxsize=POOL_CONEXOES)
+sessao.mount('http://', _adaptador)
+sessao.mount('https://', _adaptador)
+
 def iniciar_request(url):
     """
     Faz scraping de uma URL usando request
     """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        resposta = requests.get(url, headers=headers, timeout=10)
+        resposta = sessao.get(url, timeout=10)
         resposta.raise_for_status()
 
         resposta.encoding = resposta.apparent_encoding
@@ -30,4 +40,4 @@ def iniciar_request(url):
         
     except Exception as e:
         print(f"❌ Request falhou: {e}")
-        return False, None
\ No newline at end of file
+        return False, None
@@ -1,35 +1,45 @@
+import os
 import uuid
 import logging
 from datetime import datetime
-from threading import Thread
+from threading import Thread, Barrier, BrokenBarrierError
 import concurrent.futures
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 # Importações dos módulos existentes
 from modos.scrape_unico import processar_scrape_unico
-from modos.scrape_completo import processar_scrape_completo
-from ferramentas.converter import html_para_markdown
+from modos.scrape_completo import iterar_scrape_completo
 from ferramentas.nome_arquivo import gerar_nome_arquivo_da_url
-from ferramentas.limpeza import limpar_markdown
 from ferramentas.salvamento import salvar_arquivo_local
+from ferramentas.processamento import PoolConversao
+from ferramentas.relatorio import RelatorioStream, formatar_bloco_pagina
+from scrapers.scrape_playwright import fechar_navegador_da_thread
 
-from schemas import JobStatus, JobResult
+from schemas import JobStatus, JobResult, BatchResult, ScrapeMode
 
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Quantidade de jobs de scrape executados ao mesmo tempo (compartilhada por todos os lotes)
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "5"))
+# Tempo máximo (s) que o desligamento espera os jobs em andamento antes de fechar os navegadores
+JOBS_ENCERRAMENTO_TIMEOUT = float(os.getenv("JOBS_ENCERRAMENTO_TIMEOUT", "600"))
+
 class JobManager:
     def __init__(self):
         self.jobs: Dict[str, JobResult] = {} # Dicionário para armazenar os jobs
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=5) # Executor para processar jobs em paralelo
+        self.batches: Dict[str, dict] = {} # Dicionário para armazenar os lotes (batch -> jobs)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=JOBS_WORKERS) # Executor para processar jobs em paralelo
+        self.conversor = PoolConversao() # Pool de processos para a conversão HTML -> Markdown (CPU-bound, fora do GIL)
 
     # Função para criar um novo job (devolve o id do job criado)
-    def create_job(self) -> str:
+    def create_job(self, url: str = None) -> str:
         job_id = str(uuid.uuid4())
         self.jobs[job_id] = JobResult(
             job_id=job_id,
             status=JobStatus.PENDING,
+            url=url,
             created_at=datetime.now().isoformat()
         )
         return job_id
@@ -60,23 +70,15 @@ class JobManager:
             status, html_processado = processar_scrape_unico(url)
 
             if status and html_processado:
-                conteudo_bruto = html_para_markdown(html_processado['html'])
-                conteudo_pagina = limpar_markdown(conteudo_bruto)
-                markdown=({
-                    "link": html_processado['link'], 
-                    "conteudo": conteudo_pagina, 
-                })
+                markdown = self.conversor.converter_paginas([html_processado])[0]
+                conteudo_pagina = markdown['conteudo']
                 print("\n=== SCRAPPE DAS PÁGINAS FINALIZADO ===\n")
 
-                conteudo_completo = ""
-                conteudo_completo += f"\n{'='*40}\n"
-                conteudo_completo += f"TÍTULO: {markdown['link']['texto']}\n"
-                conteudo_completo += f"LINK: {markdown['link']['url']}\n"
-                conteudo_completo += f"{'='*40}\n\n"
-                conteudo_completo += "--- CONTEÚDO PRINCIPAL IDENTIFICADO ---\n\n"
-                conteudo_completo += str(markdown['conteudo']) + "\n\n"
+                conteudo_completo = formatar_bloco_pagina(markdown)
                     
-                nome_arquivo_unico = f"{gerar_nome_arquivo_da_url(url)}_relatorio_completo_unico"
+                # O id do job entra no nome: URLs de domínios parecidos (loja.com / loja.com.br)
+                # ou a mesma URL enviada duas vezes não sobrescrevem o relatório uma da outra
+                nome_arquivo_unico = f"{gerar_nome_arquivo_da_url(url)}_{job_id}_relatorio_completo_unico"
                 salvar_arquivo_local(conteudo=conteudo_completo, nome_arquivo=nome_arquivo_unico)
                 
                 result_data = {
@@ -99,39 +101,21 @@ class JobManager:
             self.update_job_status(job_id, JobStatus.PROCESSING)
             logger.info(f"Iniciando scrape múltiplo para job {job_id} - URL: {url}")
 
-            status, html_processado = processar_scrape_completo(url)
+            nome_arquivo_unico = f"{gerar_nome_arquivo_da_url(url)}_{job_id}_relatorio_completo" # Único por job
 
-            if status and html_processado:
-                markdown_list = []
-                conteudo_completo = ""
-
-                for paginas_html in html_processado:
-                    if paginas_html['status'] == True:
-                        conteudo_bruto = html_para_markdown(paginas_html['html'])
-                        conteudo_pagina = limpar_markdown(conteudo_bruto)
-                        
-                        item = {
-                            "link": paginas_html['link'], 
-                            "conteudo": conteudo_pagina, 
-                        }
-                        markdown_list.append(item)
-
-                        # Monta string pro arquivo completo
-                        conteudo_completo += f"\n{'='*40}\n"
-                        conteudo_completo += f"TÍTULO: {item['link']['texto']}\n"
-                        conteudo_completo += f"LINK: {item['link']['url']}\n"
-                        conteudo_completo += f"{'='*40}\n\n"
-                        conteudo_completo += "--- CONTEÚDO PRINCIPAL IDENTIFICADO ---\n\n"
-                        conteudo_completo += str(item['conteudo']) + "\n\n"
-
-                # Salva o arquivo consolidado
-                nome_arquivo_unico = f"{gerar_nome_arquivo_da_url(url)}_relatorio_completo"
-                salvar_arquivo_local(conteudo=conteudo_completo, nome_arquivo=nome_arquivo_unico)
+            # Páginas são raspadas, convertidas no pool de processos e gravadas em disco
+            # uma a uma: o relatório nunca é montado inteiro em memória
+            with RelatorioStream(nome_arquivo=nome_arquivo_unico) as relatorio:
+                paginas = iterar_scrape_completo(url)
+                for item in self.conversor.converter_stream(paginas):
+                    relatorio.adicionar(item)
 
+            if relatorio.total_paginas > 0:
                 result_data = {
-                    "content": markdown_list, # Lista estruturada
-                    "full_report": conteudo_completo, # String única
-                    "saved_files": [f"{nome_arquivo_unico}.md"]
+                    "report_path": relatorio.caminho_relatorio, # Relatório consolidado (.md)
+                    "pages_path": relatorio.caminho_paginas, # Um registro por página (.ndjson)
+                    "total_pages": relatorio.total_paginas,
+                    "saved_files": [f"{nome_arquivo_unico}.md", f"{nome_arquivo_unico}.ndjson"]
                 }
                 self.update_job_status(job_id, JobStatus.COMPLETED, result=result_data)
             else:
@@ -143,15 +127,80 @@ class JobManager:
 
     # Função para iniciar o scrape único (recebe a url)
     def start_single_scrape_job(self, url: str) -> str:
-        job_id = self.create_job()
+        job_id = self.create_job(url)
         self.executor.submit(self.run_scrape_single, job_id, url)
         return job_id
 
     # Função para iniciar o scrape múltiplo (recebe a url)
     def start_multi_scrape_job(self, url: str) -> str:
-        job_id = self.create_job()
+        job_id = self.create_job(url)
         self.executor.submit(self.run_scrape_multi, job_id, url)
         return job_id
 
+    # Função para iniciar um lote de scrapes (recebe a lista de urls e o modo)
+    # Todos os jobs do lote dividem o mesmo executor, a mesma sessão HTTP e os navegadores das threads
+    def start_batch_scrape_job(self, urls: List[str], mode: ScrapeMode = ScrapeMode.MULTI) -> str:
+        batch_id = str(uuid.uuid4())
+        iniciar = self.start_single_scrape_job if mode == ScrapeMode.SINGLE else self.start_multi_scrape_job
+        self.batches[batch_id] = {
+            "batch_id": batch_id,
+            "mode": mode,
+            "created_at": datetime.now().isoformat(),
+            "job_ids": [iniciar(url) for url in urls],
+        }
+        return batch_id
+
+    # Função para obter o progresso agregado de um lote
+    def get_batch(self, batch_id: str) -> Optional[BatchResult]:
+        batch = self.batches.get(batch_id)
+        if not batch:
+            return None
+
+        jobs = [self.jobs[job_id] for job_id in batch["job_ids"]]
+        contagem = {status: 0 for status in JobStatus}
+        for job in jobs:
+            contagem[job.status] += 1
+
+        finalizados = contagem[JobStatus.COMPLETED] + contagem[JobStatus.FAILED]
+        if finalizados == len(jobs):
+            status = JobStatus.COMPLETED
+            completed_at = max((job.completed_at for job in jobs), default=batch["created_at"])
+        else:
+            status = JobStatus.PENDING if finalizados == 0 and contagem[JobStatus.PROCESSING] == 0 else JobStatus.PROCESSING
+            completed_at = None
+
+        return BatchResult(
+            batch_id=batch_id,
+            status=status,
+            mode=batch["mode"],
+            created_at=batch["created_at"],
+            completed_at=completed_at,
+            total=len(jobs),
+            pending=contagem[JobStatus.PENDING],
+            processing=contagem[JobStatus.PROCESSING],
+            completed=contagem[JobStatus.COMPLETED],
+            failed=contagem[JobStatus.FAILED],
+            job_ids=batch["job_ids"],
+        )
+
+    # Função para encerrar o gerenciador: espera os jobs, fecha os navegadores e o pool de conversão
+    def encerrar(self):
+        # Cada thread do executor fecha o próprio navegador (a API síncrona do Playwright é presa
+        # à thread que o abriu). As tarefas entram na fila depois dos jobs pendentes, e a barreira
+        # segura cada thread até todas chegarem: assim cada uma executa exatamente uma tarefa
+        barreira = Barrier(JOBS_WORKERS)
+
+        def fechar():
+            try:
+                barreira.wait(timeout=JOBS_ENCERRAMENTO_TIMEOUT)
+            except BrokenBarrierError:
+                logger.warning("Nem todas as threads de job ficaram livres a tempo; alguns navegadores podem continuar abertos.")
+            fechar_navegador_da_thread()
+
+        futuros = [self.executor.submit(fechar) for _ in range(JOBS_WORKERS)]
+        concurrent.futures.wait(futuros)
+        self.executor.shutdown(wait=True)
+        self.conversor.encerrar()
+
 # Instância global do gerenciador (criado apenas uma vez, e no decorrer de toda aplicação é usado apenas seus métodos garantindo um estado absoluto dos jobs)
 job_manager = JobManager()
@@ -0,0 +1,19 @@
+-- Agregação usada por GET /api/pipelines.
+-- Conta os FAQs por ID_Conta direto no banco, em vez de baixar todas as linhas
+-- (e o metadata de cada FAQ) para contar em Python.
+-- Execute uma vez no SQL Editor do Supabase.
+
+create index if not exists marketing_rag_id_conta_idx
+  on marketing_rag ("ID_Conta");
+
+create or replace function contar_faqs_por_conta()
+returns table ("ID_Conta" text, total_faqs bigint)
+language sql
+stable
+as $$
+  select "ID_Conta", count(*) as total_faqs
+  from marketing_rag
+  where "ID_Conta" is not null
+  group by "ID_Conta"
+  order by "ID_Conta";
+$$;
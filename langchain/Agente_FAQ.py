@@ -5,14 +5,19 @@ e carrega no banco vetorial Supabase.
 """
 
 import os
+import re
 import sys
+import glob
 import json
+import math
 import time
 import threading
 import argparse
+import concurrent.futures
 import xml.etree.ElementTree as ET
 from datetime import datetime
-from typing import List, Dict, Any
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Tuple, Optional, Callable
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -23,6 +28,18 @@ from supabase.client import Client, create_client
 from pydantic import ValidationError
 
 from models import FAQResponse, FAQItem
+from llm_cache import FAQChunkCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_MAX_MB
+from embedding_cache import EmbeddingCache, DEFAULT_EMBEDDING_CACHE_PATH
+from retry import RateLimitGate, call_with_retries
+from dedup import deduplicate_faqs, DEFAULT_DEDUP_THRESHOLD
+from stream_parser import FAQStreamParser, parse_json_object
+from run_journal import RunJournal, make_run_id, gc_runs, DEFAULT_RUNS_DIR
+from retrieval_cache import touch_ingestion_stamp
+from bulk_insert import (
+    SupabaseBulkWriter,
+    DEFAULT_INSERT_BATCH_MB,
+    DEFAULT_INSERT_CONCURRENCY,
+)
 
 
 # Carrega variáveis de ambiente
@@ -112,17 +129,86 @@ class TokenUsageTracker(BaseCallbackHandler):
         self.llm_input_tokens = 0
         self.llm_output_tokens = 0
         self.llm_total_tokens = 0
-        self.embedding_tokens = 0
+        self.embedding_tokens = 0            # total (exatos + estimados)
+        self.embedding_tokens_exact = 0      # contados pela API (count_tokens)
+        self.embedding_tokens_estimated = 0  # estimados por caracteres
+        self.embedding_cache_hits = 0
+        self.llm_chunks: Dict[Any, Dict[str, int]] = {}  # uso por chunk (chunk_num -> tokens; no lote, (arquivo, chunk_num))
+        self.llm_cache_hits = 0
+        self.llm_cache_misses = 0
         self.start_time = time.time()
+        self._lock = threading.Lock()  # chunks são processados em paralelo
         
     def on_llm_end(self, response: Any, **kwargs) -> None:
         """Captura tokens usados pelo LLM."""
         if hasattr(response, 'llm_output') and response.llm_output:
             token_usage = response.llm_output.get('token_usage', {})
-            self.llm_input_tokens += token_usage.get('prompt_tokens', 0)
-            self.llm_output_tokens += token_usage.get('completion_tokens', 0)
-            self.llm_total_tokens += token_usage.get('total_tokens', 0)
+            with self._lock:
+                self.llm_input_tokens += token_usage.get('prompt_tokens', 0)
+                self.llm_output_tokens += token_usage.get('completion_tokens', 0)
+                self.llm_total_tokens += token_usage.get('total_tokens', 0)
+
+    def add_llm_usage(self, chunk_num: int, input_tokens: int, output_tokens: int, total_tokens: int) -> None:
+        """Registra (de forma thread-safe) os tokens de uma chamada ao LLM para um chunk."""
+        with self._lock:
+            self.llm_input_tokens += input_tokens
+            self.llm_output_tokens += output_tokens
+            self.llm_total_tokens += total_tokens
+            usage = self.llm_chunks.setdefault(
+                chunk_num, {'input_tokens': 0, 'output_tokens': 0, 'total_tokens': 0}
+            )
+            usage['input_tokens'] += input_tokens
+            usage['output_tokens'] += output_tokens
+            usage['total_tokens'] += total_tokens
+
+    def add_llm_cache_result(self, hit: bool) -> None:
+        """Registra um acerto/erro no cache de chunks do LLM."""
+        with self._lock:
+            if hit:
+                self.llm_cache_hits += 1
+            else:
+                self.llm_cache_misses += 1
+
+    def add_embedding_tokens(self, tokens: int, exact: bool = False) -> None:
+        """Registra (de forma thread-safe) tokens de embeddings, separando exatos de estimados."""
+        with self._lock:
+            self.embedding_tokens += tokens
+            if exact:
+                self.embedding_tokens_exact += tokens
+            else:
+                self.embedding_tokens_estimated += tokens
+
+    def add_embedding_cache_hits(self, hits: int) -> None:
+        """Registra vetores reaproveitados do cache de embeddings."""
+        with self._lock:
+            self.embedding_cache_hits += hits
     
+    @classmethod
+    def combine(cls, trackers: List["TokenUsageTracker"], labels: List[str] = None) -> "TokenUsageTracker":
+        """
+        Soma o uso de vários trackers (um por arquivo) em um só, para o relatório do lote.
+        O uso por chunk é mantido com a chave (arquivo, chunk_num); `labels` nomeia cada
+        tracker (padrão: posição na lista).
+        """
+        combined = cls()
+        labels = labels or [str(i) for i in range(1, len(trackers) + 1)]
+        for label, tracker in zip(labels, trackers):
+            for attr in (
+                "llm_input_tokens", "llm_output_tokens", "llm_total_tokens",
+                "embedding_tokens", "embedding_tokens_exact", "embedding_tokens_estimated",
+                "embedding_cache_hits", "llm_cache_hits", "llm_cache_misses",
+            ):
+                setattr(combined, attr, getattr(combined, attr) + getattr(tracker, attr))
+            for chunk_num, usage in tracker.llm_chunks.items():
+                merged = combined.llm_chunks.setdefault(
+                    (label, chunk_num), {'input_tokens': 0, 'output_tokens': 0, 'total_tokens': 0}
+                )
+                for name, tokens in usage.items():
+                    merged[name] += tokens
+        if trackers:
+            combined.start_time = min(tracker.start_time for tracker in trackers)
+        return combined
+
     def get_summary(self) -> Dict[str, Any]:
         """Retorna um resumo do uso de tokens."""
         return {
@@ -132,7 +218,14 @@ class TokenUsageTracker(BaseCallbackHandler):
                 'total_tokens': self.llm_total_tokens
             },
             'embeddings': {
-                'tokens': self.embedding_tokens
+                'tokens': self.embedding_tokens,
+                'exact_tokens': self.embedding_tokens_exact,
+                'estimated_tokens': self.embedding_tokens_estimated,
+                'cache_hits': self.embedding_cache_hits
+            },
+            'llm_cache': {
+                'hits': self.llm_cache_hits,
+                'misses': self.llm_cache_misses
             },
             'total_all': self.llm_total_tokens + self.embedding_tokens
         }
@@ -178,10 +271,18 @@ class TokenUsageTracker(BaseCallbackHandler):
         print(f"   - Tokens de entrada:  {summary['llm']['input_tokens']:>10,}  |  ${costs['llm']['input_cost_usd']:.6f}")
         print(f"   - Tokens de saida:    {summary['llm']['output_tokens']:>10,}  |  ${costs['llm']['output_cost_usd']:.6f}")
         print(f"   - Total LLM:          {summary['llm']['total_tokens']:>10,}  |  ${costs['llm']['total_cost_usd']:.6f}")
+        cache = summary['llm_cache']
+        if cache['hits'] or cache['misses']:
+            print(f"   - Cache de chunks:    {cache['hits']} hits / {cache['misses']} misses (hits custam 0 tokens)")
         
-        if summary['embeddings']['tokens'] > 0:
+        emb = summary['embeddings']
+        if emb['tokens'] > 0 or emb['cache_hits'] > 0:
             print(f"\nEmbeddings (Gemini Embedding-001):")
-            print(f"   - Tokens estimados:   {summary['embeddings']['tokens']:>10,}  |  ${costs['embeddings']['cost_usd']:.6f}")
+            print(f"   - Tokens exatos:      {emb['exact_tokens']:>10,}")
+            print(f"   - Tokens estimados:   {emb['estimated_tokens']:>10,}")
+            print(f"   - Total embeddings:   {emb['tokens']:>10,}  |  ${costs['embeddings']['cost_usd']:.6f}")
+            if emb['cache_hits']:
+                print(f"   - Vetores do cache:   {emb['cache_hits']:>10,}  (0 tokens)")
         
         print(f"\n{'-' * 50}")
         print(f"   TOTAL GERAL:          {summary['total_all']:>10,} tokens")
@@ -191,6 +292,9 @@ class TokenUsageTracker(BaseCallbackHandler):
         print("=" * 80)
 
 
+# Versão do system prompt (entra na chave do cache de chunks: altere ao mudar as regras de extração)
+INGESTION_PROMPT_VERSION = "1"
+
 # System Prompt extraído do doc.md
 INGESTION_SYSTEM_PROMPT = """
 SYSTEM PROMPT: AGENTE DE INGESTÃO E ESTRUTURAÇÃO
@@ -312,30 +416,140 @@ def load_markdown_file(file_path: str) -> str:
     return content
 
 
-def chunk_content(content: str, max_chars: int = 50_000) -> List[str]:
-    """Divide o conteúdo em chunks menores para evitar truncamento do LLM."""
-    if len(content) <= max_chars:
+# ──────────────────────────────────────────────────────────────
+# CHUNKING — orçamento de tokens por chamada ao LLM
+# ──────────────────────────────────────────────────────────────
+CHARS_PER_TOKEN = 4.0               # estimativa média (~1 token a cada 4 caracteres)
+DEFAULT_CHUNK_INPUT_TOKENS = 12_000  # tokens de conteúdo enviados por chamada
+DEFAULT_CHUNK_OUTPUT_TOKENS = 32_000 # tokens de JSON que aceitamos receber por chamada
+OUTPUT_INPUT_RATIO = 1.8            # saída/entrada observada (ex.: olist 143k/79k tokens)
+
+# Separador de páginas gravado pelo scrape múltiplo (api/V6): ====\nTÍTULO: ...\nLINK: ...\n====
+PAGE_HEADER_RE = re.compile(r"^={10,}\nTÍTULO: .*\nLINK: .*\n={10,}\n", re.MULTILINE)
+HEADING_RE = re.compile(r"^#{1,6} ", re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata de tokens para um texto."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _split_before(text: str, pattern: re.Pattern) -> List[str]:
+    """Divide o texto imediatamente antes de cada ocorrência do padrão."""
+    starts = [m.start() for m in pattern.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts = [0] + starts
+    bounds = zip(starts, starts[1:] + [len(text)])
+    return [text[a:b] for a, b in bounds if text[a:b].strip()]
+
+
+# Níveis de divisão, do mais estrutural ao mais fino
+_SPLIT_LEVELS = (
+    lambda text: _split_before(text, HEADING_RE),     # seções (# títulos)
+    lambda text: re.split(r"(?<=\n\n)", text),        # parágrafos
+    lambda text: text.splitlines(keepends=True),      # linhas
+)
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """Quebra um texto maior que o orçamento pelo nível estrutural mais alto possível."""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    for split in _SPLIT_LEVELS:
+        parts = [p for p in split(text) if p]
+        if len(parts) > 1:
+            return [piece for part in parts for piece in _split_oversized(part, max_tokens)]
+    # Linha única gigante: corta por caracteres
+    size = max(1, int(max_tokens * CHARS_PER_TOKEN))
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _pack(pieces: List[str], max_tokens: int) -> List[str]:
+    """Agrupa pedaços consecutivos em chunks sem ultrapassar o orçamento."""
+    chunks, current, current_tokens = [], [], 0.0
+    for piece in pieces:
+        tokens = len(piece) / CHARS_PER_TOKEN  # sem arredondar: pedaços pequenos somam certo
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("".join(current))
+            current, current_tokens = [], 0.0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def _split_pages(content: str) -> List[Tuple[str, str]]:
+    """Separa o relatório do scrape em páginas: lista de (cabeçalho, corpo)."""
+    pages = []
+    for block in _split_before(content, PAGE_HEADER_RE):
+        match = PAGE_HEADER_RE.match(block)
+        if match:
+            pages.append((match.group(0), block[match.end():]))
+        else:
+            pages.append(("", block))
+    return pages
+
+
+def chunk_budget_tokens(
+    max_input_tokens: int = DEFAULT_CHUNK_INPUT_TOKENS,
+    max_output_tokens: int = DEFAULT_CHUNK_OUTPUT_TOKENS,
+    output_ratio: float = OUTPUT_INPUT_RATIO
+) -> int:
+    """Tokens de conteúdo por chunk: limitado pela entrada e pela saída esperada."""
+    return max(1, min(max_input_tokens, int(max_output_tokens / output_ratio)))
+
+
+def chunk_content(
+    content: str,
+    max_input_tokens: int = DEFAULT_CHUNK_INPUT_TOKENS,
+    max_output_tokens: int = DEFAULT_CHUNK_OUTPUT_TOKENS,
+    output_ratio: float = OUTPUT_INPUT_RATIO
+) -> List[str]:
+    """Divide o conteúdo em chunks respeitando a estrutura do documento.
+
+    Páginas inteiras (separadores ====/TÍTULO:/LINK:) são agrupadas até o orçamento
+    de tokens. Páginas maiores que o orçamento são quebradas por títulos, depois
+    parágrafos e linhas, repetindo o cabeçalho da página em cada pedaço para manter
+    o contexto. O orçamento considera a entrada e a saída esperada do LLM, evitando
+    JSON truncado em páginas densas.
+    """
+    max_tokens = chunk_budget_tokens(max_input_tokens, max_output_tokens, output_ratio)
+    if estimate_tokens(content) <= max_tokens:
         return [content]
-    
-    chunks = []
-    lines = content.split("\n")
-    current_chunk = []
-    current_size = 0
-    
-    for line in lines:
-        line_size = len(line) + 1  # +1 para o \n
-        if current_size + line_size > max_chars and current_chunk:
-            chunks.append("\n".join(current_chunk))
-            current_chunk = [line]
-            current_size = line_size
+
+    pieces = []
+    for header, body in _split_pages(content):
+        page = header + body
+        if estimate_tokens(page) <= max_tokens:
+            pieces.append(page)
+            continue
+        body_budget = max(1, max_tokens - estimate_tokens(header))
+        for section in _pack(_split_oversized(body, body_budget), body_budget):
+            pieces.append(header + section)
+
+    return _pack(pieces, max_tokens)
+
+
+def resolve_input_files(inputs: List[str]) -> List[str]:
+    """Expande arquivos, pastas (todos os .md) e padrões glob em uma lista de arquivos, sem repetir."""
+    files: List[str] = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            matches = sorted(str(p) for p in path.glob("*.md"))
+        elif any(ch in item for ch in "*?["):
+            matches = sorted(p for p in glob.glob(item, recursive=True) if Path(p).is_file())
         else:
-            current_chunk.append(line)
-            current_size += line_size
-    
-    if current_chunk:
-        chunks.append("\n".join(current_chunk))
-    
-    return chunks
+            matches = [item]
+        if not matches:
+            print(f"  [!] Nenhum arquivo Markdown encontrado em: {item}")
+        files.extend(matches)
+    # O mesmo arquivo por caminhos diferentes (./a.md e a.md) entra uma vez só
+    unique: Dict[str, str] = {}
+    for file_path in files:
+        unique.setdefault(str(Path(file_path).resolve()), file_path)
+    return list(unique.values())
 
 
 def derive_id_conta(file_path: str) -> str:
@@ -346,20 +560,61 @@ def derive_id_conta(file_path: str) -> str:
     return id_conta
 
 
+def check_unique_id_contas(files: List[str]) -> None:
+    """Garante que arquivos diferentes não derivem o mesmo ID_Conta.
+
+    A sincronização incremental remove do ID_Conta os FAQs ausentes do arquivo atual:
+    `a/loja.md` e `b/loja.md` no mesmo lote apagariam os FAQs um do outro.
+    """
+    owners: Dict[str, List[str]] = {}
+    for file_path in files:
+        owners.setdefault(derive_id_conta(file_path), []).append(file_path)
+    conflicts = {id_conta: paths for id_conta, paths in owners.items() if len(paths) > 1}
+    if conflicts:
+        details = "\n".join(f"  - {id_conta}: {', '.join(paths)}" for id_conta, paths in conflicts.items())
+        raise ValueError(
+            "Arquivos diferentes com o mesmo ID_Conta (nome do arquivo) no mesmo lote:\n"
+            f"{details}\nRenomeie os arquivos ou ingira-os em execuções separadas."
+        )
+
+
+# Concorrência das chamadas ao LLM
+DEFAULT_LLM_CONCURRENCY = int(os.environ.get("FAQ_LLM_CONCURRENCY", "4"))
+
+
 def _call_llm_for_chunk(
     chunk: str,
     chunk_num: int,
     total_chunks: int,
     llm: ChatGoogleGenerativeAI,
-    tracker: TokenUsageTracker = None
-) -> List:
-    """Envia um único chunk para o LLM e retorna a lista de faq_items."""
+    tracker: TokenUsageTracker = None,
+    gate: RateLimitGate = None,
+    show_spinner: bool = True,
+    on_item: Callable[[FAQItem], None] = None
+) -> Tuple[List[Dict], bool]:
+    """Envia um único chunk para o LLM (em streaming) e retorna (faq_items válidos, completo).
+
+    Cada FAQ é validado assim que o seu objeto JSON fecha na resposta: itens inválidos são
+    descartados individualmente e, se a resposta vier truncada, os itens completos são mantidos.
+    `completo` é False nesses dois casos: o resultado parcial serve para esta execução,
+    mas não deve ir para o cache nem para o checkpoint.
+    `on_item` recebe cada FAQ válido à medida que chega.
+    """
 
+    label = f"[Chunk {chunk_num}/{total_chunks}]"
     estimate_s = 45.0  # média empírica por chunk no Gemini Flash
-    spinner = ProgressSpinner(
-        f"[Chunk {chunk_num}/{total_chunks}] Enviando {len(chunk):,} chars ao LLM",
-        estimate_s=estimate_s
-    ).start()
+    spinner = None
+    if show_spinner:
+        spinner = ProgressSpinner(
+            f"{label} Enviando {len(chunk):,} chars (~{estimate_tokens(chunk):,} tokens) ao LLM",
+            estimate_s=estimate_s
+        ).start()
+
+    def finish(success: bool, msg: str):
+        if spinner:
+            spinner.stop(success=success, msg=msg)
+        else:
+            print(f"  {'[OK]' if success else '[X]'} {msg}")
 
     user_message = f"""Analise o seguinte conteúdo Markdown e extraia FAQs estruturados seguindo as instruções do system prompt:
 
@@ -374,16 +629,22 @@ Retorne APENAS o JSON estruturado conforme especificado."""
         {"role": "user", "content": user_message}
     ]
 
-    try:
-        response = llm.invoke(messages)
-    except Exception as e:
-        spinner.stop(success=False, msg=f"[Chunk {chunk_num}/{total_chunks}] Erro na chamada ao LLM")
-        raise
-
-    raw_response = response.content
-
-    # Captura tokens
-    if tracker and hasattr(response, 'usage_metadata') and response.usage_metadata:
+    attempts_tokens: List[int] = []  # total de tokens de cada tentativa
+
+    def record_usage(response, received_text: str) -> None:
+        """
+        Registra o uso de uma tentativa (o uso vem somado nos pedaços do streaming).
+        Uma tentativa interrompida antes do uso chegar é estimada pelo texto já recebido.
+        """
+        if not tracker:
+            return
+        if response is None or not getattr(response, 'usage_metadata', None):
+            if received_text:
+                input_tokens = estimate_tokens(INGESTION_SYSTEM_PROMPT + user_message)
+                output_tokens = estimate_tokens(received_text)
+                tracker.add_llm_usage(chunk_num, input_tokens, output_tokens, input_tokens + output_tokens)
+                attempts_tokens.append(input_tokens + output_tokens)
+            return
         metadata = response.usage_metadata
         if isinstance(metadata, dict):
             input_tokens = metadata.get('input_tokens', 0) or metadata.get('prompt_token_count', 0)
@@ -397,54 +658,146 @@ Retorne APENAS o JSON estruturado conforme especificado."""
         if not total_tokens and input_tokens and output_tokens:
             total_tokens = input_tokens + output_tokens
 
-        tracker.llm_input_tokens += input_tokens
-        tracker.llm_output_tokens += output_tokens
-        tracker.llm_total_tokens += total_tokens
+        tracker.add_llm_usage(chunk_num, input_tokens, output_tokens, total_tokens)
+        attempts_tokens.append(total_tokens)
 
-    # Extrai JSON da resposta
-    json_str = raw_response
-    if "```json" in raw_response:
-        json_str = raw_response.split("```json")[1].split("```")[0].strip()
-    elif "```" in raw_response:
-        json_str = raw_response.split("```")[1].split("```")[0].strip()
+    def stream_response():
+        parser = FAQStreamParser(on_item=on_item)
+        response = None
+        received = []
+        try:
+            for piece in llm.stream(messages):
+                response = piece if response is None else response + piece
+                content = piece.content
+                if isinstance(content, list):
+                    content = "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+                received.append(content)
+                parser.feed(content)
+        finally:
+            # Tentativas que falham no meio do streaming também consomem tokens
+            record_usage(response, "".join(received))
+        return parser, "".join(received)
 
     try:
-        parsed_json = json.loads(json_str)
-        items = parsed_json.get("faq_items", [])
-
-        token_info = ""
-        if tracker:
-            token_info = f" | {total_tokens:,} tokens"
-        spinner.stop(
-            success=True,
-            msg=f"[Chunk {chunk_num}/{total_chunks}] {len(items)} FAQs extraídos{token_info}"
-        )
-        return items
-    except json.JSONDecodeError as e:
-        spinner.stop(success=False, msg=f"[Chunk {chunk_num}/{total_chunks}] Erro JSON: {e}")
-        print(f"  Resposta bruta:\n{raw_response[:500]}...")
+        parser, raw_response = call_with_retries(stream_response, label, gate)
+    except Exception as e:
+        finish(False, f"{label} Erro na chamada ao LLM")
         raise
-
-
-
-def process_with_llm(content: str, llm: ChatGoogleGenerativeAI, tracker: TokenUsageTracker = None) -> FAQResponse:
+    total_tokens = sum(attempts_tokens)
+
+    if not parser.array_found:
+        if parse_json_object(raw_response) is None:
+            finish(False, f"{label} Resposta JSON inválida")
+            print(f"  Resposta bruta:\n{raw_response[:500]}...")
+            raise ValueError(f"{label} A resposta do LLM não é um JSON válido")
+        # JSON válido sem faq_items (ex.: `{}` para um chunk só de navegação): nenhum FAQ,
+        # marcado como incompleto para não ir ao cache nem ao checkpoint
+        finish(True, f"{label} Nenhum FAQ (resposta sem faq_items)")
+        return [], False
+
+    token_info = f" | {total_tokens:,} tokens" if tracker else ""
+    notes = []
+    if parser.invalid_items:
+        notes.append(f"{parser.invalid_items} inválidos descartados")
+    if parser.truncated:
+        notes.append("resposta truncada")
+    note_info = f" ({', '.join(notes)})" if notes else ""
+    finish(True, f"{label} {len(parser.items)} FAQs extraídos{token_info}{note_info}")
+    complete = not parser.truncated and not parser.invalid_items
+    return [item.model_dump() for item in parser.items], complete
+
+
+def process_with_llm(
+    content: str,
+    llm: ChatGoogleGenerativeAI,
+    tracker: TokenUsageTracker = None,
+    max_concurrency: int = DEFAULT_LLM_CONCURRENCY,
+    cache: FAQChunkCache = None,
+    max_input_tokens: int = DEFAULT_CHUNK_INPUT_TOKENS,
+    max_output_tokens: int = DEFAULT_CHUNK_OUTPUT_TOKENS,
+    journal: RunJournal = None,
+    on_item: Callable[[FAQItem], None] = None
+) -> FAQResponse:
     """Processa o conteúdo Markdown usando o LLM para gerar FAQs estruturados.
     
-    Divide automaticamente arquivos grandes em chunks para evitar truncamento do JSON.
+    Divide automaticamente arquivos grandes em chunks (por páginas/títulos, dentro do
+    orçamento de tokens de entrada e saída) para evitar truncamento do JSON.
+    Os chunks são enviados em paralelo (até `max_concurrency` chamadas simultâneas),
+    mas os FAQs são montados na ordem original dos chunks. Com `cache`, chunks
+    idênticos a execuções anteriores não são reenviados ao LLM; com `journal`,
+    cada chunk concluído é gravado na hora e reaproveitado no `--resume`.
+    `on_item` recebe cada FAQ válido assim que ele chega no streaming do LLM.
     """
-    chunks = chunk_content(content, max_chars=50_000)
+    chunks = chunk_content(content, max_input_tokens=max_input_tokens, max_output_tokens=max_output_tokens)
     total_chunks = len(chunks)
+    workers = max(1, min(max_concurrency, total_chunks))
     
     if total_chunks == 1:
         print("\nEnviando para o LLM processar...")
     else:
-        print(f"\nArquivo grande detectado ({len(content):,} chars). Processando em {total_chunks} chunks...")
-    
-    all_faq_items = []
+        print(f"\nArquivo grande detectado ({len(content):,} chars, ~{estimate_tokens(content):,} tokens). "
+              f"Processando em {total_chunks} chunks ({workers} em paralelo)...")
     
+    gate = RateLimitGate()
+    results: List[List] = [None] * total_chunks
+
+    # Chunks já processados antes (mesmo texto, prompt e modelo) saem do cache sem custo
+    model_name = getattr(llm, "model", "unknown")
+    chunk_keys = {}
+    pending = []
     for i, chunk in enumerate(chunks, start=1):
-        items = _call_llm_for_chunk(chunk, i, total_chunks, llm, tracker)
-        all_faq_items.extend(items)
+        key = FAQChunkCache.make_key(chunk, INGESTION_SYSTEM_PROMPT, INGESTION_PROMPT_VERSION, model_name)
+        chunk_keys[i] = key
+        if journal is not None:
+            journaled_items = journal.chunk_items(key)
+            if journaled_items is not None:
+                results[i - 1] = journaled_items
+                print(f"  [OK] [Chunk {i}/{total_chunks}] {len(journaled_items)} FAQs retomados do checkpoint")
+                continue
+        if cache is not None:
+            cached_items = cache.get(key)
+            if tracker:
+                tracker.add_llm_cache_result(cached_items is not None)
+            if cached_items is not None:
+                results[i - 1] = cached_items
+                if journal is not None:
+                    journal.record_chunk(key, cached_items)
+                print(f"  [OK] [Chunk {i}/{total_chunks}] {len(cached_items)} FAQs do cache (0 tokens)")
+                continue
+        pending.append((i, chunk))
+
+    def process_chunk(i: int, chunk: str, show_spinner: bool) -> List:
+        # Os itens já chegam validados um a um pelo parser de streaming
+        items, complete = _call_llm_for_chunk(chunk, i, total_chunks, llm, tracker, gate, show_spinner, on_item)
+        if not complete:
+            # Resultado parcial: usado nesta execução, mas reprocessado na próxima (e no --resume)
+            print(f"  [!] [Chunk {i}/{total_chunks}] Resultado incompleto não foi salvo no cache/checkpoint")
+            return items
+        if cache is not None:
+            cache.put(chunk_keys[i], items)
+        if journal is not None:
+            journal.record_chunk(chunk_keys[i], items)
+        return items
+
+    workers = max(1, min(workers, len(pending)))
+    if workers == 1:
+        for i, chunk in pending:
+            results[i - 1] = process_chunk(i, chunk, True)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(process_chunk, i, chunk, False): i
+                for i, chunk in pending
+            }
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    results[futures[future] - 1] = future.result()
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    all_faq_items = [item for items in results for item in items]
     
     try:
         faq_response = FAQResponse(faq_items=all_faq_items)
@@ -455,11 +808,177 @@ def process_with_llm(content: str, llm: ChatGoogleGenerativeAI, tracker: TokenUs
         raise
 
 
+# Geração de embeddings
+DEFAULT_EMBED_BATCH_SIZE = 100   # limite de textos por chamada batch da API do Gemini
+DEFAULT_EMBED_CONCURRENCY = 4
+
+
+def faq_embedding_text(faq: FAQItem) -> str:
+    """Texto embedado para um FAQ: question + answer + synthetic_variations."""
+    return (
+        f"{faq.question}\n\n"
+        f"{faq.answer}\n\n"
+        f"{' '.join(faq.synthetic_variations)}"
+    )
+
+
+def build_faq_row(faq: FAQItem, id_conta: str, vector: List[float]) -> Dict:
+    """Monta a linha da tabela do Supabase para um FAQ."""
+    return {
+        "content": faq.answer,
+        "ID_Conta": id_conta,
+        "content_hash": faq.content_hash(),
+        "metadata": {
+            "ID_Conta": id_conta,
+            "question": faq.question,
+            "synthetic_variations": faq.synthetic_variations,
+            "category": faq.category,
+            "tags": faq.tags,
+            "audience": faq.audience,
+            "confidence_score": faq.confidence_score
+        },
+        "embedding": vector
+    }
+
+
+def _count_embedding_tokens(embeddings: GoogleGenerativeAIEmbeddings, texts: List[str]):
+    """Conta os tokens exatos de um lote pela API (count_tokens). Retorna None se indisponível."""
+    client = getattr(embeddings, "client", None)
+    models_api = getattr(client, "models", None)
+    if models_api is None:
+        return None
+    try:
+        result = models_api.count_tokens(model=embeddings.model, contents=texts)
+        return int(result.total_tokens)
+    except Exception:
+        return None
+
+
+def embed_texts(
+    texts: List[str],
+    embeddings: GoogleGenerativeAIEmbeddings,
+    tracker: TokenUsageTracker = None,
+    cache: EmbeddingCache = None,
+    batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+    concurrency: int = DEFAULT_EMBED_CONCURRENCY,
+    exact_tokens: bool = False
+) -> List[List[float]]:
+    """Gera os vetores de uma lista de textos, na mesma ordem.
+
+    Textos repetidos são embedados uma única vez e vetores já conhecidos vêm do cache.
+    Os textos restantes vão em lotes de `batch_size`, com até `concurrency` lotes em
+    paralelo; cada lote tem retry com backoff próprio e é gravado no cache assim que
+    termina (uma falha parcial não perde os lotes já concluídos).
+    """
+    model_name = getattr(embeddings, "model", "unknown")
+    keys = [EmbeddingCache.make_key(text, model_name) for text in texts]
+    vectors_by_key: Dict[str, List[float]] = cache.get_many(keys) if cache else {}
+    if tracker and vectors_by_key:
+        tracker.add_embedding_cache_hits(sum(1 for key in keys if key in vectors_by_key))
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors_by_key:
+            missing.setdefault(key, text)
+    missing_items = list(missing.items())
+    batches = [missing_items[i:i + batch_size] for i in range(0, len(missing_items), batch_size)]
+
+    gate = RateLimitGate()
+    count_exact = [exact_tokens]  # desliga a contagem exata se a API não suportar
+
+    def embed_batch(batch_num: int, batch: List[Tuple[str, str]]):
+        batch_texts = [text for _, text in batch]
+        vectors = call_with_retries(
+            lambda: embeddings.embed_documents(batch_texts),
+            f"[Embeddings {batch_num}/{len(batches)}]",
+            gate
+        )
+        if cache:
+            cache.put_many(zip((key for key, _ in batch), vectors))
+        if tracker:
+            exact = _count_embedding_tokens(embeddings, batch_texts) if count_exact[0] else None
+            if exact is None:
+                count_exact[0] = False
+                tracker.add_embedding_tokens(sum(estimate_tokens(t) for t in batch_texts), exact=False)
+            else:
+                tracker.add_embedding_tokens(exact, exact=True)
+        return batch, vectors
+
+    workers = max(1, min(concurrency, len(batches)))
+    if batches:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(embed_batch, n, batch) for n, batch in enumerate(batches, start=1)]
+            for future in concurrent.futures.as_completed(futures):
+                batch, vectors = future.result()
+                for (key, _), vector in zip(batch, vectors):
+                    vectors_by_key[key] = vector
+
+    return [vectors_by_key[key] for key in keys]
+
+
+class EmbeddingPrewarmer:
+    """
+    Gera os embeddings dos FAQs em segundo plano, em lotes, enquanto o LLM ainda está
+    respondendo. Os vetores ficam no cache de embeddings, então a deduplicação e a
+    gravação encontram quase tudo pronto. Falhas aqui não interrompem nada: o que
+    faltar é gerado normalmente depois.
+    """
+
+    def __init__(
+        self,
+        embeddings: GoogleGenerativeAIEmbeddings,
+        cache: EmbeddingCache,
+        tracker: TokenUsageTracker = None,
+        batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+        exact_tokens: bool = False
+    ):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.tracker = tracker
+        self.batch_size = batch_size
+        self.exact_tokens = exact_tokens
+        self._lock = threading.Lock()
+        self._pending: List[str] = []
+        self._futures: List[concurrent.futures.Future] = []
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def add(self, faq: FAQItem) -> None:
+        """Callback `on_item` do streaming: enfileira o FAQ e dispara um lote quando enche."""
+        with self._lock:
+            self._pending.append(faq_embedding_text(faq))
+            if len(self._pending) >= self.batch_size:
+                self._submit_locked()
+
+    def _submit_locked(self) -> None:
+        batch, self._pending = self._pending, []
+        self._futures.append(self._executor.submit(
+            embed_texts, batch, self.embeddings, self.tracker, self.cache,
+            batch_size=self.batch_size, concurrency=1, exact_tokens=self.exact_tokens
+        ))
+
+    def finish(self) -> None:
+        """Envia o que sobrou e aguarda todos os lotes."""
+        with self._lock:
+            if self._pending:
+                self._submit_locked()
+            futures, self._futures = self._futures, []
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"  [!] Pre-geracao de embeddings falhou (sera refeita): {type(e).__name__}: {e}")
+        self._executor.shutdown(wait=True)
+
+
 def generate_embeddings_for_faqs(
     faq_items: List[FAQItem], 
     embeddings: GoogleGenerativeAIEmbeddings,
     id_conta: str,
-    tracker: TokenUsageTracker = None
+    tracker: TokenUsageTracker = None,
+    cache: EmbeddingCache = None,
+    batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+    concurrency: int = DEFAULT_EMBED_CONCURRENCY,
+    exact_tokens: bool = False
 ) -> List[Dict]:
     """Gera embeddings para cada FAQ concatenando question + answer + synthetic_variations."""
 
@@ -468,96 +987,148 @@ def generate_embeddings_for_faqs(
         estimate_s=max(10.0, len(faq_items) * 0.2)
     ).start()
 
-    rows = []
-    texts_to_embed = []
-
-    for faq in faq_items:
-        text_to_embed = (
-            f"{faq.question}\n\n"
-            f"{faq.answer}\n\n"
-            f"{' '.join(faq.synthetic_variations)}"
-        )
-        texts_to_embed.append(text_to_embed)
-
+    tokens_before = tracker.embedding_tokens if tracker else 0
+    hits_before = tracker.embedding_cache_hits if tracker else 0
     try:
-        vectors = embeddings.embed_documents(texts_to_embed)
+        vectors = embed_texts(
+            [faq_embedding_text(faq) for faq in faq_items],
+            embeddings, tracker, cache,
+            batch_size=batch_size,
+            concurrency=concurrency,
+            exact_tokens=exact_tokens
+        )
     except Exception as e:
         spinner.stop(success=False, msg=f"Erro ao gerar embeddings")
         raise
 
-    # Estima tokens de embeddings (~1 token por 4 caracteres)
-    estimated_tokens = 0
-    if tracker:
-        total_chars = sum(len(t) for t in texts_to_embed)
-        estimated_tokens = total_chars // 4
-        tracker.embedding_tokens += estimated_tokens
+    rows = [build_faq_row(faq, id_conta, vector) for faq, vector in zip(faq_items, vectors)]
 
-    for i, faq in enumerate(faq_items):
-        rows.append({
-            "content": faq.answer,
-            "ID_Conta": id_conta,
-            "metadata": {
-                "ID_Conta": id_conta,
-                "question": faq.question,
-                "synthetic_variations": faq.synthetic_variations,
-                "category": faq.category,
-                "tags": faq.tags,
-                "audience": faq.audience,
-                "confidence_score": faq.confidence_score
-            },
-            "embedding": vectors[i]
-        })
-
-    token_info = f" | ~{estimated_tokens:,} tokens estimados" if estimated_tokens else ""
+    token_info = ""
+    if tracker:
+        token_info = (f" | {tracker.embedding_tokens - tokens_before:,} tokens"
+                      f" | {tracker.embedding_cache_hits - hits_before} do cache")
     spinner.stop(success=True, msg=f"{len(rows)} embeddings gerados{token_info}")
     return rows
 
 
 
-def clear_table(supabase: Client, table_name: str):
-    """Limpa todos os dados da tabela."""
-    print(f"\nLimpando tabela '{table_name}'...")
-    
+SUPABASE_PAGE_SIZE = 1000     # limite padrão de linhas por select do PostgREST
+SUPABASE_DELETE_BATCH = 200   # ids por delete (mantém a URL do filtro curta)
+
+
+def clear_account(supabase: Client, table_name: str, id_conta: str):
+    """Remove todos os FAQs de um ID_Conta (as demais contas da tabela não são afetadas)."""
+    print(f"\n  [clear] Removendo FAQs de '{id_conta}' da tabela '{table_name}'...")
     try:
-        # Deleta todos os registros
-        # Nota: Supabase requer um filtro, então usamos um filtro que sempre é verdadeiro
-        result = supabase.table(table_name).delete().neq('id', 0).execute()
-        print(f"Tabela '{table_name}' limpa com sucesso!")
+        supabase.table(table_name).delete().eq("ID_Conta", id_conta).execute()
+        print(f"  [OK] FAQs de '{id_conta}' removidos.")
     except Exception as e:
-        print(f"Aviso: Nao foi possivel limpar a tabela: {e}")
-        print("Continuando com a insercao...")
+        print(f"  [!] Nao foi possivel limpar os FAQs da conta: {e}")
+        print("  Continuando com a insercao...")
+
+
+def fetch_existing_hashes(supabase: Client, table_name: str, id_conta: str) -> Dict[str, List[int]]:
+    """Retorna {content_hash: [ids]} dos FAQs já gravados para o ID_Conta."""
+    existing: Dict[str, List[int]] = {}
+    start = 0
+    while True:
+        result = (
+            supabase.table(table_name)
+            .select("id, content_hash")
+            .eq("ID_Conta", id_conta)
+            .order("id")
+            .range(start, start + SUPABASE_PAGE_SIZE - 1)
+            .execute()
+        )
+        data = result.data or []
+        for row in data:
+            existing.setdefault(row.get("content_hash") or "", []).append(row["id"])
+        if len(data) < SUPABASE_PAGE_SIZE:
+            return existing
+        start += SUPABASE_PAGE_SIZE
+
+
+def plan_incremental_sync(
+    faq_items: List[FAQItem],
+    existing: Dict[str, List[int]]
+) -> Tuple[List[FAQItem], int, List[int]]:
+    """Compara os FAQs extraídos com os já gravados.
+
+    Retorna (FAQs novos/alterados, quantidade inalterada, ids a remover).
+    Linhas sem hash (ingestões antigas) e duplicatas de um mesmo hash também são removidas.
+    """
+    new_items: List[FAQItem] = []
+    seen = set()
+    unchanged = 0
+    for faq in faq_items:
+        content_hash = faq.content_hash()
+        if content_hash in seen:
+            continue  # o mesmo FAQ extraído duas vezes
+        seen.add(content_hash)
+        if content_hash in existing:
+            unchanged += 1
+        else:
+            new_items.append(faq)
+
+    stale_ids: List[int] = []
+    for content_hash, ids in existing.items():
+        if content_hash in seen:
+            stale_ids.extend(ids[1:])
+        else:
+            stale_ids.extend(ids)
+    return new_items, unchanged, stale_ids
+
+
+def delete_rows(supabase: Client, table_name: str, ids: List[int]):
+    """Remove linhas pelo id, em lotes."""
+    if not ids:
+        return
+    spinner = ProgressSpinner(f"Removendo {len(ids)} FAQs obsoletos", estimate_s=2.0).start()
+    try:
+        for start in range(0, len(ids), SUPABASE_DELETE_BATCH):
+            batch = ids[start:start + SUPABASE_DELETE_BATCH]
+            supabase.table(table_name).delete().in_("id", batch).execute()
+        spinner.stop(success=True, msg=f"{len(ids)} FAQs obsoletos removidos")
+    except Exception:
+        spinner.stop(success=False, msg="Erro ao remover FAQs obsoletos")
+        raise
 
 
 def insert_into_supabase(
     supabase: Client, 
     table_name: str, 
     rows: List[Dict],
-    clear_before: bool = False
+    max_batch_mb: float = DEFAULT_INSERT_BATCH_MB,
+    concurrency: int = DEFAULT_INSERT_CONCURRENCY,
+    on_batch_done=None
 ):
-    """Insere os FAQs processados no Supabase."""
-    if clear_before:
-        print(f"\n  [clear] Limpando tabela '{table_name}'...")
-        try:
-            supabase.table(table_name).delete().neq('id', 0).execute()
-            print(f"  [OK] Tabela '{table_name}' limpa.")
-        except Exception as e:
-            print(f"  [!] Nao foi possivel limpar a tabela: {e}")
-            print("  Continuando com a insercao...")
-
+    """Insere os FAQs processados no Supabase em lotes (tamanho limitado, com retry)."""
+    if not rows:
+        print("\n  [OK] Nenhum FAQ novo para inserir.")
+        return None
+
+    writer = SupabaseBulkWriter(
+        supabase, table_name,
+        max_batch_bytes=int(max_batch_mb * 1024 * 1024),
+        concurrency=concurrency
+    )
     spinner = ProgressSpinner(
         f"Inserindo {len(rows)} FAQs no Supabase (tabela: {table_name})",
         estimate_s=5.0
     ).start()
     try:
-        result = supabase.table(table_name).insert(rows).execute()
-        spinner.stop(success=True, msg=f"{len(rows)} FAQs inseridos com sucesso no Supabase")
+        result = writer.write(rows, on_batch_done=on_batch_done)
+        spinner.stop(
+            success=True,
+            msg=f"{len(rows)} FAQs inseridos com sucesso no Supabase ({result.batches} lotes)"
+        )
         return result
     except Exception as e:
         spinner.stop(success=False, msg=f"Erro ao inserir no Supabase")
-        if "ID_Conta" in str(e):
+        if "ID_Conta" in str(e) or "content_hash" in str(e):
             raise RuntimeError(
-                "Falha ao inserir ID_Conta. Garanta que a tabela possua a coluna literal 'ID_Conta' "
-                "ou ajuste o schema no Supabase antes da ingestão."
+                "Falha ao inserir ID_Conta/content_hash. Garanta que a tabela possua as colunas "
+                "'ID_Conta' e 'content_hash' e o índice único (ver sql/001_content_hash.sql) antes da ingestão."
             ) from e
         raise
 
@@ -599,8 +1170,14 @@ def export_to_xml(faq_response, id_conta: str, tracker, args_input: str, args_ta
     ET.SubElement(llm_el, "Saida").text = str(summary['llm']['output_tokens'])
     ET.SubElement(llm_el, "Total").text = str(summary['llm']['total_tokens'])
     emb_el = ET.SubElement(tokens_el, "Embeddings")
-    ET.SubElement(emb_el, "Estimativa").text = str(summary['embeddings']['tokens'])
+    ET.SubElement(emb_el, "Exatos").text = str(summary['embeddings']['exact_tokens'])
+    ET.SubElement(emb_el, "Estimativa").text = str(summary['embeddings']['estimated_tokens'])
+    ET.SubElement(emb_el, "Total").text = str(summary['embeddings']['tokens'])
+    ET.SubElement(emb_el, "CacheHits").text = str(summary['embeddings']['cache_hits'])
     ET.SubElement(tokens_el, "TotalGeral").text = str(summary['total_all'])
+    cache_el = ET.SubElement(tokens_el, "CacheChunksLLM")
+    ET.SubElement(cache_el, "Hits").text = str(summary['llm_cache']['hits'])
+    ET.SubElement(cache_el, "Misses").text = str(summary['llm_cache']['misses'])
     
     # Custos
     custos_el = ET.SubElement(meta, "Custos")
@@ -645,7 +1222,8 @@ def export_cost_report(
     args_table: str,
     num_faqs: int,
     categories: Dict[str, int],
-    output_dir=None
+    output_dir=None,
+    dedup_removed: int = 0
 ) -> str:
     """Gera um relatório .txt detalhado de uso de tokens e custos."""
     
@@ -674,6 +1252,7 @@ def export_cost_report(
     lines.append(f"   Arquivo Origem:     {args_input}")
     lines.append(f"   Tabela Supabase:    {args_table}")
     lines.append(f"   FAQs Gerados:       {num_faqs}")
+    lines.append(f"   Duplicatas Fundidas:{dedup_removed:>5}")
     lines.append(f"   Tempo Total:        {elapsed:.1f}s ({elapsed/60:.1f}min)")
     lines.append("")
     lines.append("─" * 70)
@@ -689,10 +1268,20 @@ def export_cost_report(
     lines.append(f"   │    → Subtotal LLM       │ {summary['llm']['total_tokens']:>10,} │  ${costs['llm']['total_cost_usd']:>12.6f}  │")
     lines.append("   ├─────────────────────────────────────────────────────────┤")
     lines.append(f"   │  Gemini Embedding-001   │ {summary['embeddings']['tokens']:>10,} │  ${costs['embeddings']['cost_usd']:>12.6f}  │")
+    lines.append(f"   │    → Exatos             │ {summary['embeddings']['exact_tokens']:>10,} │                  │")
+    lines.append(f"   │    → Estimados          │ {summary['embeddings']['estimated_tokens']:>10,} │                  │")
     lines.append("   ├─────────────────────────────────────────────────────────┤")
     lines.append(f"   │  TOTAL                  │ {summary['total_all']:>10,} │  ${costs['total_usd']:>12.6f}  │")
     lines.append("   └─────────────────────────────────────────────────────────┘")
     lines.append("")
+    cache = summary['llm_cache']
+    if cache['hits'] or cache['misses']:
+        lines.append(f"   Cache de chunks LLM:  {cache['hits']} hits / {cache['misses']} misses "
+                     f"(chunks em cache não consomem tokens)")
+        lines.append("")
+    if summary['embeddings']['cache_hits']:
+        lines.append(f"   Cache de embeddings:  {summary['embeddings']['cache_hits']} vetores reaproveitados (0 tokens)")
+        lines.append("")
     lines.append("─" * 70)
     lines.append("   CONVERSÃO PARA BRL")
     lines.append("─" * 70)
@@ -732,6 +1321,292 @@ def export_cost_report(
     return str(output_path)
 
 
+def export_batch_cost_report(
+    results: List["FileIngestion"],
+    failures: List[Tuple[str, Exception]],
+    args_table: str,
+    output_dir=None
+) -> str:
+    """Gera um relatório .txt consolidado de uma ingestão com vários arquivos."""
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if output_dir is None:
+        output_dir = Path(__file__).parent / "Exemplos"
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / f"custos_lote_{timestamp}.txt"
+
+    combined = TokenUsageTracker.combine([r.tracker for r in results], [r.id_conta for r in results])
+    summary = combined.get_summary()
+    costs = combined.get_cost_summary()
+    elapsed = time.time() - combined.start_time
+
+    lines = []
+    lines.append("=" * 70)
+    lines.append("   RELATÓRIO DE CUSTOS — INGESTÃO EM LOTE")
+    lines.append("=" * 70)
+    lines.append("")
+    lines.append(f"   Data/Hora:          {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+    lines.append(f"   Tabela Supabase:    {args_table}")
+    lines.append(f"   Arquivos:           {len(results)} concluídos | {len(failures)} com erro")
+    lines.append(f"   FAQs Gerados:       {sum(len(r.faq_items) for r in results)}")
+    lines.append(f"   Tempo Total:        {elapsed:.1f}s ({elapsed/60:.1f}min)")
+    lines.append("")
+    lines.append("─" * 70)
+    lines.append("   POR ARQUIVO")
+    lines.append("─" * 70)
+    lines.append("")
+    lines.append(f"   {'ID_Conta':<30} {'FAQs':>5} {'Tokens':>12} {'Custo (USD)':>14}")
+    for r in results:
+        file_costs = r.tracker.get_cost_summary()
+        file_tokens = r.tracker.get_summary()['total_all']
+        lines.append(f"   {r.id_conta[:30]:<30} {len(r.faq_items):>5} {file_tokens:>12,} ${file_costs['total_usd']:>13.6f}")
+    for input_path, error in failures:
+        lines.append(f"   {Path(input_path).stem[:30]:<30} ERRO: {type(error).__name__}: {str(error)[:80]}")
+    lines.append("")
+    if combined.llm_chunks:
+        lines.append("─" * 70)
+        lines.append("   LLM POR CHUNK (chunks do cache/checkpoint não aparecem)")
+        lines.append("─" * 70)
+        lines.append("")
+        lines.append(f"   {'ID_Conta':<30} {'Chunk':>5} {'Entrada':>12} {'Saída':>12} {'Total':>12}")
+        for (id_conta, chunk_num), usage in sorted(combined.llm_chunks.items()):
+            lines.append(f"   {id_conta[:30]:<30} {chunk_num:>5} {usage['input_tokens']:>12,} "
+                         f"{usage['output_tokens']:>12,} {usage['total_tokens']:>12,}")
+        lines.append("")
+    lines.append("─" * 70)
+    lines.append("   TOTAL")
+    lines.append("─" * 70)
+    lines.append("")
+    lines.append(f"   LLM entrada:          {summary['llm']['input_tokens']:>12,}  |  ${costs['llm']['input_cost_usd']:.6f}")
+    lines.append(f"   LLM saída:            {summary['llm']['output_tokens']:>12,}  |  ${costs['llm']['output_cost_usd']:.6f}")
+    lines.append(f"   Embeddings:           {summary['embeddings']['tokens']:>12,}  |  ${costs['embeddings']['cost_usd']:.6f}")
+    lines.append(f"   Total:                {summary['total_all']:>12,}  |  ${costs['total_usd']:.6f}")
+    lines.append(f"   Custo Total em BRL:   R$ {costs['total_brl']:.4f} (1 USD = R$ {costs['usd_to_brl_rate']:.2f})")
+    lines.append("")
+    lines.append("=" * 70)
+    lines.append("   Gerado automaticamente por Agente_FAQ.py")
+    lines.append("=" * 70)
+
+    output_path.write_text("\n".join(lines), encoding="utf-8")
+    print(f"[OK] Relatório de custos do lote: {output_path}")
+    return str(output_path)
+
+
+@dataclass
+class IngestionContext:
+    """Clientes e caches criados uma única vez e compartilhados por todos os arquivos."""
+    args: argparse.Namespace
+    llm: ChatGoogleGenerativeAI
+    embeddings: GoogleGenerativeAIEmbeddings
+    supabase: Client
+    llm_cache: Optional[FAQChunkCache] = None
+    embedding_cache: Optional[EmbeddingCache] = None
+
+
+@dataclass
+class FileIngestion:
+    """Estado de um arquivo entre a extração (LLM + dedup) e a gravação (embeddings + Supabase)."""
+    input_path: str
+    id_conta: str
+    tracker: TokenUsageTracker
+    journal: RunJournal
+    faq_items: List[FAQItem]
+    dedup_removed: int = 0
+    new_items: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    categories: Dict[str, int] = field(default_factory=dict)
+    xml_path: str = ""
+    cost_path: str = ""
+
+
+def extract_file(ctx: IngestionContext, input_path: str) -> FileIngestion:
+    """Etapas 1-3: carrega o Markdown, extrai os FAQs com o LLM e deduplica."""
+    args = ctx.args
+    tracker = TokenUsageTracker()
+
+    id_conta = derive_id_conta(input_path)
+    print(f"\nID_Conta derivado do arquivo: {id_conta}")
+
+    # 1. Carrega o arquivo Markdown
+    content = load_markdown_file(input_path)
+
+    # Checkpoint da execução (mesmo arquivo + mesmas configurações = mesma execução)
+    run_id = make_run_id(content, {
+        "table": args.table,
+        "id_conta": id_conta,
+        "clear": args.clear,
+        "model": getattr(ctx.llm, "model", "unknown"),
+        "prompt_version": INGESTION_PROMPT_VERSION,
+        "chunk_input_tokens": args.chunk_input_tokens,
+        "chunk_output_tokens": args.chunk_output_tokens,
+        "dedup_threshold": None if args.no_dedup else args.dedup_threshold,
+    })
+    journal = RunJournal.open(run_id, resume=args.resume, input=input_path, id_conta=id_conta)
+    if args.resume:
+        if journal.resumed:
+            print(f"Retomando execucao {run_id} (etapas concluidas: {', '.join(journal.meta['steps']) or 'chunks parciais'})")
+        else:
+            print("Nenhum checkpoint encontrado para este arquivo; iniciando do zero.")
+
+    # 2. Processa com LLM
+    extracted = journal.load_step("extracted")
+    if extracted is not None:
+        faq_items = [FAQItem.model_validate(item) for item in extracted["faq_items"]]
+        print(f"\n[OK] {len(faq_items)} FAQs retomados do checkpoint (LLM e deduplicacao ja concluidos)")
+        return FileIngestion(input_path, id_conta, tracker, journal, faq_items, extracted["dedup_removed"])
+
+    # Com cache de embeddings, os FAQs já vão sendo embedados enquanto o LLM responde
+    prewarmer = None
+    if ctx.embedding_cache is not None and not args.no_dedup:
+        prewarmer = EmbeddingPrewarmer(
+            ctx.embeddings, ctx.embedding_cache, tracker,
+            batch_size=args.embed_batch_size,
+            exact_tokens=args.exact_embedding_tokens
+        )
+    try:
+        faq_response = process_with_llm(
+            content, ctx.llm, tracker,
+            max_concurrency=args.concurrency,
+            cache=ctx.llm_cache,
+            max_input_tokens=args.chunk_input_tokens,
+            max_output_tokens=args.chunk_output_tokens,
+            journal=journal,
+            on_item=prewarmer.add if prewarmer else None
+        )
+    finally:
+        if prewarmer:
+            prewarmer.finish()
+    faq_items = faq_response.faq_items
+    dedup_removed = 0
+
+    # 3. Deduplica FAQs quase iguais vindos de páginas diferentes (similaridade dos embeddings)
+    if not args.no_dedup and len(faq_items) > 1:
+        vectors = embed_texts(
+            [faq_embedding_text(faq) for faq in faq_items],
+            ctx.embeddings, tracker, ctx.embedding_cache,
+            batch_size=args.embed_batch_size,
+            concurrency=args.embed_concurrency,
+            exact_tokens=args.exact_embedding_tokens
+        )
+        faq_items, dedup_stats = deduplicate_faqs(faq_items, vectors, threshold=args.dedup_threshold)
+        dedup_removed = dedup_stats.rows_saved
+        print(f"\nDeduplicacao ({id_conta}): {dedup_stats.input_items} -> {dedup_stats.output_items} FAQs "
+              f"({dedup_stats.clusters_merged} grupos fundidos, {dedup_removed} linhas economizadas)")
+
+    journal.mark_step("extracted", {
+        "faq_items": [faq.model_dump() for faq in faq_items],
+        "dedup_removed": dedup_removed,
+    })
+    return FileIngestion(input_path, id_conta, tracker, journal, faq_items, dedup_removed)
+
+
+def store_file(ctx: IngestionContext, state: FileIngestion) -> FileIngestion:
+    """Etapas 4-8: compara com o Supabase, gera embeddings, insere e exporta XML e custos."""
+    args = ctx.args
+    journal = state.journal
+    id_conta = state.id_conta
+
+    # 4. Compara com o que já está gravado para o ID_Conta (ingestão incremental)
+    # No resume, linhas de lotes já inseridos aparecem aqui como inalteradas
+    if args.clear and not journal.has_step("cleared"):
+        clear_account(ctx.supabase, args.table, id_conta)
+        journal.mark_step("cleared")
+        existing = {}
+    else:
+        existing = fetch_existing_hashes(ctx.supabase, args.table, id_conta)
+    new_items, unchanged, stale_ids = plan_incremental_sync(state.faq_items, existing)
+    print(f"\nIngestao incremental ({id_conta}): {len(new_items)} novos/alterados | "
+          f"{unchanged} inalterados | {len(stale_ids)} a remover")
+
+    # 5. Gera embeddings apenas dos FAQs novos/alterados (vetores já calculados vêm do cache
+    # ou do checkpoint)
+    journaled_rows = {
+        row["content_hash"]: row
+        for row in (journal.load_step("embedded") or {}).get("rows", [])
+    }
+    inserted = journal.inserted_hashes()
+    rows = [journaled_rows[faq.content_hash()] for faq in new_items if faq.content_hash() in journaled_rows]
+    missing = [faq for faq in new_items if faq.content_hash() not in journaled_rows]
+    if missing:
+        rows += generate_embeddings_for_faqs(
+            missing, ctx.embeddings, id_conta, state.tracker,
+            cache=ctx.embedding_cache,
+            batch_size=args.embed_batch_size,
+            concurrency=args.embed_concurrency,
+            exact_tokens=args.exact_embedding_tokens
+        )
+        journal.mark_step("embedded", {"rows": list(journaled_rows.values()) + rows[len(new_items) - len(missing):]})
+    elif rows:
+        print(f"\n[OK] {len(rows)} embeddings retomados do checkpoint")
+    rows = [row for row in rows if row["content_hash"] not in inserted]
+
+    # 6. Insere os novos e só então remove os que sumiram (a conta nunca fica vazia)
+    insert_into_supabase(
+        ctx.supabase, args.table, rows,
+        max_batch_mb=args.insert_batch_mb,
+        concurrency=args.insert_concurrency,
+        on_batch_done=journal.record_inserted
+    )
+    journal.mark_step("inserted")
+    delete_rows(ctx.supabase, args.table, stale_ids)
+    journal.mark_step("deleted")
+
+    # 7. Exporta XML
+    faq_response = FAQResponse(faq_items=state.faq_items)
+    state.xml_path = export_to_xml(
+        faq_response, id_conta, state.tracker,
+        state.input_path, args.table,
+        output_dir=args.output_xml
+    )
+
+    # Estatísticas por categoria
+    for faq in state.faq_items:
+        state.categories[faq.category] = state.categories.get(faq.category, 0) + 1
+
+    # 8. Exporta relatório de custos
+    state.cost_path = export_cost_report(
+        state.tracker, id_conta, state.input_path, args.table,
+        len(state.faq_items), state.categories,
+        output_dir=args.output_xml,
+        dedup_removed=state.dedup_removed
+    )
+
+    state.new_items, state.unchanged, state.removed = len(new_items), unchanged, len(stale_ids)
+    if rows or stale_ids:
+        # Caches de consulta do agent_rag (em qualquer processo) deixam de valer
+        touch_ingestion_stamp()
+    journal.complete()
+    return state
+
+
+def print_file_stats(state: FileIngestion, args: argparse.Namespace) -> None:
+    """Imprime as estatísticas de um arquivo ingerido."""
+    print(f"\nEstatisticas:")
+    print(f"   - Arquivo processado: {state.input_path}")
+    print(f"   - ID_Conta: {state.id_conta}")
+    print(f"   - FAQs gerados: {len(state.faq_items)}")
+    print(f"   - Tabela: {args.table}")
+    print(f"   - Modo clear: {'Sim' if args.clear else 'Nao'}")
+    print(f"   - Novos/alterados: {state.new_items} | Inalterados: {state.unchanged} | Removidos: {state.removed}")
+    print(f"   - Duplicatas fundidas: {state.dedup_removed}")
+    print(f"   - XML gerado: {state.xml_path}")
+    print(f"   - Relatório de custos: {state.cost_path}")
+
+    print(f"\nFAQs por categoria:")
+    for category, count in sorted(state.categories.items(), key=lambda x: x[1], reverse=True):
+        print(f"   - {category}: {count}")
+
+
+def print_failure(input_path: str, error: Exception) -> None:
+    print("\n" + "=" * 80)
+    print(f"ERRO NA INGESTAO: {input_path}")
+    print("=" * 80)
+    print(f"\n{type(error).__name__}: {error}")
+    print("\nProgresso salvo. Rode novamente com --resume para continuar de onde parou.")
+
+
 def main():
     """Função principal do script."""
     # Parse de argumentos
@@ -741,8 +1616,9 @@ def main():
     parser.add_argument(
         "--input",
         type=str,
+        nargs="+",
         required=True,
-        help="Caminho do arquivo Markdown a processar"
+        help="Arquivos Markdown, pastas (todos os .md) ou padrões glob a processar"
     )
     parser.add_argument(
         "--table",
@@ -753,7 +1629,87 @@ def main():
     parser.add_argument(
         "--clear",
         action="store_true",
-        help="Limpar a tabela antes de inserir novos dados"
+        help="Remover todos os FAQs do ID_Conta antes de inserir (reconstrução completa da conta)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_LLM_CONCURRENCY,
+        help=f"Chunks enviados ao LLM em paralelo (padrão: {DEFAULT_LLM_CONCURRENCY}, env FAQ_LLM_CONCURRENCY)"
+    )
+    parser.add_argument(
+        "--chunk-input-tokens",
+        type=int,
+        default=DEFAULT_CHUNK_INPUT_TOKENS,
+        help=f"Orçamento de tokens de conteúdo por chunk (padrão: {DEFAULT_CHUNK_INPUT_TOKENS:,})"
+    )
+    parser.add_argument(
+        "--chunk-output-tokens",
+        type=int,
+        default=DEFAULT_CHUNK_OUTPUT_TOKENS,
+        help=f"Orçamento de tokens de saída (JSON) por chunk (padrão: {DEFAULT_CHUNK_OUTPUT_TOKENS:,})"
+    )
+    parser.add_argument(
+        "--embed-batch-size",
+        type=int,
+        default=DEFAULT_EMBED_BATCH_SIZE,
+        help=f"Textos por chamada de embeddings (padrão: {DEFAULT_EMBED_BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--embed-concurrency",
+        type=int,
+        default=DEFAULT_EMBED_CONCURRENCY,
+        help=f"Lotes de embeddings em paralelo (padrão: {DEFAULT_EMBED_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--exact-embedding-tokens",
+        action="store_true",
+        help="Conta os tokens de embeddings pela API (count_tokens) em vez de estimar"
+    )
+    parser.add_argument(
+        "--insert-batch-mb",
+        type=float,
+        default=DEFAULT_INSERT_BATCH_MB,
+        help=f"Tamanho máximo (MB) de cada lote enviado ao Supabase (padrão: {DEFAULT_INSERT_BATCH_MB})"
+    )
+    parser.add_argument(
+        "--insert-concurrency",
+        type=int,
+        default=DEFAULT_INSERT_CONCURRENCY,
+        help=f"Lotes enviados ao Supabase em paralelo (padrão: {DEFAULT_INSERT_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=DEFAULT_DEDUP_THRESHOLD,
+        help=f"Similaridade de cosseno a partir da qual FAQs são fundidos (padrão: {DEFAULT_DEDUP_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="Desativa a deduplicação de FAQs por similaridade"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continua a última execução interrompida deste arquivo a partir do checkpoint"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignora os caches de chunks do LLM e de embeddings (reprocessa tudo)"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=str(DEFAULT_CACHE_DIR),
+        help="Pasta do cache de chunks do LLM (padrão: .cache/llm_chunks ao lado do script)"
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_CACHE_MAX_MB,
+        help=f"Tamanho máximo do cache de chunks em MB (padrão: {DEFAULT_CACHE_MAX_MB})"
     )
     parser.add_argument(
         "--output-xml",
@@ -782,6 +1738,7 @@ def main():
     llm = ChatGoogleGenerativeAI(
         model="gemini-2.5-flash",
         temperature=0,  # Determinístico para extração estruturada
+        max_retries=0,  # os retries ficam a cargo do call_with_retries (com o RateLimitGate compartilhado)
     )
     
     embeddings = GoogleGenerativeAIEmbeddings(
@@ -791,72 +1748,79 @@ def main():
     # Conecta ao Supabase
     supabase: Client = create_client(supabase_url, supabase_key)
     
-    # Inicializa o tracker de tokens
-    tracker = TokenUsageTracker()
+    # Caches de chunks do LLM e de embeddings
+    llm_cache = None
+    embedding_cache = None
+    if not args.no_cache:
+        llm_cache = FAQChunkCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+        embedding_cache = EmbeddingCache(DEFAULT_EMBEDDING_CACHE_PATH)
+
+    ctx = IngestionContext(args, llm, embeddings, supabase, llm_cache, embedding_cache)
+
+    input_files = resolve_input_files(args.input)
+    if not input_files:
+        raise FileNotFoundError(f"Nenhum arquivo Markdown encontrado em: {' '.join(args.input)}")
+    check_unique_id_contas(input_files)
     
-    print("Sistema configurado!")
+    print(f"Sistema configurado! {len(input_files)} arquivo(s) para ingerir.")
+
+    # Diários de execuções concluídas ou abandonadas são descartados
+    gc_runs(DEFAULT_RUNS_DIR)
     
-    # Pipeline de ingestão
-    try:
-        id_conta = derive_id_conta(args.input)
-        print(f"\nID_Conta derivado do arquivo: {id_conta}")
+    # Pipeline de ingestão: enquanto um arquivo é gravado (embeddings + Supabase) em uma thread
+    # dedicada, o próximo já está sendo extraído pelo LLM
+    results: List[FileIngestion] = []
+    failures: List[Tuple[str, Exception]] = []
 
-        # 1. Carrega o arquivo Markdown
-        content = load_markdown_file(args.input)
-        
-        # 2. Processa com LLM
-        faq_response = process_with_llm(content, llm, tracker)
-        
-        # 3. Gera embeddings
-        rows = generate_embeddings_for_faqs(faq_response.faq_items, embeddings, id_conta, tracker)
-        
-        # 4. Insere no Supabase
-        insert_into_supabase(supabase, args.table, rows, clear_before=args.clear)
-        
-        # 5. Exporta XML
-        xml_path = export_to_xml(
-            faq_response, id_conta, tracker,
-            args.input, args.table,
-            output_dir=args.output_xml
-        )
-        
-        # Estatísticas por categoria
-        categories = {}
-        for faq in faq_response.faq_items:
-            categories[faq.category] = categories.get(faq.category, 0) + 1
-        
-        # 6. Exporta relatório de custos
-        cost_path = export_cost_report(
-            tracker, id_conta, args.input, args.table,
-            len(faq_response.faq_items), categories,
-            output_dir=args.output_xml
-        )
-        
+    def collect(input_path: str, future: concurrent.futures.Future) -> None:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            print_failure(input_path, e)
+            failures.append((input_path, e))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as writer:
+        pending = None
+        for input_path in input_files:
+            try:
+                state = extract_file(ctx, input_path)
+            except Exception as e:
+                print_failure(input_path, e)
+                failures.append((input_path, e))
+                continue
+            if pending:
+                collect(*pending)
+            pending = (input_path, writer.submit(store_file, ctx, state))
+        if pending:
+            collect(*pending)
+
+    if embedding_cache is not None:
+        embedding_cache.close()
+
+    if len(input_files) == 1:
+        if failures:
+            raise failures[0][1]
         print("\n" + "=" * 80)
         print("INGESTAO CONCLUIDA COM SUCESSO!")
         print("=" * 80)
-        print(f"\nEstatisticas:")
-        print(f"   - Arquivo processado: {args.input}")
-        print(f"   - ID_Conta: {id_conta}")
-        print(f"   - FAQs gerados: {len(faq_response.faq_items)}")
-        print(f"   - Tabela: {args.table}")
-        print(f"   - Modo clear: {'Sim' if args.clear else 'Nao'}")
-        print(f"   - XML gerado: {xml_path}")
-        print(f"   - Relatório de custos: {cost_path}")
-        
-        print(f"\nFAQs por categoria:")
-        for category, count in sorted(categories.items(), key=lambda x: x[1], reverse=True):
-            print(f"   - {category}: {count}")
-        
+        print_file_stats(results[0], args)
         # Imprime resumo de uso de tokens e custos
-        tracker.print_summary()
-        
-    except Exception as e:
-        print("\n" + "=" * 80)
-        print("ERRO NA INGESTAO")
-        print("=" * 80)
-        print(f"\n{type(e).__name__}: {e}")
-        raise
+        results[0].tracker.print_summary()
+        return
+
+    print("\n" + "=" * 80)
+    print(f"INGESTAO EM LOTE CONCLUIDA: {len(results)} de {len(input_files)} arquivos")
+    print("=" * 80)
+    for state in results:
+        print(f"   - {state.id_conta}: {len(state.faq_items)} FAQs | {state.new_items} novos | "
+              f"{state.unchanged} inalterados | {state.removed} removidos")
+    for input_path, error in failures:
+        print(f"   - {input_path}: ERRO ({type(error).__name__})")
+    export_batch_cost_report(results, failures, args.table, output_dir=args.output_xml)
+    TokenUsageTracker.combine([state.tracker for state in results], [state.id_conta for state in results]).print_summary()
+
+    if failures:
+        raise RuntimeError(f"{len(failures)} de {len(input_files)} arquivos falharam na ingestao")
 
 
 if __name__ == "__main__":
@@ -1,12 +1,17 @@
 from dotenv import load_dotenv
 import os
-from typing import TypedDict, Annotated, Sequence
+import time
+import argparse
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import TypedDict, Annotated, Sequence, Iterator, Dict, Any
 from operator import add as add_messages
 
 
 # LangChain & LangGraph Imports
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, ToolMessage
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, ToolMessage, AIMessageChunk
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.document_loaders import TextLoader
@@ -15,149 +20,66 @@ from langchain_community.vectorstores import SupabaseVectorStore
 from supabase.client import Client, create_client
 from langchain_core.tools import tool
 
+from retrieval_cache import (
+    LRUTTLCache,
+    CachedEmbeddings,
+    CachedRetriever,
+    IngestionStamp,
+    touch_ingestion_stamp,
+    QUERY_CACHE_TTL,
+    QUERY_CACHE_MAX_ITEMS,
+    RESULTS_CACHE_TTL,
+    RESULTS_CACHE_MAX_ITEMS,
+)
+from hybrid_search import HybridRetriever, LexicalIndexProvider, supabase_documents
+from rerank import RerankRetriever, compact_snippet
+from memory import ConversationMemory, estimate_tokens, message_text
+
 
 # Carrega variáveis de ambiente
 load_dotenv()
 
 
 # --- CONFIGURAÇÃO INICIAL ---
-
-
-# Configuração do LLM (Usando Gemini 1.5 Flash para velocidade/custo)
-llm = ChatGoogleGenerativeAI(model="gemini-3-flash-preview", temperature=0)
-
-
-# Configuração dos embeddings (Fixando 768 para bater com o banco)
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="models/gemini-embedding-001"
-)
-
-
-# Configuração do Supabase
-supabase_url = os.environ.get("SUPABASE_URL")
-supabase_key = os.environ.get("SUPABASE_SERVICE_KEY")
-
-
-if not supabase_url or not supabase_key:
-    raise ValueError("SUPABASE_URL e SUPABASE_SERVICE_KEY devem estar definidos no.env")
-
-
-supabase: Client = create_client(supabase_url, supabase_key)
-
-
-# --- INGESTÃO DE DADOS (Markdown) ---
-# Nota: Em produção, isso seria um script separado para não re-inserir dados a cada execução.
-
-
-markdown_path = "plantie.md"
-
-
-if not os.path.exists(markdown_path):
-    # Cria um arquivo dummy se não existir para o código não quebrar
-    print(f"⚠️ Aviso: {markdown_path} não encontrado. Criando arquivo de exemplo...")
-    with open(markdown_path, "w", encoding="utf-8") as f:
-        f.write("# Plantie Platform\n\nA Plantie é uma solução de IoT para monitoramento de plantas...")
-
-
-markdown_loader = TextLoader(markdown_path, encoding="utf-8")
-
-
-try:
-    documents = markdown_loader.load()
-    print(f"📄 Markdown carregado! {len(documents)} documento(s).")
-except Exception as e:
-    print(f"❌ Erro ao carregar Markdown: {e}")
-    raise
-
-
-# Chunking (Estratégia Otimizada para FAQs)
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200,
-    separators=["\n## ", "\n### ", "\n", " ", ""] # Tenta quebrar por cabeçalhos primeiro
-)
-
-
-pages_split = text_splitter.split_documents(documents)
-
-
-# Inserção manual para deixar o Supabase gerar o ID sozinho
-try:
-    # Gera embeddings para todos os chunks
-    texts = [doc.page_content for doc in pages_split]
-    metadatas = [doc.metadata for doc in pages_split]
-    vectors = embeddings.embed_documents(texts)
-    
-    rows = []
-    for i in range(len(texts)):
-        rows.append({
-            "content": texts[i],
-            "metadata": metadatas[i],
-            "embedding": vectors[i]
-        })
-    
-    # Insere no Supabase sem enviar a coluna 'id'
-    supabase.table("marketing_rag").insert(rows).execute()
-    print(f"✅ Dados inseridos com sucesso! {len(rows)} chunks.")
-    
-    vectorstore = SupabaseVectorStore(
-        embedding=embeddings,
-        client=supabase,
-        table_name="marketing_rag",
-        query_name="match_documents"
-    )
-except Exception as e:
-    print(f"⚠️ Aviso: Erro na inserção ou dados já existentes: {str(e)}")
-    vectorstore = SupabaseVectorStore(
-        embedding=embeddings,
-        client=supabase,
-        table_name="marketing_rag",
-        query_name="match_documents",        
-        chunk_size=3072
-    )
-
-
-retriever = vectorstore.as_retriever(
-    search_type="similarity",
-    search_kwargs={"k": 4} # Retorna os top 4 chunks mais relevantes
-)
-
-
-# --- DEFINIÇÃO DAS FERRAMENTAS ---
-
-
-@tool
-def retriever_tool(query: str) -> str:
-    """
-    Use esta ferramenta para buscar informações oficiais sobre a Plantie.
-    Sempre que o usuário fizer uma pergunta sobre funcionalidades, preços ou suporte,
-    você DEVE usar esta ferramenta antes de responder.
-    """
-    print(f"🔎 Buscando no banco de dados: '{query}'")
-    docs = retriever.invoke(query)
-
-
-    if not docs:
-        return "Nenhuma informação relevante encontrada na base de conhecimento."
-   
-    results = []
-    for i, doc in enumerate(docs):
-        # Adiciona o conteúdo e a fonte (metadata) para o LLM saber de onde veio
-        source = doc.metadata.get('source', 'Desconhecido')
-        results.append(f"--- Trecho {i+1} (Fonte: {source}) ---\n{doc.page_content}\n")
-   
-    return "\n".join(results)
-
-
-tools = [retriever_tool]
-llm_with_tools = llm.bind_tools(tools)
+# Nada aqui faz I/O: LLM, embeddings, Supabase e retriever só são criados
+# no primeiro uso (ver RAGAgent). Importar o módulo é instantâneo.
+
+
+# LLM (Gemini Flash para velocidade/custo)
+LLM_MODEL = "gemini-3-flash-preview"
+# Embeddings (Fixando 768 para bater com o banco)
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+
+TABLE_NAME = "marketing_rag"
+QUERY_NAME = "match_documents"
+RETRIEVER_K = 4  # Retorna os top 4 chunks mais relevantes
+DEFAULT_MARKDOWN_PATH = "plantie.md"
+
+# Backend do retriever: "supabase" (RPC match_documents) ou "local" (índice em disco, ver local_index.py)
+RAG_BACKEND = os.environ.get("RAG_BACKEND", "supabase").lower()
+RAG_LOCAL_INDEX_DIR = os.environ.get("RAG_LOCAL_INDEX_DIR") or None
+RAG_LOCAL_NPROBE = int(os.environ.get("RAG_LOCAL_NPROBE", "0")) or None  # 0 = busca exata
+RAG_ID_CONTA = os.environ.get("RAG_ID_CONTA") or None  # restringe a busca a uma conta
+RAG_CATEGORY = os.environ.get("RAG_CATEGORY") or None    # pré-filtros opcionais do metadata
+RAG_AUDIENCE = os.environ.get("RAG_AUDIENCE") or None
+# Função com filtro aplicado dentro da busca (sql/002_match_faqs.sql)
+FILTERED_QUERY_NAME = "match_faqs"
+# Busca híbrida: BM25 sobre pergunta/variações/tags + vetorial, fundidos por RRF
+RAG_HYBRID = os.environ.get("RAG_HYBRID", "1").lower() not in ("0", "false", "no")
+RAG_FETCH_K = int(os.environ.get("RAG_FETCH_K", "12"))  # candidatos de cada lista antes da fusão
+# Rerank local: busca RAG_RERANK_N candidatos e entrega ao LLM só os melhores (até RETRIEVER_K)
+RAG_RERANK = os.environ.get("RAG_RERANK", "1").lower() not in ("0", "false", "no")
+RAG_RERANK_N = int(os.environ.get("RAG_RERANK_N", "12"))
+# Ferramentas pedidas no mesmo passo rodam em paralelo (pool limitado), cada uma com tempo máximo
+RAG_TOOL_WORKERS = int(os.environ.get("RAG_TOOL_WORKERS", "4"))
+RAG_TOOL_TIMEOUT = float(os.environ.get("RAG_TOOL_TIMEOUT", "30"))
 
 
 # --- O SYSTEM PROMPT (ADAPTADO DO META-AGENTE) ---
 
 
 # Aqui aplicamos a lógica que pesquisamos: Persona + Regras de RAG + Tom de Voz
-system_prompt = """
+SYSTEM_PROMPT = """
 # IDENTITY & ROLE
 Você é o **Plantie AI Specialist**, o assistente virtual oficial da plataforma Plantie.
 Sua missão é ajudar clientes a entenderem, comprarem e utilizarem nossa solução de monitoramento de plantas via IoT.
@@ -187,117 +109,638 @@ Você NÃO possui conhecimento inato sobre os detalhes técnicos atuais da Plant
 """
 
 
-# --- GRAFO DO AGENTE (LANGGRAPH) ---
+# --- INICIALIZAÇÃO PREGUIÇOSA ---
+
+
+def lazy_property(fn):
+    """
+    Como functools.cached_property, mas com lock: cada recurso é criado
+    uma única vez mesmo que várias threads o peçam ao mesmo tempo.
+    """
+    name = fn.__name__
+
+    def getter(self):
+        if name not in self.__dict__:
+            with self._init_lock:
+                if name not in self.__dict__:
+                    self.__dict__[name] = fn(self)
+        return self.__dict__[name]
+
+    getter.__doc__ = fn.__doc__
+    return property(getter)
 
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
 
 
-def call_llm(state: AgentState):
-    """Nó que chama o LLM"""
-    messages = state['messages']
-    # Injeta o System Prompt no início, mas mantendo o histórico
-    # Nota: Em modelos de chat, o SystemMessage deve ser o primeiro.
-    if not isinstance(messages, SystemMessage):
-        messages = + messages
-   
-    response = llm_with_tools.invoke(messages)
-    return {'messages': [response]}
-
-
-def take_action(state: AgentState):
-    """Nó que executa as ferramentas"""
-    last_message = state['messages'][-1]
-    tool_calls = last_message.tool_calls
-   
-    results = []
-    tools_dict = {t.name: t for t in tools}
-
-
-    for t in tool_calls:
-        print(f"⚙️ Executando ferramenta: {t['name']}")
-        if t['name'] in tools_dict:
-            # Executa a tool
-            tool_result = tools_dict[t['name']].invoke(t['args'])
-           
-            # Cria a mensagem de resposta da tool
+class RAGAgent:
+    """
+    Agente RAG (LangGraph) com todos os recursos criados sob demanda.
+    Use `create_agent()` / `get_agent()` em vez de instanciar diretamente.
+    """
+
+    def __init__(
+        self,
+        table_name: str = TABLE_NAME,
+        query_name: str = QUERY_NAME,
+        k: int = RETRIEVER_K,
+        system_prompt: str = SYSTEM_PROMPT,
+        backend: str = RAG_BACKEND,
+        id_conta: str = RAG_ID_CONTA,
+        category: str = RAG_CATEGORY,
+        audience: str = RAG_AUDIENCE,
+        hybrid: bool = RAG_HYBRID,
+        fetch_k: int = RAG_FETCH_K,
+        rerank: bool = RAG_RERANK,
+        rerank_n: int = RAG_RERANK_N,
+        tool_workers: int = RAG_TOOL_WORKERS,
+        tool_timeout: float = RAG_TOOL_TIMEOUT,
+        **resources
+    ):
+        """`resources` substitui recursos preguiçosos (ex.: embeddings=... em testes offline)."""
+        if backend not in ("supabase", "local"):
+            raise ValueError(f"Backend de RAG inválido: '{backend}' (use 'supabase' ou 'local')")
+        self.table_name = table_name
+        self.query_name = query_name
+        self.k = k
+        self.system_prompt = system_prompt
+        self.backend = backend
+        self.id_conta = id_conta
+        # Filtros empurrados para dentro da busca (não é pós-filtro do top-k)
+        self.metadata_filters = {
+            field: value
+            for field, value in (("category", category), ("audience", audience))
+            if value
+        }
+        self.hybrid = hybrid
+        self.rerank = rerank
+        # Quantos candidatos o retriever base devolve (o rerank reduz para k)
+        self.candidates_k = max(rerank_n, k) if rerank else k
+        self.fetch_k = max(fetch_k, self.candidates_k)
+        self.tool_workers = max(1, tool_workers)
+        self.tool_timeout = tool_timeout
+        self._tool_metrics = {}
+        self._metrics_lock = threading.Lock()
+        self._init_lock = threading.RLock()
+        self.__dict__.update(resources)
+
+    @lazy_property
+    def llm(self) -> ChatGoogleGenerativeAI:
+        return ChatGoogleGenerativeAI(model=LLM_MODEL, temperature=0)
+
+    @lazy_property
+    def embeddings(self) -> GoogleGenerativeAIEmbeddings:
+        return GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+
+    @lazy_property
+    def supabase(self) -> Client:
+        supabase_url = os.environ.get("SUPABASE_URL")
+        supabase_key = os.environ.get("SUPABASE_SERVICE_KEY")
+        if not supabase_url or not supabase_key:
+            raise ValueError("SUPABASE_URL e SUPABASE_SERVICE_KEY devem estar definidos no.env")
+        return create_client(supabase_url, supabase_key)
+
+    @lazy_property
+    def query_embeddings(self) -> CachedEmbeddings:
+        """Embeddings com cache das consultas (a mesma busca não volta à API do Gemini)."""
+        return CachedEmbeddings(self.embeddings, LRUTTLCache(QUERY_CACHE_TTL, QUERY_CACHE_MAX_ITEMS))
+
+    @lazy_property
+    def results_cache(self) -> LRUTTLCache:
+        return LRUTTLCache(RESULTS_CACHE_TTL, RESULTS_CACHE_MAX_ITEMS)
+
+    @property
+    def search_filter(self):
+        """Filtro enviado ao Supabase: ID_Conta + category/audience."""
+        scope = {"ID_Conta": self.id_conta} if self.id_conta else {}
+        return {**scope, **self.metadata_filters}
+
+    @lazy_property
+    def vectorstore(self) -> SupabaseVectorStore:
+        return SupabaseVectorStore(
+            embedding=self.query_embeddings,
+            client=self.supabase,
+            table_name=self.table_name,
+            # Com escopo, a busca só compara as linhas da conta (índice por ID_Conta)
+            query_name=FILTERED_QUERY_NAME if self.search_filter else self.query_name,
+            chunk_size=3072
+        )
+
+    @lazy_property
+    def local_index(self):
+        # Import tardio: o backend supabase não precisa do NumPy
+        from local_index import LocalVectorIndex, DEFAULT_INDEX_DIR
+        return LocalVectorIndex(RAG_LOCAL_INDEX_DIR or DEFAULT_INDEX_DIR)
+
+    @lazy_property
+    def vector_retriever(self):
+        # Na busca híbrida, cada lista traz `fetch_k` candidatos para a fusão
+        k = self.fetch_k if self.hybrid else self.candidates_k
+        if self.backend == "local":
+            from local_index import LocalIndexRetriever
+            return LocalIndexRetriever(
+                index=self.local_index,
+                embeddings=self.query_embeddings,
+                k=k,
+                id_conta=self.id_conta,
+                nprobe=RAG_LOCAL_NPROBE,
+                filters=self.metadata_filters or None
+            )
+        search_kwargs = {"k": k}
+        if self.search_filter:
+            search_kwargs["filter"] = self.search_filter
+        return self.vectorstore.as_retriever(
+            search_type="similarity",
+            search_kwargs=search_kwargs
+        )
+
+    @lazy_property
+    def lexical_index(self) -> LexicalIndexProvider:
+        """Índice BM25 da base, reconstruído a cada nova ingestão."""
+        if self.backend == "local":
+            from langchain_core.documents import Document
+
+            def load():
+                return [Document(page_content=d["content"], metadata=d["metadata"])
+                        for d in self.local_index.documents(self.id_conta, self.metadata_filters)]
+        else:
+            def load():
+                return supabase_documents(self.supabase, self.table_name, self.id_conta, self.metadata_filters)
+        return LexicalIndexProvider(load)
+
+    @lazy_property
+    def base_retriever(self):
+        if not self.hybrid:
+            return self.vector_retriever
+        return HybridRetriever(
+            vector_retriever=self.vector_retriever,
+            lexical=self.lexical_index,
+            k=self.candidates_k,
+            fetch_k=self.fetch_k,
+            id_conta=self.id_conta,
+            filters=self.metadata_filters or None
+        )
+
+    @lazy_property
+    def reranked_retriever(self):
+        if not self.rerank:
+            return self.base_retriever
+        return RerankRetriever(retriever=self.base_retriever, k=self.k)
+
+    @lazy_property
+    def retriever(self):
+        """Retriever com cache de resultados, descartado a cada nova ingestão."""
+        return CachedRetriever(
+            retriever=self.reranked_retriever,
+            embeddings=self.query_embeddings,
+            cache=self.results_cache,
+            stamp=IngestionStamp(),
+            id_conta=self.id_conta,
+            filters=self.metadata_filters or None,
+            k=self.k
+        )
+
+    def tool_stats(self):
+        """Por ferramenta: chamadas, erros, timeouts e tempo total/médio/máximo (ms)."""
+        with self._metrics_lock:
+            return {
+                name: {**m, "avg_ms": m["total_ms"] / m["calls"] if m["calls"] else 0.0}
+                for name, m in self._tool_metrics.items()
+            }
+
+    def _record_tool(self, name: str, elapsed_ms: float, outcome: str) -> None:
+        with self._metrics_lock:
+            m = self._tool_metrics.setdefault(
+                name, {"calls": 0, "errors": 0, "timeouts": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            m["calls"] += 1
+            m["total_ms"] += elapsed_ms
+            m["max_ms"] = max(m["max_ms"], elapsed_ms)
+            if outcome == "error":
+                m["errors"] += 1
+            elif outcome == "timeout":
+                m["timeouts"] += 1
+
+    def cache_stats(self):
+        """Taxa de acerto dos caches de embeddings de consulta e de resultados."""
+        return {
+            "query_embeddings": self.query_embeddings.cache.stats(),
+            "results": self.results_cache.stats(),
+        }
+
+    @lazy_property
+    def tools(self):
+        return [self._build_retriever_tool()]
+
+    @lazy_property
+    def tools_dict(self):
+        return {t.name: t for t in self.tools}
+
+    @lazy_property
+    def tool_executor(self) -> ThreadPoolExecutor:
+        """Pool das ferramentas, criado uma vez e compartilhado pelos passos do grafo."""
+        return ThreadPoolExecutor(max_workers=self.tool_workers, thread_name_prefix="rag-tool")
+
+    @lazy_property
+    def llm_with_tools(self):
+        return self.llm.bind_tools(self.tools)
+
+    @lazy_property
+    def graph(self):
+        return self._build_graph()
+
+    def warmup(self) -> None:
+        """Cria LLM, embeddings, Supabase e retriever agora (ex.: em segundo plano na subida)."""
+        self.llm_with_tools
+        self.retriever
+        if self.hybrid:
+            self.lexical_index.get()
+
+    # --- DEFINIÇÃO DAS FERRAMENTAS ---
+
+    def _build_retriever_tool(self):
+        agent = self
+
+        @tool
+        def retriever_tool(query: str) -> str:
+            """
+            Use esta ferramenta para buscar informações oficiais sobre a Plantie.
+            Sempre que o usuário fizer uma pergunta sobre funcionalidades, preços ou suporte,
+            você DEVE usar esta ferramenta antes de responder.
+            """
+            print(f"🔎 Buscando no banco de dados: '{query}'")
+            docs = agent.retriever.invoke(query)
+
+            if not docs:
+                return "Nenhuma informação relevante encontrada na base de conhecimento."
+
+            results = []
+            for i, doc in enumerate(docs):
+                # Adiciona o conteúdo e a fonte (metadata) para o LLM saber de onde veio
+                source = doc.metadata.get('source') or doc.metadata.get('category') or 'Desconhecido'
+                # FAQs viram trechos compactos; chunks de texto comum passam inteiros
+                text = compact_snippet(doc) if agent.rerank else doc.page_content
+                results.append(f"--- Trecho {i+1} (Fonte: {source}) ---\n{text}\n")
+
+            return "\n".join(results)
+
+        return retriever_tool
+
+    # --- GRAFO DO AGENTE (LANGGRAPH) ---
+
+    def call_llm(self, state: AgentState):
+        """Nó que chama o LLM"""
+        messages = list(state['messages'])
+        # Injeta o System Prompt no início, mas mantendo o histórico
+        # Nota: Em modelos de chat, o SystemMessage deve ser o primeiro (e único):
+        # o resumo da memória, se houver, é anexado ao prompt.
+        system_parts = [self.system_prompt]
+        while messages and isinstance(messages[0], SystemMessage):
+            system_parts.append(message_text(messages.pop(0)))
+        messages = [SystemMessage(content="\n\n".join(system_parts))] + messages
+
+        response = self.llm_with_tools.invoke(messages)
+        return {'messages': [response]}
+
+    def _run_tool(self, call):
+        """Executa uma chamada de ferramenta (no pool); retorna (conteúdo, erro, duração em ms)."""
+        start = time.perf_counter()
+        try:
+            content, error = str(self.tools_dict[call['name']].invoke(call['args'])), None
+        except Exception as e:
+            content, error = None, e
+        return content, error, (time.perf_counter() - start) * 1000
+
+    def take_action(self, state: AgentState):
+        """
+        Nó que executa as ferramentas.
+        As chamadas do mesmo passo rodam em paralelo no pool; os ToolMessages
+        saem na mesma ordem das chamadas, e cada uma tem `tool_timeout` segundos.
+        """
+        last_message = state['messages'][-1]
+        tool_calls = last_message.tool_calls
+
+        started = time.perf_counter()
+        futures = []
+        for t in tool_calls:
+            print(f"⚙️ Executando ferramenta: {t['name']}")
+            if t['name'] in self.tools_dict:
+                futures.append(self.tool_executor.submit(self._run_tool, t))
+            else:
+                futures.append(None)
+
+        results = []
+        for t, future in zip(tool_calls, futures):
+            status = "success"
+            if future is None:
+                content = f"Erro: ferramenta '{t['name']}' não existe."
+                status = "error"
+            else:
+                # Todas começaram juntas: o prazo de cada uma conta a partir do início do passo
+                remaining = max(0.0, started + self.tool_timeout - time.perf_counter())
+                try:
+                    content, error, elapsed_ms = future.result(timeout=remaining)
+                except FutureTimeout:
+                    # A thread não é interrompida, mas o agente segue sem esperar por ela
+                    content = f"Erro: a ferramenta '{t['name']}' excedeu o tempo limite de {self.tool_timeout:.0f}s."
+                    error, elapsed_ms, status = None, self.tool_timeout * 1000, "timeout"
+                if error is not None:
+                    content = f"Erro ao executar a ferramenta '{t['name']}': {error}"
+                    status = "error"
+                self._record_tool(t['name'], elapsed_ms, status)
+
+            # Toda chamada recebe resposta (o modelo exige um ToolMessage por tool_call_id)
             results.append(ToolMessage(
                 tool_call_id=t['id'],
                 name=t['name'],
-                content=str(tool_result)
+                content=content,
+                status="success" if status == "success" else "error"
             ))
-   
-    return {'messages': results}
 
-
-def should_continue(state: AgentState):
-    """Decide se para ou continua para as ferramentas"""
-    last_message = state["messages"][-1]
-    if last_message.tool_calls:
-        return "retriever_agent"
-    return END
-
-
-# Construção do Grafo
-graph = StateGraph(AgentState)
-
-
-graph.add_node("llm", call_llm)
-graph.add_node("retriever_agent", take_action)
+        return {'messages': results}
+
+    @staticmethod
+    def should_continue(state: AgentState):
+        """Decide se para ou continua para as ferramentas"""
+        last_message = state["messages"][-1]
+        if last_message.tool_calls:
+            return "retriever_agent"
+        return END
+
+    def _build_graph(self):
+        graph = StateGraph(AgentState)
+
+        graph.add_node("llm", self.call_llm)
+        graph.add_node("retriever_agent", self.take_action)
+
+        graph.set_entry_point("llm")
+
+        graph.add_conditional_edges(
+            "llm",
+            self.should_continue,
+            {
+                "retriever_agent": "retriever_agent",
+                END: END
+            }
+        )
+
+        graph.add_edge("retriever_agent", "llm")
+
+        return graph.compile()
+
+    def invoke(self, messages: Sequence[BaseMessage]):
+        """Executa o grafo com o histórico de mensagens e retorna o estado final."""
+        return self.graph.invoke({"messages": list(messages)})
+
+    def create_memory(self, **kwargs) -> ConversationMemory:
+        """Memória de conversa limitada; o resumo dos turnos antigos usa o LLM sem ferramentas."""
+        kwargs.setdefault("llm", self.llm)
+        return ConversationMemory(**kwargs)
+
+    def chat(self, user_input: str, memory: ConversationMemory):
+        """
+        Um turno de conversa: envia resumo + janela recente + pergunta, registra o
+        turno na memória (sem os payloads das ferramentas) e retorna (resposta, contabilidade).
+        """
+        with memory.turn_lock:
+            history = memory.messages()
+            history_tokens = sum(estimate_tokens(message_text(m)) for m in history)
+            result = self.invoke(history + [HumanMessage(content=user_input)])
+            turn_messages = result['messages'][len(history):]
+            stats = memory.add_turn(turn_messages, history_tokens=history_tokens)
+        return turn_messages[-1], stats
+
+    # --- STREAMING ---
+
+    def stream(self, messages: Sequence[BaseMessage]) -> Iterator[Dict[str, Any]]:
+        """
+        Executa o grafo emitindo eventos à medida que acontecem:
+        - {"type": "token", "content": ...}             trecho da resposta gerado pelo LLM
+        - {"type": "tool_call", "name": ..., "args": ...} o LLM pediu uma ferramenta
+        - {"type": "tool_result", "name": ..., "chars": ...}
+        - {"type": "done", "message": AIMessage, "messages": [...], "ttft_ms": ..., "total_ms": ...}
+        `messages` do evento final são as mensagens novas do turno (na ordem do grafo).
+        """
+        start = time.perf_counter()
+        ttft_ms = None
+        new_messages = []
+        for mode, payload in self.graph.stream({"messages": list(messages)}, stream_mode=["messages", "updates"]):
+            if mode == "messages":
+                chunk, metadata = payload
+                # Só os tokens do nó do LLM (ToolMessages também passam por este modo)
+                if not isinstance(chunk, AIMessageChunk) or metadata.get("langgraph_node") != "llm":
+                    continue
+                text = message_text(chunk)
+                if text:
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - start) * 1000
+                    yield {"type": "token", "content": text}
+                continue
+
+            for node, update in payload.items():
+                for message in (update or {}).get("messages", []):
+                    new_messages.append(message)
+                    if node == "llm":
+                        for call in message.tool_calls or []:
+                            yield {"type": "tool_call", "name": call["name"], "args": call["args"]}
+                    elif isinstance(message, ToolMessage):
+                        yield {"type": "tool_result", "name": message.name, "chars": len(message_text(message))}
+
+        yield {
+            "type": "done",
+            "message": new_messages[-1] if new_messages else None,
+            "messages": new_messages,
+            "ttft_ms": ttft_ms,
+            "total_ms": (time.perf_counter() - start) * 1000,
+        }
+
+    def chat_stream(self, user_input: str, memory: ConversationMemory) -> Iterator[Dict[str, Any]]:
+        """
+        Como `chat`, mas em streaming; o evento "done" traz também a contabilidade do turno.
+        O turno inteiro segura `memory.turn_lock` (liberado também se o consumidor abandonar o gerador).
+        """
+        with memory.turn_lock:
+            history = memory.messages()
+            history_tokens = sum(estimate_tokens(message_text(m)) for m in history)
+            question = HumanMessage(content=user_input)
+            for event in self.stream(history + [question]):
+                if event["type"] == "done":
+                    event["stats"] = memory.add_turn([question] + event["messages"], history_tokens=history_tokens)
+                yield event
+
+
+def create_agent(**kwargs) -> RAGAgent:
+    """Cria um novo agente (nenhum cliente é criado até o primeiro uso)."""
+    return RAGAgent(**kwargs)
+
+
+@lru_cache(maxsize=1)
+def get_agent() -> RAGAgent:
+    """Agente padrão compartilhado pelo processo."""
+    return create_agent()
+
+
+@lru_cache(maxsize=256)
+def get_account_agent(id_conta: str) -> RAGAgent:
+    """
+    Agente com busca restrita a uma conta (ex.: endpoint de chat da API).
+    Reaproveita LLM, embeddings, cliente Supabase, caches e o pool de ferramentas do agente padrão.
+    """
+    base = get_agent()
+    shared = {
+        "llm": base.llm,
+        "embeddings": base.embeddings,
+        "query_embeddings": base.query_embeddings,
+        "results_cache": base.results_cache,  # chave inclui o ID_Conta
+        # Um único pool (RAG_TOOL_WORKERS threads) para todas as contas, e não um por agente em cache
+        "tool_executor": base.tool_executor,
+    }
+    if base.backend == "local":
+        shared["local_index"] = base.local_index
+    else:
+        shared["supabase"] = base.supabase
+    return create_agent(id_conta=id_conta, **shared)
 
 
-graph.set_entry_point("llm")
+# --- INGESTÃO DE DADOS (Markdown) ---
+# Etapa explícita (python agent_rag.py --ingest plantie.md): não roda mais a cada execução.
 
 
-graph.add_conditional_edges(
-    "llm",
-    should_continue,
-    {
-        "retriever_agent": "retriever_agent",
-        END: END
-    }
-)
+def ingest_markdown(markdown_path: str = DEFAULT_MARKDOWN_PATH, agent: RAGAgent = None) -> int:
+    """
+    Carrega o Markdown, divide em chunks, gera embeddings e insere na tabela do agente.
+    Os chunks anteriores do mesmo arquivo são removidos antes, então reingerir não duplica.
+    Retorna a quantidade de chunks inseridos.
+    """
+    agent = agent or get_agent()
+
+    if not os.path.exists(markdown_path):
+        # Cria um arquivo dummy se não existir para o código não quebrar
+        print(f"⚠️ Aviso: {markdown_path} não encontrado. Criando arquivo de exemplo...")
+        with open(markdown_path, "w", encoding="utf-8") as f:
+            f.write("# Plantie Platform\n\nA Plantie é uma solução de IoT para monitoramento de plantas...")
+
+    markdown_loader = TextLoader(markdown_path, encoding="utf-8")
+
+    try:
+        documents = markdown_loader.load()
+        print(f"📄 Markdown carregado! {len(documents)} documento(s).")
+    except Exception as e:
+        print(f"❌ Erro ao carregar Markdown: {e}")
+        raise
+
+    # Chunking (Estratégia Otimizada para FAQs)
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        separators=["\n## ", "\n### ", "\n", " ", ""] # Tenta quebrar por cabeçalhos primeiro
+    )
 
+    pages_split = text_splitter.split_documents(documents)
 
-graph.add_edge("retriever_agent", "llm")
+    # Gera embeddings para todos os chunks
+    texts = [doc.page_content for doc in pages_split]
+    metadatas = [doc.metadata for doc in pages_split]
+    vectors = agent.embeddings.embed_documents(texts)
 
+    rows = []
+    for i in range(len(texts)):
+        rows.append({
+            "content": texts[i],
+            "metadata": metadatas[i],
+            "embedding": vectors[i]
+        })
 
-rag_agent = graph.compile()
+    # Remove a ingestão anterior do mesmo arquivo e insere sem enviar a coluna 'id'
+    # (o Supabase gera o ID sozinho)
+    table = agent.supabase.table(agent.table_name)
+    table.delete().eq("metadata->>source", markdown_path).execute()
+    table.insert(rows).execute()
+    touch_ingestion_stamp()
+    print(f"✅ Dados inseridos com sucesso! {len(rows)} chunks.")
+    return len(rows)
 
 
 # --- INTERFACE DE TERMINAL ---
 
 
-def running_agent():
+def stream_answer(agent: RAGAgent, user_input: str, memory: ConversationMemory):
+    """Imprime a resposta token a token (e as chamadas de ferramenta) e retorna a contabilidade do turno."""
+    started = False
+    stats = None
+    for event in agent.chat_stream(user_input, memory):
+        if event["type"] == "token":
+            if not started:
+                print("\nPlantie AI: ", end="", flush=True)
+                started = True
+            print(event["content"], end="", flush=True)
+        elif event["type"] == "tool_call" and started:
+            # Texto antes de uma chamada de ferramenta (o nó já imprime a execução): a resposta final vem depois
+            print()
+            started = False
+        elif event["type"] == "done":
+            stats = event["stats"]
+            if started:
+                print()
+            if event["ttft_ms"] is not None:
+                print(f"   ⏱️ Primeiro token em {event['ttft_ms']:.0f} ms | total {event['total_ms']:.0f} ms")
+    return stats
+
+
+def running_agent(agent: RAGAgent = None, stream: bool = True):
+    agent = agent or get_agent()
+
+    # Os clientes sobem em segundo plano enquanto o usuário digita a primeira pergunta
+    threading.Thread(target=agent.warmup, daemon=True).start()
+
     print("\n🌱 === PLANTIE AI AGENT (RAG SYSTEM) ===")
     print("Digite 'exit' para sair.\n")
-   
-    # Histórico local simples para o loop do terminal
-    chat_history = []
 
+    # Histórico limitado: janela recente + resumo dos turnos antigos (ver memory.py)
+    memory = agent.create_memory()
 
     while True:
         user_input = input("\nVocê: ")
         if user_input.lower() in ['exit', 'quit']:
             break
-       
-        # Adiciona mensagem do usuário ao estado
-        chat_history.append(HumanMessage(content=user_input))
-       
+
         # Invoca o agente
-        print("🤖 Pensando...")
-        result = rag_agent.invoke({"messages": chat_history})
-       
-        # Pega a resposta final
-        final_response = result['messages'][-1].content
-       
-        # Atualiza histórico com a resposta do assistente para manter contexto
-        chat_history.append(result['messages'][-1])
-       
-        print(f"\nPlantie AI: {final_response}")
+        if stream:
+            stats = stream_answer(agent, user_input, memory)
+        else:
+            print("🤖 Pensando...")
+            response, stats = agent.chat(user_input, memory)
+            print(f"\nPlantie AI: {response.content}")
+        print(f"   📊 Turno {stats.turn}: histórico ~{stats.history_tokens} tokens | "
+              f"LLM {stats.input_tokens} in / {stats.output_tokens} out ({stats.llm_calls} chamadas)")
+
+    totals = memory.totals()
+    if totals["turns"]:
+        print(f"\n📊 Conversa: {totals['turns']} turnos | "
+              f"{totals['input_tokens']} tokens de entrada / {totals['output_tokens']} de saída")
+    for name, m in agent.tool_stats().items():
+        print(f"🔧 {name}: {m['calls']} chamadas | média {m['avg_ms']:.0f} ms | máx {m['max_ms']:.0f} ms | "
+              f"{m['errors']} erros | {m['timeouts']} timeouts")
 
 
 if __name__ == "__main__":
-    running_agent()
+    parser = argparse.ArgumentParser(description="Agente RAG da Plantie")
+    parser.add_argument(
+        "--ingest",
+        nargs="?",
+        const=DEFAULT_MARKDOWN_PATH,
+        default=None,
+        help=f"Ingere um Markdown na base (padrão: {DEFAULT_MARKDOWN_PATH}) e sai"
+    )
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Espera a resposta completa em vez de exibi-la token a token"
+    )
+    args = parser.parse_args()
 
+    if args.ingest:
+        ingest_markdown(args.ingest)
+    else:
+        running_agent(stream=not args.no_stream)
@@ -0,0 +1,124 @@
+"""
+Escrita em lote no Supabase (PostgREST).
+Divide as linhas em lotes limitados por tamanho do corpo JSON, envia com concorrência
+limitada e refaz lotes que falharam. O envio é um upsert em ("ID_Conta", content_hash)
+ignorando duplicatas, então repetir um lote que chegou a ser gravado não duplica FAQs.
+
+O writer só usa `client.table(nome).upsert(rows, on_conflict=..., ignore_duplicates=True).execute()`,
+então funciona com qualquer cliente compatível, por exemplo o supabase-py apontando
+para um PostgREST local (SUPABASE_URL=http://localhost:54321, `supabase start`).
+Nos testes, `postgrest_stub.InMemoryPostgREST` faz o papel do servidor (upsert, 413 e falhas).
+"""
+
+import json
+import concurrent.futures
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from retry import RateLimitGate, call_with_retries
+
+
+DEFAULT_INSERT_BATCH_MB = 2.0
+DEFAULT_INSERT_BATCH_ROWS = 500
+DEFAULT_INSERT_CONCURRENCY = 3
+DEFAULT_ON_CONFLICT = "ID_Conta,content_hash"
+
+
+def vector_literal(vector: List[float]) -> str:
+    """Serializa o vetor no formato texto do pgvector ('[x,y,...]') com precisão de float32.
+
+    O pgvector guarda float32: os dígitos extras do float64 só aumentam o corpo da requisição.
+    """
+    return "[" + ",".join(f"{value:.8g}" for value in vector) + "]"
+
+
+@dataclass
+class BulkWriteResult:
+    rows: int = 0
+    batches: int = 0
+    splits: int = 0  # lotes divididos ao meio por payload grande demais
+
+
+def _is_payload_too_large(error: Exception) -> bool:
+    text = str(error).lower()
+    return "413" in text or "payload too large" in text or "request entity too large" in text
+
+
+class SupabaseBulkWriter:
+    """Insere linhas em lotes limitados por bytes e por quantidade de linhas."""
+
+    def __init__(
+        self,
+        client: Any,
+        table_name: str,
+        max_batch_bytes: int = int(DEFAULT_INSERT_BATCH_MB * 1024 * 1024),
+        max_batch_rows: int = DEFAULT_INSERT_BATCH_ROWS,
+        concurrency: int = DEFAULT_INSERT_CONCURRENCY,
+        on_conflict: str = DEFAULT_ON_CONFLICT,
+        compact_embeddings: bool = True
+    ):
+        self.client = client
+        self.table_name = table_name
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_rows = max_batch_rows
+        self.concurrency = max(1, concurrency)
+        self.on_conflict = on_conflict
+        self.compact_embeddings = compact_embeddings
+        self._gate = RateLimitGate()
+
+    def prepare_row(self, row: Dict) -> Dict:
+        """Compacta o embedding da linha (texto pgvector) antes do envio."""
+        if self.compact_embeddings and isinstance(row.get("embedding"), list):
+            return {**row, "embedding": vector_literal(row["embedding"])}
+        return row
+
+    def make_batches(self, rows: List[Dict]) -> List[List[Dict]]:
+        """Agrupa linhas consecutivas sem passar de `max_batch_bytes` nem `max_batch_rows`."""
+        batches, current, current_bytes = [], [], 2  # 2 = colchetes do array JSON
+        for row in rows:
+            row_bytes = len(json.dumps(row, ensure_ascii=False).encode("utf-8")) + 1
+            if current and (current_bytes + row_bytes > self.max_batch_bytes
+                            or len(current) >= self.max_batch_rows):
+                batches.append(current)
+                current, current_bytes = [], 2
+            current.append(row)
+            current_bytes += row_bytes
+        if current:
+            batches.append(current)
+        return batches
+
+    def send_batch(self, batch: List[Dict], label: str) -> int:
+        """Envia um lote com retry; se o servidor recusar pelo tamanho, divide ao meio."""
+        try:
+            call_with_retries(
+                lambda: self.client.table(self.table_name)
+                .upsert(batch, on_conflict=self.on_conflict, ignore_duplicates=True)
+                .execute(),
+                label,
+                self._gate
+            )
+            return 0
+        except Exception as e:
+            if len(batch) > 1 and _is_payload_too_large(e):
+                middle = len(batch) // 2
+                return 1 + self.send_batch(batch[:middle], f"{label}a") + self.send_batch(batch[middle:], f"{label}b")
+            raise
+
+    def write(self, rows: List[Dict], on_batch_done=None) -> BulkWriteResult:
+        """Envia todas as linhas. `on_batch_done(batch)` é chamado a cada lote confirmado."""
+        batches = self.make_batches([self.prepare_row(row) for row in rows])
+        result = BulkWriteResult(rows=len(rows), batches=len(batches))
+        if not batches:
+            return result
+
+        workers = min(self.concurrency, len(batches))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.send_batch, batch, f"[Insert {n}/{len(batches)}]"): batch
+                for n, batch in enumerate(batches, start=1)
+            }
+            for future in concurrent.futures.as_completed(futures):
+                result.splits += future.result()
+                if on_batch_done:
+                    on_batch_done(futures[future])
+        return result
@@ -0,0 +1,120 @@
+"""
+Deduplicação de FAQs por similaridade de embeddings.
+Páginas que se sobrepõem (home e "sobre", por exemplo) geram FAQs quase iguais;
+aqui eles são agrupados por similaridade de cosseno e fundidos em um único item.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from models import FAQItem
+
+
+DEFAULT_DEDUP_THRESHOLD = 0.95
+DEFAULT_BLOCK_SIZE = 1024  # linhas da matriz de similaridade calculadas por vez
+
+
+@dataclass
+class DedupStats:
+    input_items: int
+    output_items: int
+    clusters_merged: int
+
+    @property
+    def rows_saved(self) -> int:
+        return self.input_items - self.output_items
+
+
+def _merge_unique(lists: List[List[str]]) -> List[str]:
+    """União preservando a ordem, sem repetir (comparação sem diferenciar maiúsculas)."""
+    seen, merged = set(), []
+    for values in lists:
+        for value in values:
+            key = " ".join(value.lower().split())
+            if key not in seen:
+                seen.add(key)
+                merged.append(value)
+    return merged
+
+
+def merge_faqs(items: List[FAQItem]) -> FAQItem:
+    """Funde um grupo de FAQs: mantém o de maior confiança e une variações e tags."""
+    base = max(items, key=lambda faq: faq.confidence_score)  # empate: o primeiro
+    return base.model_copy(update={
+        "synthetic_variations": _merge_unique([base.synthetic_variations] + [f.synthetic_variations for f in items]),
+        "tags": _merge_unique([base.tags] + [f.tags for f in items]),
+        "confidence_score": max(f.confidence_score for f in items),
+    })
+
+
+def find_duplicate_clusters(
+    vectors: List[List[float]],
+    threshold: float = DEFAULT_DEDUP_THRESHOLD,
+    block_size: int = DEFAULT_BLOCK_SIZE
+) -> List[List[int]]:
+    """Agrupa índices cujos vetores têm similaridade de cosseno >= threshold.
+
+    Ligação completa: um item só entra em um grupo se for similar a TODOS os
+    membros (A~B e B~C não juntam A e C se A e C forem diferentes). Os itens
+    são visitados na ordem original e cada um entra no grupo compatível com
+    o vizinho mais similar, ou abre um grupo novo.
+
+    A matriz de similaridade é calculada em blocos de `block_size` linhas,
+    então a memória usada é O(block_size * n) e não O(n²).
+    """
+    n = len(vectors)
+    if n == 0:
+        return []
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1.0, norms)
+
+    # Vizinhos anteriores de cada item (j < i) com a similaridade
+    neighbors: List[Dict[int, float]] = [{} for _ in range(n)]
+    for start in range(0, n, block_size):
+        block = matrix[start:start + block_size]
+        similarities = block @ matrix[:start + len(block)].T
+        rows, cols = np.nonzero(similarities >= threshold)
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            i = start + row
+            if col < i:
+                neighbors[i][col] = float(similarities[row, col])
+
+    clusters: List[List[int]] = []
+    cluster_of = [-1] * n
+    for i in range(n):
+        joined = False
+        for j in sorted(neighbors[i], key=neighbors[i].get, reverse=True):
+            members = clusters[cluster_of[j]]
+            if all(m in neighbors[i] for m in members):
+                members.append(i)
+                cluster_of[i] = cluster_of[j]
+                joined = True
+                break
+        if not joined:
+            cluster_of[i] = len(clusters)
+            clusters.append([i])
+    return clusters
+
+
+def deduplicate_faqs(
+    items: List[FAQItem],
+    vectors: List[List[float]],
+    threshold: float = DEFAULT_DEDUP_THRESHOLD,
+    block_size: int = DEFAULT_BLOCK_SIZE
+) -> Tuple[List[FAQItem], DedupStats]:
+    """Remove FAQs quase duplicados, preservando a ordem da primeira ocorrência."""
+    clusters = find_duplicate_clusters(vectors, threshold, block_size)
+    deduped = [
+        items[members[0]] if len(members) == 1 else merge_faqs([items[i] for i in members])
+        for members in clusters
+    ]
+    stats = DedupStats(
+        input_items=len(items),
+        output_items=len(deduped),
+        clusters_merged=sum(1 for members in clusters if len(members) > 1),
+    )
+    return deduped, stats
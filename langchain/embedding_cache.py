@@ -0,0 +1,92 @@
+"""
+Cache persistente de vetores de embedding.
+A chave é o hash de (modelo + texto), então textos idênticos (mesma pergunta + resposta)
+nunca são enviados duas vezes à API de embeddings, nem entre execuções.
+"""
+
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, List, Iterable, Tuple
+
+
+DEFAULT_EMBEDDING_CACHE_PATH = Path(__file__).parent / ".cache" / "embeddings.sqlite3"
+DEFAULT_EMBEDDING_CACHE_MAX_ENTRIES = 200_000
+
+
+class EmbeddingCache:
+    """
+    Vetores guardados em SQLite como float32 (array 'f'), com remoção dos
+    menos usados recentemente quando passa de `max_entries`.
+    """
+
+    def __init__(self, path=DEFAULT_EMBEDDING_CACHE_PATH, max_entries: int = DEFAULT_EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            " key TEXT PRIMARY KEY,"
+            " dim INTEGER NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS vectors_last_used ON vectors (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, model: str) -> str:
+        """Hash do modelo + texto."""
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Retorna {key: vetor} para as chaves presentes no cache."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM vectors WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE vectors SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, List[float]]]) -> None:
+        """Grava vários vetores de uma vez."""
+        now = time.time()
+        rows = [(key, len(vector), array("f", vector).tobytes(), now) for key, vector in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors (key, dim, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM vectors WHERE key IN ("
+                    " SELECT key FROM vectors ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
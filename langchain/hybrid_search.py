@@ -0,0 +1,179 @@
+"""
+Busca híbrida do agent_rag: BM25 (índice invertido) sobre pergunta, variações
+sintéticas e tags dos FAQs, fundido com a busca vetorial por Reciprocal Rank
+Fusion. Consultas exatas (CNPJ, nomes de produto, "erro 500") acertam pelo
+lado lexical mesmo quando o embedding não as aproxima.
+"""
+
+import math
+import hashlib
+import threading
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from retrieval_cache import normalize_query, IngestionStamp
+
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60  # constante do RRF: quanto maior, menos peso para o topo de cada lista
+SUPABASE_PAGE_SIZE = 1000
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens normalizados; códigos com pontuação (CNPJ, SKUs) também entram inteiros."""
+    tokens = normalize_query(text).split()
+    for raw in text.split():
+        joined = normalize_query(raw).replace(" ", "")
+        if joined and joined not in tokens and any(ch.isdigit() for ch in joined):
+            tokens.append(joined)
+    return tokens
+
+
+def lexical_text(doc: Document) -> str:
+    """Texto indexado: pergunta + variações + tags (ou o conteúdo, para chunks sem metadados de FAQ)."""
+    metadata = doc.metadata or {}
+    parts = [metadata.get("question") or ""]
+    parts.extend(metadata.get("synthetic_variations") or [])
+    parts.extend(metadata.get("tags") or [])
+    text = " ".join(p for p in parts if p)
+    return text or doc.page_content
+
+
+def doc_key(doc: Document) -> str:
+    """Identidade de um documento nas duas listas (vetorial e lexical)."""
+    metadata = doc.metadata or {}
+    raw = f"{metadata.get('ID_Conta', '')}\x00{metadata.get('question', '')}\x00{doc.page_content}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class BM25Index:
+    """Índice invertido BM25 em memória."""
+
+    def __init__(self, docs: List[Document], k1: float = BM25_K1, b: float = BM25_B):
+        self.docs = docs
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+        for idx, doc in enumerate(docs):
+            counts = Counter(tokenize(lexical_text(doc)))
+            self.doc_lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                self.postings[token].append((idx, tf))
+        self.avg_length = (sum(self.doc_lengths) / len(docs)) if docs else 0.0
+        n = len(docs)
+        self.idf = {
+            token: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for token, posting in self.postings.items()
+        }
+
+    def search(
+        self,
+        query: str,
+        top_n: int,
+        id_conta: Optional[str] = None,
+        filters: Optional[Dict[str, str]] = None
+    ) -> List[Tuple[Document, float]]:
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize(query)):
+            idf = self.idf.get(token)
+            if idf is None:
+                continue
+            for idx, tf in self.postings[token]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[idx] / (self.avg_length or 1))
+                scores[idx] += idf * tf * (self.k1 + 1) / (tf + norm)
+        wanted = {**(filters or {}), **({"ID_Conta": id_conta} if id_conta else {})}
+        if wanted:
+            scores = {
+                idx: s for idx, s in scores.items()
+                if all((self.docs[idx].metadata or {}).get(field) == value for field, value in wanted.items())
+            }
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_n]
+        return [(self.docs[idx], score) for idx, score in best]
+
+
+class LexicalIndexProvider:
+    """Constrói o BM25Index sob demanda e o reconstrói quando há nova ingestão."""
+
+    def __init__(self, loader: Callable[[], List[Document]], stamp: IngestionStamp = None):
+        self.loader = loader
+        self.stamp = stamp or IngestionStamp()
+        self._index: Optional[BM25Index] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> BM25Index:
+        with self._lock:
+            if self._index is None or self.stamp.changed():
+                self._index = BM25Index(self.loader())
+            return self._index
+
+
+def supabase_documents(
+    supabase,
+    table_name: str,
+    id_conta: Optional[str] = None,
+    filters: Optional[Dict[str, str]] = None
+) -> List[Document]:
+    """Carrega content + metadata da tabela (paginado, já filtrado no banco) para o índice lexical."""
+    docs: List[Document] = []
+    start = 0
+    while True:
+        query = supabase.table(table_name).select("id, content, metadata")
+        if id_conta:
+            query = query.eq("ID_Conta", id_conta)
+        for field, value in (filters or {}).items():
+            query = query.eq(f"metadata->>{field}", value)
+        data = query.order("id").range(start, start + SUPABASE_PAGE_SIZE - 1).execute().data or []
+        docs.extend(Document(page_content=row["content"], metadata=row.get("metadata") or {}) for row in data)
+        if len(data) < SUPABASE_PAGE_SIZE:
+            return docs
+        start += SUPABASE_PAGE_SIZE
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Document]],
+    weights: Optional[List[float]] = None,
+    rrf_k: int = RRF_K
+) -> List[Tuple[Document, float]]:
+    """Funde listas ranqueadas: score = soma de peso / (rrf_k + posição)."""
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = defaultdict(float)
+    docs: Dict[str, Document] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc_key(doc)
+            scores[key] += weight / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    return sorted(((docs[key], score) for key, score in scores.items()), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever vetorial + BM25, fundidos por RRF."""
+
+    vector_retriever: BaseRetriever
+    lexical: LexicalIndexProvider
+    k: int = 4
+    fetch_k: int = 12           # candidatos buscados em cada lista antes da fusão
+    id_conta: Optional[str] = None
+    filters: Optional[Dict[str, str]] = None
+    vector_weight: float = 1.0
+    lexical_weight: float = 1.0
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        vector_docs = self.vector_retriever.invoke(query)
+        lexical_docs = [doc for doc, _ in self.lexical.get().search(query, self.fetch_k, self.id_conta, self.filters)]
+        fused = reciprocal_rank_fusion(
+            [vector_docs, lexical_docs],
+            [self.vector_weight, self.lexical_weight]
+        )
+        return [
+            Document(page_content=doc.page_content, metadata={**(doc.metadata or {}), "rrf_score": score})
+            for doc, score in fused[:self.k]
+        ]
@@ -0,0 +1,101 @@
+"""
+Cache persistente (endereçado por conteúdo) dos FAQs extraídos pelo LLM.
+Cada chunk é identificado pelo hash de (texto do chunk + versão do system prompt + modelo),
+então reingerir um site cujas páginas não mudaram não gasta tokens nem tempo.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional
+
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".cache" / "llm_chunks"
+DEFAULT_CACHE_MAX_MB = 200
+EVICT_TARGET_RATIO = 0.9  # ao estourar o limite, remove até ficar em 90% (evita varrer a cada put)
+
+
+class FAQChunkCache:
+    """
+    Armazena em disco, por chunk, a lista de faq_items já validados.
+    Os arquivos ficam em `<cache_dir>/<hash[:2]>/<hash>.json`; quando o total
+    passa de `max_bytes`, os menos usados recentemente (mtime) são removidos.
+    O total em bytes é mantido em memória: a pasta só é varrida na primeira
+    gravação e quando o limite é ultrapassado.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None  # calculado na primeira gravação
+
+    @staticmethod
+    def make_key(chunk: str, prompt: str, prompt_version: str, model: str) -> str:
+        """Hash do conteúdo do chunk + system prompt (texto e versão) + modelo."""
+        digest = hashlib.sha256()
+        for part in (model, prompt_version, prompt, chunk):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Retorna os faq_items do chunk, ou None se não estiver em cache."""
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)  # marca como usado recentemente (LRU)
+            return data["faq_items"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def put(self, key: str, faq_items: List[Dict]) -> None:
+        """Grava os faq_items de um chunk (escrita atômica) e aplica o limite de tamanho."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        data = json.dumps({"faq_items": faq_items}, ensure_ascii=False).encode("utf-8")
+        tmp_path.write_bytes(data)
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan()[1]
+            try:
+                self._total_bytes -= path.stat().st_size  # sobrescrita: o arquivo antigo sai da conta
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+            self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _scan(self):
+        """Lista (mtime, tamanho, caminho) de todos os arquivos e o total em bytes."""
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        return entries, total
+
+    def _evict(self) -> None:
+        """Remove os menos usados até `EVICT_TARGET_RATIO` do limite (chamado com o lock)."""
+        # Recalcula do disco: outros processos podem ter gravado ou apagado arquivos
+        entries, total = self._scan()
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                path.unlink(missing_ok=True)
+                total -= size
+                if total <= target:
+                    break
+        self._total_bytes = total
@@ -0,0 +1,484 @@
+"""
+Índice vetorial local (em processo) para o retriever do agent_rag.
+Alternativa ao SupabaseVectorStore para implantações de um único cliente e testes
+offline: os vetores ficam em disco (.npy com memmap, float32 ou float16), uma
+partição por ID_Conta, com busca exata ou aproximada (IVF).
+
+Construção:
+    python local_index.py --from-xml Exemplos/*.xml          # exports do Agente_FAQ (gera embeddings)
+    python local_index.py --from-dump marketing_rag.ndjson   # dump com a coluna embedding
+    python local_index.py --dump-supabase marketing_rag.ndjson --table marketing_rag
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import shutil
+import argparse
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from retrieval_cache import IngestionStamp, touch_ingestion_stamp
+
+
+DEFAULT_INDEX_DIR = Path(__file__).parent / ".cache" / "local_index"
+SEARCH_BLOCK_ROWS = 65_536    # linhas da matriz lidas do memmap por vez na busca exata
+KMEANS_ITERATIONS = 10
+SUPABASE_PAGE_SIZE = 1000
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Índices dos k maiores scores, em ordem decrescente."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+def parse_vector(value) -> List[float]:
+    """Aceita lista ou o texto do pgvector ('[0.1,0.2,...]')."""
+    if isinstance(value, str):
+        return json.loads(value)
+    return list(value)
+
+
+def _train_ivf(vectors: np.ndarray, n_lists: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """K-means esférico simples. Retorna (centroides, lista de cada vetor)."""
+    rng = np.random.default_rng(seed)
+    data = np.asarray(vectors, dtype=np.float32)
+    centroids = data[rng.choice(len(data), size=n_lists, replace=False)].copy()
+    assignments = np.zeros(len(data), dtype=np.int32)
+    for _ in range(KMEANS_ITERATIONS):
+        for start in range(0, len(data), SEARCH_BLOCK_ROWS):
+            block = data[start:start + SEARCH_BLOCK_ROWS]
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        # Soma e contagem por lista em uma única passada (e não uma máscara por centroide)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, data)
+        counts = np.bincount(assignments, minlength=n_lists)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = data[rng.integers(len(data), size=len(empty))]  # lista vazia: reinicia
+        centroids = _normalize(centroids)
+    return centroids, assignments
+
+
+class _Partition:
+    """Uma partição (ID_Conta) carregada: vetores em memmap + documentos + IVF opcional."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.built_mtime = 0.0
+        self.meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        self.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        with open(path / "docs.jsonl", "r", encoding="utf-8") as f:
+            self.docs = [json.loads(line) for line in f if line.strip()]
+        self._filter_rows: Dict[Tuple, np.ndarray] = {}
+        self.centroids = self.order = self.offsets = None
+        if self.meta.get("ivf_lists"):
+            self.centroids = np.load(path / "ivf_centroids.npy")
+            self.order = np.load(path / "ivf_order.npy", mmap_mode="r")
+            self.offsets = np.load(path / "ivf_offsets.npy")
+
+    def rows_matching(self, filters: Dict[str, str]) -> np.ndarray:
+        """Linhas cujo metadata bate com todos os filtros (memorizado por combinação)."""
+        key = tuple(sorted(filters.items()))
+        rows = self._filter_rows.get(key)
+        if rows is None:
+            rows = np.asarray([
+                i for i, doc in enumerate(self.docs)
+                if all(doc["metadata"].get(field) == value for field, value in filters.items())
+            ], dtype=np.int64)
+            self._filter_rows[key] = rows
+        return rows
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        nprobe: Optional[int] = None,
+        filters: Optional[Dict[str, str]] = None
+    ) -> List[Tuple[int, float]]:
+        rows = self.rows_matching(filters) if filters else None
+        if rows is not None and (self.centroids is None or not nprobe or len(rows) <= k * 16):
+            # Pré-filtro: só as linhas que passam nos filtros são comparadas
+            scores = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+            best = _top_k(scores, k)
+            return [(int(rows[i]), float(scores[i])) for i in best]
+
+        if self.centroids is not None and nprobe:
+            lists = _top_k(self.centroids @ query, nprobe)
+            candidates = np.concatenate([
+                np.asarray(self.order[self.offsets[c]:self.offsets[c + 1]]) for c in lists
+            ]) if len(lists) else np.empty(0, dtype=np.int64)
+            if rows is not None:
+                candidates = np.intersect1d(candidates, rows)  # já sai ordenado
+            candidates.sort()  # leitura sequencial do memmap
+            scores = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+            best = _top_k(scores, k)
+            return [(int(candidates[i]), float(scores[i])) for i in best]
+
+        best_idx: List[int] = []
+        best_scores: List[float] = []
+        for start in range(0, len(self.vectors), SEARCH_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+            scores = block @ query
+            top = _top_k(scores, k)
+            best_idx.extend((top + start).tolist())
+            best_scores.extend(scores[top].tolist())
+        best_scores_arr = np.asarray(best_scores, dtype=np.float32)
+        keep = _top_k(best_scores_arr, k)
+        return [(best_idx[i], float(best_scores_arr[i])) for i in keep]
+
+
+class LocalVectorIndex:
+    """
+    Índice em `<index_dir>/<ID_Conta>/`:
+    - `vectors.npy`: matriz normalizada (float32 ou float16), aberta com memmap
+    - `docs.jsonl`: content + metadata de cada linha, na mesma ordem
+    - `meta.json`: dimensão, dtype, modelo, quantidade e listas IVF
+    - `ivf_*.npy` (opcional): centroides e linhas agrupadas por lista
+    """
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR):
+        self.index_dir = Path(index_dir)
+        self._partitions: Dict[str, _Partition] = {}
+        self._partition_names: Optional[List[str]] = None  # lista das partições, relida a cada ingestão
+        self._stamp = IngestionStamp()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _safe_name(id_conta: str) -> str:
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", id_conta) or "_"
+
+    def _scan_partitions(self) -> List[str]:
+        if not self.index_dir.exists():
+            return []
+        names = []
+        for meta_path in sorted(self.index_dir.glob("*/meta.json")):
+            names.append(json.loads(meta_path.read_text(encoding="utf-8"))["id_conta"])
+        return names
+
+    def partitions(self) -> List[str]:
+        """ID_Contas com partição gravada.
+
+        A pasta só é varrida de novo quando o carimbo de ingestão muda (ou quando
+        este processo grava uma partição), não a cada busca sem `id_conta`.
+        """
+        with self._lock:
+            if self._partition_names is None or self._stamp.changed():
+                self._partition_names = self._scan_partitions()
+            return list(self._partition_names)
+
+    def _partition(self, id_conta: str) -> Optional[_Partition]:
+        """Partição carregada; recarrega se ela foi reconstruída (por outro processo, inclusive)."""
+        path = self.index_dir / self._safe_name(id_conta)
+        try:
+            built_mtime = (path / "meta.json").stat().st_mtime
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            partition = self._partitions.get(id_conta)
+            if partition is None or partition.built_mtime != built_mtime:
+                partition = _Partition(path)
+                partition.built_mtime = built_mtime
+                self._partitions[id_conta] = partition
+            return partition
+
+    def build_partition(
+        self,
+        id_conta: str,
+        docs: List[Dict],
+        vectors: List[List[float]],
+        dtype: str = "float32",
+        ivf_lists: int = 0,
+        model: str = "",
+        touch_stamp: bool = True
+    ) -> Path:
+        """Grava (ou substitui) a partição de um ID_Conta. `docs` são dicts com content e metadata."""
+        if len(docs) != len(vectors):
+            raise ValueError("docs e vectors devem ter o mesmo tamanho")
+        if not docs:
+            raise ValueError(f"Nenhum documento para a partição '{id_conta}'")
+
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+        ivf_lists = min(ivf_lists, len(matrix))
+
+        final_path = self.index_dir / self._safe_name(id_conta)
+        tmp_path = final_path.with_name(final_path.name + ".tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+
+        np.save(tmp_path / "vectors.npy", matrix.astype(dtype))
+        with open(tmp_path / "docs.jsonl", "w", encoding="utf-8") as f:
+            for doc in docs:
+                f.write(json.dumps({"content": doc["content"], "metadata": doc.get("metadata") or {}}, ensure_ascii=False) + "\n")
+
+        if ivf_lists > 1:
+            centroids, assignments = _train_ivf(matrix, ivf_lists)
+            order = np.argsort(assignments, kind="stable").astype(np.int64)
+            offsets = np.searchsorted(assignments[order], np.arange(ivf_lists + 1)).astype(np.int64)
+            np.save(tmp_path / "ivf_centroids.npy", centroids.astype(np.float32))
+            np.save(tmp_path / "ivf_order.npy", order)
+            np.save(tmp_path / "ivf_offsets.npy", offsets)
+        else:
+            ivf_lists = 0
+
+        (tmp_path / "meta.json").write_text(json.dumps({
+            "id_conta": id_conta,
+            "count": len(docs),
+            "dim": int(matrix.shape[1]),
+            "dtype": dtype,
+            "model": model,
+            "ivf_lists": ivf_lists,
+            "built_at": datetime.now().isoformat(),
+        }, ensure_ascii=False), encoding="utf-8")
+
+        with self._lock:
+            self._partitions.pop(id_conta, None)
+            self._partition_names = None
+            shutil.rmtree(final_path, ignore_errors=True)
+            os.replace(tmp_path, final_path)
+        if touch_stamp:
+            touch_ingestion_stamp()
+        return final_path
+
+    def documents(self, id_conta: Optional[str] = None, filters: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """content + metadata das linhas indexadas (de uma conta ou de todas)."""
+        docs: List[Dict] = []
+        for name in ([id_conta] if id_conta else self.partitions()):
+            partition = self._partition(name)
+            if partition is None:
+                continue
+            if filters:
+                docs.extend(partition.docs[i] for i in partition.rows_matching(filters))
+            else:
+                docs.extend(partition.docs)
+        return docs
+
+    def search(
+        self,
+        query_vector: List[float],
+        k: int = 4,
+        id_conta: Optional[str] = None,
+        nprobe: Optional[int] = None,
+        filters: Optional[Dict[str, str]] = None
+    ) -> List[Tuple[Dict, float]]:
+        """Top-k (documento, similaridade de cosseno). Sem `id_conta`, busca em todas as partições.
+
+        `filters` (ex.: {"category": "Billing & Account"}) restringe as linhas antes da busca.
+        """
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        results: List[Tuple[Dict, float]] = []
+        for name in ([id_conta] if id_conta else self.partitions()):
+            partition = self._partition(name)
+            if partition is None:
+                continue
+            for idx, score in partition.search(query, k, nprobe, filters):
+                results.append((partition.docs[idx], score))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:k]
+
+
+class LocalIndexRetriever(BaseRetriever):
+    """Retriever do LangChain sobre o LocalVectorIndex (mesma interface do SupabaseVectorStore)."""
+
+    index: LocalVectorIndex
+    embeddings: object
+    k: int = 4
+    id_conta: Optional[str] = None
+    nprobe: Optional[int] = None
+    filters: Optional[Dict[str, str]] = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        vector = self.embeddings.embed_query(query)
+        return [
+            Document(page_content=doc["content"], metadata={**doc["metadata"], "score": score})
+            for doc, score in self.index.search(vector, self.k, self.id_conta, self.nprobe, self.filters)
+        ]
+
+
+# --- LOADERS ---
+
+
+def read_faq_xml(xml_path) -> Tuple[str, str, List[Dict]]:
+    """Lê um export do Agente_FAQ. Retorna (ID_Conta, DataHora, FAQs como dicts do FAQItem)."""
+    root = ET.parse(str(xml_path)).getroot()
+    id_conta = root.findtext("Metadados/ID_Conta", default=Path(xml_path).stem)
+    generated_at = root.findtext("Metadados/DataHora", default="")
+    faqs = []
+    for faq_el in root.findall("FAQs/FAQ"):
+        faqs.append({
+            "question": faq_el.findtext("Pergunta", default=""),
+            "answer": faq_el.findtext("Resposta", default=""),
+            "category": faq_el.findtext("Categoria", default="General"),
+            "audience": faq_el.findtext("Audiencia", default=""),
+            "confidence_score": float(faq_el.findtext("ConfiancaScore", default="0") or 0),
+            "synthetic_variations": [v.text or "" for v in faq_el.findall("VariacoesSinteticas/Variacao")],
+            "tags": [t.text or "" for t in faq_el.findall("Tags/Tag")],
+        })
+    return id_conta, generated_at, faqs
+
+
+def build_from_xml(
+    index: LocalVectorIndex,
+    xml_paths: Iterable[str],
+    embeddings,
+    dtype: str = "float32",
+    ivf_lists: int = 0,
+    embedding_cache=None
+) -> Dict[str, int]:
+    """Constrói uma partição por ID_Conta a partir dos XMLs (o mais recente de cada conta vence)."""
+    from models import FAQItem
+    from Agente_FAQ import faq_embedding_text, build_faq_row
+
+    latest: Dict[str, Tuple[str, List[Dict]]] = {}
+    for xml_path in xml_paths:
+        id_conta, generated_at, faqs = read_faq_xml(xml_path)
+        if id_conta not in latest or generated_at > latest[id_conta][0]:
+            latest[id_conta] = (generated_at, faqs)
+
+    model = getattr(embeddings, "model", "")
+    built = {}
+    for id_conta, (_, faqs) in latest.items():
+        items = [FAQItem.model_validate(faq) for faq in faqs]
+        texts = [faq_embedding_text(faq) for faq in items]
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        if embedding_cache:
+            keys = [embedding_cache.make_key(text, model) for text in texts]
+            cached = embedding_cache.get_many(keys)
+            vectors = [cached.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            for i, vector in zip(missing, embeddings.embed_documents([texts[i] for i in missing])):
+                vectors[i] = vector
+            if embedding_cache:
+                embedding_cache.put_many((keys[i], vectors[i]) for i in missing)
+
+        rows = [build_faq_row(faq, id_conta, vector) for faq, vector in zip(items, vectors)]
+        index.build_partition(id_conta, rows, vectors, dtype=dtype, ivf_lists=ivf_lists, model=model)
+        built[id_conta] = len(rows)
+        print(f"  [OK] {id_conta}: {len(rows)} FAQs ({len(missing)} embeddings gerados)")
+    return built
+
+
+def build_from_dump(
+    index: LocalVectorIndex,
+    dump_path,
+    dtype: str = "float32",
+    ivf_lists: int = 0
+) -> Dict[str, int]:
+    """Constrói as partições a partir de um dump NDJSON da tabela (content, metadata, ID_Conta, embedding)."""
+    groups: Dict[str, Tuple[List[Dict], List[List[float]]]] = {}
+    with open(dump_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            metadata = row.get("metadata") or {}
+            id_conta = row.get("ID_Conta") or metadata.get("ID_Conta") or "_"
+            docs, vectors = groups.setdefault(id_conta, ([], []))
+            docs.append({"content": row["content"], "metadata": metadata})
+            vectors.append(parse_vector(row["embedding"]))
+
+    built = {}
+    for id_conta, (docs, vectors) in groups.items():
+        index.build_partition(id_conta, docs, vectors, dtype=dtype, ivf_lists=ivf_lists)
+        built[id_conta] = len(docs)
+        print(f"  [OK] {id_conta}: {len(docs)} linhas")
+    return built
+
+
+def dump_supabase_table(supabase, table_name: str, dump_path) -> int:
+    """Exporta content, metadata, ID_Conta e embedding da tabela para NDJSON (paginado)."""
+    total = 0
+    start = 0
+    with open(dump_path, "w", encoding="utf-8") as f:
+        while True:
+            result = (
+                supabase.table(table_name)
+                .select("id, ID_Conta, content, metadata, embedding")
+                .order("id")
+                .range(start, start + SUPABASE_PAGE_SIZE - 1)
+                .execute()
+            )
+            data = result.data or []
+            for row in data:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            total += len(data)
+            if len(data) < SUPABASE_PAGE_SIZE:
+                return total
+            start += SUPABASE_PAGE_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Constrói o índice vetorial local do agente RAG")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--from-xml", nargs="+", help="XMLs exportados pelo Agente_FAQ (aceita glob)")
+    source.add_argument("--from-dump", help="Dump NDJSON da tabela do Supabase")
+    source.add_argument("--dump-supabase", help="Exporta a tabela do Supabase para este NDJSON e indexa")
+    parser.add_argument("--table", default="marketing_rag", help="Tabela do Supabase (padrão: marketing_rag)")
+    parser.add_argument("--index-dir", default=str(DEFAULT_INDEX_DIR), help="Pasta do índice")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32",
+                        help="Precisão dos vetores em disco (float16 usa metade da memória)")
+    parser.add_argument("--ivf-lists", type=int, default=0,
+                        help="Listas do modo aproximado IVF (0 = só busca exata; ~sqrt(N) é um bom valor)")
+    args = parser.parse_args()
+
+    index = LocalVectorIndex(args.index_dir)
+
+    if args.from_xml:
+        from dotenv import load_dotenv
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        from embedding_cache import EmbeddingCache, DEFAULT_EMBEDDING_CACHE_PATH
+
+        load_dotenv()
+        paths = sorted({p for pattern in args.from_xml for p in glob.glob(pattern)})
+        if not paths:
+            sys.exit(f"Nenhum XML encontrado em: {' '.join(args.from_xml)}")
+        embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
+        build_from_xml(index, paths, embeddings, args.dtype, args.ivf_lists,
+                       embedding_cache=EmbeddingCache(DEFAULT_EMBEDDING_CACHE_PATH))
+    else:
+        dump_path = args.from_dump
+        if args.dump_supabase:
+            from dotenv import load_dotenv
+            from supabase.client import create_client
+
+            load_dotenv()
+            supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_KEY"])
+            total = dump_supabase_table(supabase, args.table, args.dump_supabase)
+            print(f"[OK] {total} linhas exportadas para {args.dump_supabase}")
+            dump_path = args.dump_supabase
+        build_from_dump(index, dump_path, args.dtype, args.ivf_lists)
+
+    print(f"\n[OK] Índice local em {args.index_dir}: {', '.join(index.partitions())}")
+
+
+if __name__ == "__main__":
+    main()
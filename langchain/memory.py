@@ -0,0 +1,182 @@
+"""
+Memória de conversa do agent_rag com orçamento de tokens.
+- Janela deslizante: as últimas `window_turns` trocas vão na íntegra.
+- Turnos mais antigos são resumidos de forma incremental (resumo anterior + turnos
+  que saíram da janela), em vez de reenviados a cada pergunta.
+- Resultados de ferramentas (ToolMessage) de turnos concluídos são descartados:
+  só a pergunta e a resposta final ficam no histórico.
+- Cada turno registra os tokens gastos (LLM) e o tamanho do histórico enviado.
+"""
+
+import os
+import threading
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+
+CHARS_PER_TOKEN = 4.0
+DEFAULT_MEMORY_MAX_TOKENS = int(os.environ.get("RAG_MEMORY_MAX_TOKENS", "3000"))
+DEFAULT_WINDOW_TURNS = int(os.environ.get("RAG_MEMORY_WINDOW_TURNS", "4"))
+SUMMARY_MAX_CHARS = 2000
+
+SUMMARY_PROMPT = """Atualize o resumo de uma conversa entre um cliente e o assistente virtual.
+Mantenha fatos, preferências, dados informados pelo cliente (nomes, números, pedidos) e
+pendências. Descarte cumprimentos e repetições. Responda só com o novo resumo, em até 8 linhas.
+
+RESUMO ATUAL:
+{summary}
+
+NOVAS MENSAGENS:
+{transcript}"""
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return str(content)
+
+
+@dataclass
+class TurnStats:
+    turn: int
+    history_tokens: int          # histórico (resumo + janela) enviado junto com a pergunta
+    input_tokens: int = 0        # soma das chamadas ao LLM no turno (usage_metadata)
+    output_tokens: int = 0
+    llm_calls: int = 0
+    tool_tokens_dropped: int = 0  # payload de ferramentas que não volta para o histórico
+    summarized_turns: int = 0
+
+
+@dataclass
+class _Turn:
+    messages: List[BaseMessage]
+    tokens: int
+
+
+class ConversationMemory:
+    """
+    Histórico limitado por `max_tokens` (estimativa ~4 caracteres/token).
+    Uso:
+        memory = ConversationMemory(llm=agent.llm)
+        history = memory.messages() + [HumanMessage(...)]
+        ... result = agent.invoke(history) ...
+        memory.add_turn(result["messages"][len(history) - 1:], history_tokens=...)
+    """
+
+    def __init__(
+        self,
+        llm=None,
+        max_tokens: int = DEFAULT_MEMORY_MAX_TOKENS,
+        window_turns: int = DEFAULT_WINDOW_TURNS,
+        count_tokens: Callable[[str], int] = estimate_tokens
+    ):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.window_turns = max(1, window_turns)
+        self.count_tokens = count_tokens
+        self.summary = ""
+        self.turns: List[_Turn] = []
+        self.stats: List[TurnStats] = []
+        self._lock = threading.Lock()
+        # Serializa turnos inteiros da mesma conversa (messages() -> agente -> add_turn):
+        # duas perguntas simultâneas na mesma sessão não leem/gravam o histórico ao mesmo tempo
+        self.turn_lock = threading.Lock()
+
+    def messages(self) -> List[BaseMessage]:
+        """Histórico a enviar: resumo (como SystemMessage) + turnos da janela."""
+        with self._lock:
+            history: List[BaseMessage] = []
+            if self.summary:
+                history.append(SystemMessage(content=f"Resumo da conversa até aqui:\n{self.summary}"))
+            for turn in self.turns:
+                history.extend(turn.messages)
+            return history
+
+    def history_tokens(self) -> int:
+        return sum(self.count_tokens(message_text(m)) for m in self.messages())
+
+    def add_turn(self, turn_messages: Sequence[BaseMessage], history_tokens: int = 0) -> TurnStats:
+        """
+        Registra um turno (pergunta + mensagens geradas pelo agente) e aplica o orçamento.
+        Retorna a contabilidade do turno.
+        """
+        stats = TurnStats(turn=0, history_tokens=history_tokens)
+        kept: List[BaseMessage] = []
+        for message in turn_messages:
+            if isinstance(message, AIMessage):
+                usage = getattr(message, "usage_metadata", None) or {}
+                stats.input_tokens += usage.get("input_tokens", 0) or 0
+                stats.output_tokens += usage.get("output_tokens", 0) or 0
+                stats.llm_calls += 1
+            if isinstance(message, ToolMessage):
+                stats.tool_tokens_dropped += self.count_tokens(message_text(message))
+                continue
+            if isinstance(message, AIMessage) and message.tool_calls:
+                continue  # sem o ToolMessage correspondente, a chamada de ferramenta não serve mais
+            if isinstance(message, (HumanMessage, AIMessage)):
+                kept.append(message)
+
+        with self._lock:
+            self.turns.append(_Turn(kept, sum(self.count_tokens(message_text(m)) for m in kept)))
+            evicted = self._evict()
+        if evicted:
+            stats.summarized_turns = len(evicted)
+            self._summarize(evicted)
+        with self._lock:
+            self.stats.append(stats)
+            stats.turn = len(self.stats)
+        return stats
+
+    def _evict(self) -> List[_Turn]:
+        """Tira da janela os turnos que excedem a janela ou o orçamento (o último sempre fica)."""
+        evicted: List[_Turn] = []
+        budget = self.max_tokens - self.count_tokens(self.summary)
+        while len(self.turns) > 1 and (
+            len(self.turns) > self.window_turns or sum(t.tokens for t in self.turns) > budget
+        ):
+            evicted.append(self.turns.pop(0))
+        return evicted
+
+    def _summarize(self, evicted: List[_Turn]) -> None:
+        transcript = "\n".join(
+            f"{'Cliente' if isinstance(m, HumanMessage) else 'Assistente'}: {message_text(m)}"
+            for turn in evicted for m in turn.messages
+        )
+        summary = None
+        if self.llm is not None:
+            try:
+                response = self.llm.invoke(SUMMARY_PROMPT.format(summary=self.summary or "(vazio)", transcript=transcript))
+                summary = message_text(response).strip()
+            except Exception as e:
+                print(f"⚠️ Não foi possível resumir o histórico: {e}")
+        if not summary:
+            # Sem LLM (ou em caso de erro): mantém o fim do texto acumulado
+            summary = f"{self.summary}\n{transcript}".strip()
+        with self._lock:
+            self.summary = summary[-SUMMARY_MAX_CHARS:]
+
+    def totals(self) -> Dict[str, int]:
+        """Somatório da contabilidade de todos os turnos."""
+        with self._lock:
+            stats = list(self.stats)
+        totals = {"turns": len(stats)}
+        for name in ("history_tokens", "input_tokens", "output_tokens", "llm_calls", "tool_tokens_dropped", "summarized_turns"):
+            totals[name] = sum(getattr(s, name) for s in stats)
+        return totals
+
+    def last_turn(self) -> Optional[Dict]:
+        with self._lock:
+            return asdict(self.stats[-1]) if self.stats else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self.summary = ""
+            self.turns.clear()
+            self.stats.clear()
@@ -3,6 +3,8 @@ Modelos Pydantic para validação de FAQs estruturados.
 Baseado nas especificações do doc.md para ingestão agêntica.
 """
 
+import json
+import hashlib
 from typing import List
 from pydantic import BaseModel, Field, field_validator
 
@@ -71,6 +73,20 @@ class FAQItem(BaseModel):
             raise ValueError("Deve haver pelo menos 1 variação sintética")
         return v
 
+    def content_hash(self) -> str:
+        """Hash estável do conteúdo do FAQ (usado na ingestão incremental)."""
+        canonical = json.dumps(
+            {
+                field: " ".join(value.split()) if isinstance(value, str)
+                else [" ".join(v.split()) for v in value] if isinstance(value, list)
+                else value
+                for field, value in self.model_dump().items()
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
 
 class FAQResponse(BaseModel):
     """Container para a resposta completa do LLM com múltiplos FAQs."""
@@ -0,0 +1,115 @@
+"""
+Servidor PostgREST em memória para testar a escrita em lote sem Supabase.
+Implementa só o que o SupabaseBulkWriter usa:
+`client.table(nome).upsert(rows, on_conflict=..., ignore_duplicates=...).execute()`.
+- Upsert pelas colunas de `on_conflict` (ignora ou atualiza as duplicatas).
+- Responde 413 quando o corpo JSON passa de `max_body_bytes`.
+- Falha de propósito nas próximas N requisições (antes ou depois de gravar).
+"""
+
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+
+STATUS_MESSAGES = {
+    400: "Bad Request",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+class APIError(Exception):
+    """Erro HTTP do servidor (mesmo formato de `code`/`status_code` usado pelo retry)."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"{status_code} {STATUS_MESSAGES.get(status_code, 'Error')}")
+        self.status_code = status_code
+        self.code = status_code
+
+
+@dataclass
+class APIResponse:
+    data: List[Dict] = field(default_factory=list)
+
+
+class _UpsertRequest:
+    def __init__(self, server: "InMemoryPostgREST", table_name: str, rows: List[Dict],
+                 on_conflict: str, ignore_duplicates: bool):
+        self.server = server
+        self.table_name = table_name
+        self.rows = rows
+        self.on_conflict = on_conflict
+        self.ignore_duplicates = ignore_duplicates
+
+    def execute(self) -> APIResponse:
+        return self.server._upsert(self)
+
+
+class _Table:
+    def __init__(self, server: "InMemoryPostgREST", table_name: str):
+        self.server = server
+        self.table_name = table_name
+
+    def upsert(self, rows: List[Dict], on_conflict: str = "", ignore_duplicates: bool = False) -> _UpsertRequest:
+        return _UpsertRequest(self.server, self.table_name, list(rows), on_conflict, ignore_duplicates)
+
+
+class InMemoryPostgREST:
+    """Cliente e servidor ao mesmo tempo: as tabelas ficam em `self.tables`."""
+
+    def __init__(self, max_body_bytes: Optional[int] = None):
+        self.max_body_bytes = max_body_bytes
+        self.tables: Dict[str, Dict[Tuple, Dict]] = {}
+        self.requests = 0      # requisições recebidas (inclusive as que falharam)
+        self.rejected_413 = 0
+        self._failures: List[Tuple[int, bool]] = []  # (status, depois de gravar?)
+        self._lock = threading.Lock()
+
+    def table(self, table_name: str) -> _Table:
+        return _Table(self, table_name)
+
+    def fail_next(self, times: int, status_code: int = 503, after_commit: bool = False) -> None:
+        """As próximas `times` requisições falham com `status_code`.
+
+        Com `after_commit=True` as linhas são gravadas antes do erro (a resposta se perde
+        no caminho, como em um timeout): o cliente vai reenviar um lote que já foi aplicado.
+        """
+        with self._lock:
+            self._failures.extend([(status_code, after_commit)] * times)
+
+    def rows(self, table_name: str) -> List[Dict]:
+        with self._lock:
+            return list(self.tables.get(table_name, {}).values())
+
+    def _upsert(self, request: _UpsertRequest) -> APIResponse:
+        body = json.dumps(request.rows, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self.requests += 1
+            if self.max_body_bytes is not None and len(body) > self.max_body_bytes:
+                self.rejected_413 += 1
+                raise APIError(413)
+            failure = self._failures.pop(0) if self._failures else None
+            if failure and not failure[1]:
+                raise APIError(failure[0])
+
+            columns = [c.strip() for c in request.on_conflict.split(",") if c.strip()]
+            table = self.tables.setdefault(request.table_name, {})
+            written = []
+            for row in request.rows:
+                key: Any = tuple(row.get(c) for c in columns) if columns else (len(table),)
+                if key in table:
+                    if request.ignore_duplicates:
+                        continue
+                    table[key] = {**table[key], **row}
+                else:
+                    table[key] = dict(row)
+                written.append(table[key])
+
+            if failure:
+                raise APIError(failure[0])
+            return APIResponse(data=written)
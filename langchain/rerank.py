@@ -0,0 +1,124 @@
+"""
+Reranking leve (sem cross-encoder) dos FAQs recuperados pelo agent_rag.
+O retriever traz N candidatos; aqui cada um é repontuado localmente por:
+- posição no ranking original (vetorial/híbrido),
+- sobreposição de termos da consulta com `question` e `synthetic_variations`,
+- `confidence_score` do FAQ,
+e a seleção final usa MMR para não mandar ao LLM respostas quase iguais.
+Só os melhores vão para o prompt; os FAQs, em trechos compactos.
+"""
+
+from typing import List, Set
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from hybrid_search import tokenize, lexical_text
+
+
+RANK_WEIGHT = 0.5
+LEXICAL_WEIGHT = 0.35
+CONFIDENCE_WEIGHT = 0.15
+MMR_LAMBDA = 0.7          # 1.0 = só relevância; menor = mais diversidade
+MIN_SCORE_RATIO = 0.5     # descarta candidatos com score < 50% do melhor
+SNIPPET_MAX_CHARS = 500
+
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "de", "da", "do", "das", "dos", "e", "em", "no", "na",
+    "nos", "nas", "para", "por", "com", "como", "que", "qual", "quais", "se", "ao", "meu",
+    "minha", "eu", "voce", "ou", "ja", "mais", "sobre", "tem", "ter", "posso", "pode",
+}
+
+
+def content_terms(text: str) -> Set[str]:
+    return {t for t in tokenize(text) if t not in STOPWORDS}
+
+
+def lexical_overlap(query_terms: Set[str], doc: Document) -> float:
+    """Fração dos termos da consulta cobertos pela melhor formulação (pergunta ou variação)."""
+    if not query_terms:
+        return 0.0
+    metadata = doc.metadata or {}
+    phrasings = [metadata.get("question") or ""] + list(metadata.get("synthetic_variations") or [])
+    phrasings = [p for p in phrasings if p] or [doc.page_content]
+    return max(len(query_terms & content_terms(p)) / len(query_terms) for p in phrasings)
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def rerank(
+    query: str,
+    docs: List[Document],
+    top_n: int,
+    mmr_lambda: float = MMR_LAMBDA,
+    min_score_ratio: float = MIN_SCORE_RATIO
+) -> List[Document]:
+    """Repontua os candidatos (na ordem do retriever) e escolhe até `top_n` por MMR."""
+    if not docs:
+        return []
+    query_terms = content_terms(query)
+    n = len(docs)
+    scores: List[float] = []
+    for rank, doc in enumerate(docs):
+        confidence = (doc.metadata or {}).get("confidence_score")
+        scores.append(
+            RANK_WEIGHT * (1 - rank / n)
+            + LEXICAL_WEIGHT * lexical_overlap(query_terms, doc)
+            + CONFIDENCE_WEIGHT * (float(confidence) if confidence is not None else 0.5)
+        )
+
+    cutoff = max(scores) * min_score_ratio
+    terms = [content_terms(f"{lexical_text(doc)} {doc.page_content}") for doc in docs]
+    remaining = [i for i in range(n) if scores[i] >= cutoff]
+    selected: List[int] = []
+    while remaining and len(selected) < top_n:
+        best = max(
+            remaining,
+            key=lambda i: mmr_lambda * scores[i]
+            - (1 - mmr_lambda) * max((jaccard(terms[i], terms[j]) for j in selected), default=0.0)
+        )
+        selected.append(best)
+        remaining.remove(best)
+
+    return [
+        Document(page_content=docs[i].page_content, metadata={**(docs[i].metadata or {}), "rerank_score": scores[i]})
+        for i in selected
+    ]
+
+
+def compact_snippet(doc: Document, max_chars: int = SNIPPET_MAX_CHARS) -> str:
+    """Pergunta + resposta truncada no fim de uma frase (ou palavra) dentro de `max_chars`.
+
+    Só linhas de FAQ (com `question` nos metadados) são compactadas: chunks de texto
+    comum (agent_rag --ingest) já têm o tamanho do splitter e passam inteiros.
+    """
+    metadata = doc.metadata or {}
+    question = metadata.get("question")
+    if not question:
+        return doc.page_content
+    answer = " ".join(doc.page_content.split())
+    if len(answer) > max_chars:
+        cut = answer[:max_chars]
+        end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+        answer = cut[:end + 1] if end >= max_chars // 2 else cut.rsplit(" ", 1)[0] + "…"
+    return f"P: {question}\nR: {answer}"
+
+
+class RerankRetriever(BaseRetriever):
+    """Repontua os candidatos do retriever interno e devolve os `k` melhores."""
+
+    retriever: BaseRetriever
+    k: int = 4
+    mmr_lambda: float = MMR_LAMBDA
+    min_score_ratio: float = MIN_SCORE_RATIO
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        candidates = self.retriever.invoke(query)
+        return rerank(query, candidates, self.k, self.mmr_lambda, self.min_score_ratio)
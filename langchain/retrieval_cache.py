@@ -0,0 +1,169 @@
+"""
+Caches do retriever do agent_rag.
+- Embeddings de consulta: LRU + TTL pela pergunta normalizada (evita chamar a API
+  do Gemini para a mesma busca várias vezes na conversa).
+- Resultados top-k: TTL curto por (ID_Conta + filtros, vetor da consulta).
+Ambos são descartados quando uma ingestão termina (arquivo de carimbo tocado
+pelo Agente_FAQ / agent_rag --ingest / local_index) e expõem taxa de acerto.
+"""
+
+import os
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+
+INGESTION_STAMP_PATH = Path(__file__).parent / ".cache" / "ingestion.stamp"
+QUERY_CACHE_TTL = float(os.environ.get("RAG_QUERY_CACHE_TTL", "3600"))
+QUERY_CACHE_MAX_ITEMS = int(os.environ.get("RAG_QUERY_CACHE_MAX", "2048"))
+RESULTS_CACHE_TTL = float(os.environ.get("RAG_RESULTS_CACHE_TTL", "300"))
+RESULTS_CACHE_MAX_ITEMS = int(os.environ.get("RAG_RESULTS_CACHE_MAX", "512"))
+
+
+def normalize_query(text: str) -> str:
+    """Minúsculas, sem acentos, sem pontuação e com espaços simples."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = "".join(ch if ch.isalnum() else " " for ch in text)
+    return " ".join(text.split())
+
+
+def touch_ingestion_stamp(path=INGESTION_STAMP_PATH) -> None:
+    """Marca que a base mudou: caches de consulta de qualquer processo passam a ser descartados."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(str(time.time()), encoding="utf-8")
+
+
+class IngestionStamp:
+    """Detecta (por mtime) se houve ingestão desde a última verificação."""
+
+    def __init__(self, path=INGESTION_STAMP_PATH):
+        self.path = Path(path)
+        self._seen = self._read()
+
+    def _read(self) -> float:
+        try:
+            return self.path.stat().st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    def changed(self) -> bool:
+        current = self._read()
+        if current != self._seen:
+            self._seen = current
+            return True
+        return False
+
+
+class LRUTTLCache:
+    """Cache em memória com limite de itens (LRU), expiração (TTL) e contadores de acerto."""
+
+    def __init__(self, ttl: float, max_items: int):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._items: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and time.monotonic() < entry[0]:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._items),
+            "invalidations": self.invalidations,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings com cache das consultas (embed_query); documentos passam direto."""
+
+    def __init__(self, embeddings: Embeddings, cache: LRUTTLCache, stamp: IngestionStamp = None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.stamp = stamp
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.stamp and self.stamp.changed():
+            self.cache.clear()
+        key = normalize_query(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(key, vector)
+        return vector
+
+
+def vector_key(vector: List[float]) -> str:
+    """Chave estável de um vetor (arredondado para absorver ruído de float)."""
+    rounded = ",".join(f"{v:.5f}" for v in vector)
+    return hashlib.sha1(rounded.encode("ascii")).hexdigest()
+
+
+class CachedRetriever(BaseRetriever):
+    """Envolve um retriever com cache de resultados por (ID_Conta, filtros, k, vetor da consulta)."""
+
+    retriever: BaseRetriever
+    embeddings: CachedEmbeddings
+    cache: LRUTTLCache
+    stamp: Optional[IngestionStamp] = None
+    id_conta: Optional[str] = None
+    filters: Optional[Dict[str, str]] = None
+    k: int = 4
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if self.stamp and self.stamp.changed():
+            self.cache.clear()
+            self.embeddings.cache.clear()
+        scope = (self.id_conta, tuple(sorted((self.filters or {}).items())), self.k)
+        key = (scope, vector_key(self.embeddings.embed_query(query)))
+        docs = self.cache.get(key)
+        if docs is None:
+            # O retriever interno reaproveita o vetor do cache de embeddings
+            docs = self.retriever.invoke(query)
+            self.cache.put(key, docs)
+        return list(docs)
@@ -0,0 +1,69 @@
+"""
+Retry com backoff exponencial para chamadas às APIs externas (Gemini, Supabase).
+"""
+
+import time
+import random
+import threading
+
+
+MAX_RETRIES = 5
+RETRY_BASE_DELAY_S = 2.0
+RETRY_MAX_DELAY_S = 60.0
+
+
+class RateLimitGate:
+    """
+    Pausa compartilhada entre as threads de chamadas à API.
+    Quando uma chamada recebe rate limit (429), todas as outras esperam
+    o mesmo backoff antes de disparar novas requisições.
+    """
+
+    def __init__(self):
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            delay = self._resume_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, delay_s: float):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.time() + delay_s)
+
+
+def _is_retryable_error(error: Exception) -> bool:
+    """Identifica erros transitórios da API (rate limit, sobrecarga, timeout)."""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status in (429, 500, 502, 503, 504):
+        return True
+    error_type = type(error).__name__.lower()
+    if any(marker in error_type for marker in ("timeout", "connect", "protocol")):
+        return True  # falhas de rede (httpx/requests)
+    text = str(error).lower()
+    return any(marker in text for marker in (
+        "429", "resource_exhausted", "resource exhausted", "rate limit",
+        "quota", "503", "unavailable", "overloaded", "deadline", "timeout",
+    ))
+
+
+def call_with_retries(fn, label: str, gate: RateLimitGate = None, max_retries: int = MAX_RETRIES):
+    """Executa `fn()` com backoff exponencial (com jitter) para erros transitórios."""
+    for attempt in range(max_retries + 1):
+        if gate:
+            gate.wait()
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable_error(e):
+                raise
+            delay = min(RETRY_MAX_DELAY_S, RETRY_BASE_DELAY_S * (2 ** attempt))
+            delay += random.uniform(0, delay / 2)
+            print(f"  [!] {label}: erro transitório ({type(e).__name__}). "
+                  f"Nova tentativa {attempt + 1}/{max_retries} em {delay:.1f}s")
+            if gate:
+                gate.pause(delay)  # a próxima tentativa (e as outras threads) esperam no gate
+            else:
+                time.sleep(delay)
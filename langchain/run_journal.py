@@ -0,0 +1,177 @@
+"""
+Diário (checkpoint) de uma execução de ingestão.
+Cada etapa concluída (chunk do LLM, FAQs deduplicados, linhas com embeddings,
+lotes inseridos) é gravada em disco na hora, então `--resume` continua de onde
+a execução anterior parou sem pagar de novo pelo que já foi feito.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+
+DEFAULT_RUNS_DIR = Path(__file__).parent / ".cache" / "runs"
+DEFAULT_RUN_MAX_AGE_DAYS = 7
+
+
+def make_run_id(content: str, settings: Dict[str, Any]) -> str:
+    """Identifica uma execução pelo conteúdo do arquivo + configurações que mudam o resultado."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(settings, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(content.encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def _write_json_atomic(path: Path, data: Any) -> None:
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class RunJournal:
+    """
+    Arquivos em `<runs_dir>/<run_id>/`:
+    - `meta.json`: entrada, ID_Conta, etapas concluídas e status
+    - `chunks.jsonl`: faq_items de cada chunk já processado pelo LLM
+    - `<etapa>.json`: resultado das etapas seguintes (FAQs finais, linhas com embeddings)
+    - `inserted.jsonl`: content_hash das linhas de cada lote já confirmado no Supabase
+    """
+
+    def __init__(self, run_dir: Path, meta: Dict[str, Any]):
+        self.run_dir = Path(run_dir)
+        self.meta = meta
+        self._lock = threading.Lock()
+        self._chunks: Dict[str, List[Dict]] = {}
+        self._inserted: Set[str] = set()
+        self._load()
+
+    @classmethod
+    def open(
+        cls,
+        run_id: str,
+        resume: bool = False,
+        runs_dir=DEFAULT_RUNS_DIR,
+        **info
+    ) -> "RunJournal":
+        """Abre o diário da execução. Sem `resume`, qualquer progresso anterior é descartado."""
+        run_dir = Path(runs_dir) / run_id
+        if run_dir.exists() and not resume:
+            shutil.rmtree(run_dir, ignore_errors=True)
+        run_dir.mkdir(parents=True, exist_ok=True)
+
+        meta_path = run_dir / "meta.json"
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            meta = {"run_id": run_id, "created_at": time.time(), "steps": [], "status": "running", **info}
+            _write_json_atomic(meta_path, meta)
+        return cls(run_dir, meta)
+
+    @property
+    def resumed(self) -> bool:
+        return bool(self.meta["steps"] or self._chunks)
+
+    def _load(self) -> None:
+        for name, target in (("chunks.jsonl", "chunks"), ("inserted.jsonl", "inserted")):
+            path = self.run_dir / name
+            if not path.exists():
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # última linha incompleta (execução interrompida no meio da escrita)
+                    if target == "chunks":
+                        self._chunks[record["key"]] = record["faq_items"]
+                    else:
+                        self._inserted.update(record["hashes"])
+
+    def _append(self, name: str, record: Dict) -> None:
+        with open(self.run_dir / name, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _save_meta(self) -> None:
+        self.meta["updated_at"] = time.time()
+        _write_json_atomic(self.run_dir / "meta.json", self.meta)
+
+    # Chunks do LLM
+    def chunk_items(self, key: str) -> Optional[List[Dict]]:
+        """faq_items de um chunk já concluído, ou None."""
+        return self._chunks.get(key)
+
+    def record_chunk(self, key: str, faq_items: List[Dict]) -> None:
+        with self._lock:
+            self._chunks[key] = faq_items
+            self._append("chunks.jsonl", {"key": key, "faq_items": faq_items})
+
+    # Etapas
+    def has_step(self, step: str) -> bool:
+        return step in self.meta["steps"]
+
+    def mark_step(self, step: str, data: Any = None) -> None:
+        """Marca a etapa como concluída, gravando antes o seu resultado (se houver)."""
+        with self._lock:
+            if data is not None:
+                _write_json_atomic(self.run_dir / f"{step}.json", data)
+            if step not in self.meta["steps"]:
+                self.meta["steps"].append(step)
+            self._save_meta()
+
+    def load_step(self, step: str) -> Optional[Any]:
+        """Resultado gravado de uma etapa concluída, ou None."""
+        if not self.has_step(step):
+            return None
+        try:
+            return json.loads((self.run_dir / f"{step}.json").read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    # Lotes inseridos
+    def inserted_hashes(self) -> Set[str]:
+        return set(self._inserted)
+
+    def record_inserted(self, rows: Iterable[Dict]) -> None:
+        """Callback de lote confirmado (ver SupabaseBulkWriter.write)."""
+        hashes = [row["content_hash"] for row in rows if row.get("content_hash")]
+        with self._lock:
+            self._inserted.update(hashes)
+            self._append("inserted.jsonl", {"hashes": hashes})
+
+    def complete(self) -> None:
+        """Execução concluída: o diário não é mais necessário e é removido."""
+        self.meta["status"] = "completed"
+        self._save_meta()
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+
+
+def gc_runs(runs_dir=DEFAULT_RUNS_DIR, max_age_days: float = DEFAULT_RUN_MAX_AGE_DAYS) -> int:
+    """Remove diários concluídos ou parados há mais de `max_age_days`. Retorna quantos removeu."""
+    runs_dir = Path(runs_dir)
+    if not runs_dir.exists():
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for run_dir in runs_dir.iterdir():
+        if not run_dir.is_dir():
+            continue
+        try:
+            meta = json.loads((run_dir / "meta.json").read_text(encoding="utf-8"))
+            expired = meta.get("status") == "completed" or meta.get("updated_at", meta["created_at"]) < cutoff
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            expired = run_dir.stat().st_mtime < cutoff
+        if expired:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            removed += 1
+    return removed
@@ -0,0 +1,14 @@
+-- Ingestão incremental (Agente_FAQ.py).
+-- Cada FAQ guarda o hash do seu conteúdo; a reingestão de um ID_Conta só
+-- insere FAQs novos/alterados e remove os que sumiram.
+-- Execute uma vez no SQL Editor do Supabase.
+
+alter table marketing_rag
+  add column if not exists content_hash text;
+
+create index if not exists marketing_rag_id_conta_idx
+  on marketing_rag ("ID_Conta");
+
+-- Também permite inserts idempotentes (upsert on conflict) por conta + hash
+create unique index if not exists marketing_rag_id_conta_content_hash_key
+  on marketing_rag ("ID_Conta", content_hash);
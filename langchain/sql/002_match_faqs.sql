@@ -0,0 +1,37 @@
+-- Busca vetorial filtrada por conta (agent_rag.py).
+-- O filtro por ID_Conta (e, opcionalmente, category/audience) é aplicado dentro
+-- da busca, antes do ORDER BY por distância: sem índice vetorial, só as linhas da
+-- conta são comparadas (busca exata) e o top-k vem completo.
+-- Atenção: com um índice ANN (ivfflat/hnsw) em `embedding`, o Postgres pode
+-- usar o índice e filtrar depois da varredura dele, e o top-k pode vir com
+-- menos linhas que o pedido. Nesse caso, aumente ivfflat.probes / hnsw.ef_search
+-- (ou, no pgvector >= 0.8, ative hnsw.iterative_scan).
+-- Mesma assinatura do match_documents (query_embedding, filter), então o
+-- SupabaseVectorStore do LangChain chama esta função sem adaptação.
+-- Execute uma vez no SQL Editor do Supabase (depois de 001_content_hash.sql).
+
+create index if not exists marketing_rag_id_conta_idx
+  on marketing_rag ("ID_Conta");
+
+create index if not exists marketing_rag_id_conta_category_idx
+  on marketing_rag ("ID_Conta", (metadata->>'category'));
+
+create or replace function match_faqs(
+  query_embedding vector,
+  filter jsonb default '{}'
+)
+returns table (id bigint, content text, metadata jsonb, similarity float)
+language sql
+stable
+as $$
+  select
+    id,
+    content,
+    metadata,
+    1 - (embedding <=> query_embedding) as similarity
+  from marketing_rag
+  where (filter->>'ID_Conta' is null or "ID_Conta" = filter->>'ID_Conta')
+    and (filter->>'category' is null or metadata->>'category' = filter->>'category')
+    and (filter->>'audience' is null or metadata->>'audience' = filter->>'audience')
+  order by embedding <=> query_embedding;
+$$;
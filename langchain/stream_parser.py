@@ -0,0 +1,119 @@
+"""
+Parser incremental da resposta do LLM na ingestão.
+Recebe o texto em pedaços (streaming) e entrega cada FAQ assim que o objeto
+JSON correspondente fecha, validando item a item com o Pydantic. Um item
+inválido ou uma resposta truncada não descartam os FAQs válidos já recebidos.
+"""
+
+import re
+import json
+from typing import Callable, List, Optional
+
+from pydantic import ValidationError
+
+from models import FAQItem
+
+
+FAQ_ITEMS_KEY_RE = re.compile(r'"faq_items"\s*:\s*\[')
+
+
+def parse_json_object(text: str) -> Optional[dict]:
+    """Interpreta a resposta inteira como um objeto JSON (com ou sem cercas ```json).
+
+    Retorna None se o texto não for um objeto JSON válido.
+    """
+    json_str = text
+    if "```json" in text:
+        json_str = text.split("```json")[1].split("```")[0].strip()
+    elif "```" in text:
+        json_str = text.split("```")[1].split("```")[0].strip()
+    try:
+        parsed = json.loads(json_str)
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+class FAQStreamParser:
+    """
+    Localiza o array `"faq_items": [` (com ou sem cercas ```json) e extrai cada
+    objeto de primeiro nível do array acompanhando profundidade de chaves,
+    strings e escapes, sem nunca reprocessar o texto já consumido.
+    """
+
+    def __init__(self, on_item: Optional[Callable[[FAQItem], None]] = None):
+        self.on_item = on_item
+        self.items: List[FAQItem] = []
+        self.invalid_items = 0
+        self.array_found = False
+        self.complete = False  # True quando o `]` final do array chegou
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+
+    def feed(self, text: str) -> None:
+        """Acrescenta um pedaço da resposta e processa os itens que fecharam."""
+        if self.complete or not text:
+            return
+        self._buffer += text
+        if not self.array_found:
+            match = FAQ_ITEMS_KEY_RE.search(self._buffer)
+            if not match:
+                return
+            self.array_found = True
+            self._buffer = self._buffer[match.end():]
+            self._pos = 0
+        self._scan()
+
+    def _scan(self) -> None:
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer):
+            ch = buffer[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._item_start = pos
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._item_start is not None:
+                    self._emit(buffer[self._item_start:pos + 1])
+                    self._item_start = None
+            elif ch == "]" and self._depth == 0:
+                self.complete = True
+                break
+            pos += 1
+
+        # Descarta o que já foi consumido (mantém só o objeto em aberto, se houver)
+        keep_from = self._item_start if self._item_start is not None else pos
+        self._buffer = buffer[keep_from:]
+        if self._item_start is not None:
+            self._item_start = 0
+        self._pos = pos - keep_from
+
+    def _emit(self, raw: str) -> None:
+        try:
+            item = FAQItem.model_validate(json.loads(raw))
+        except (json.JSONDecodeError, ValidationError):
+            self.invalid_items += 1
+            return
+        self.items.append(item)
+        if self.on_item:
+            self.on_item(item)
+
+    @property
+    def truncated(self) -> bool:
+        """A resposta terminou antes do fim do array (ex.: limite de tokens de saída)."""
+        return self.array_found and not self.complete
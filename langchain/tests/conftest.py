@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Os módulos do langchain/ se importam pelo nome (from retry import ...), como nos scripts
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
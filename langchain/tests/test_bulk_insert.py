@@ -0,0 +1,86 @@
+"""
+SupabaseBulkWriter contra o PostgREST em memória (postgrest_stub).
+"""
+
+import json
+
+import pytest
+
+import retry
+from bulk_insert import SupabaseBulkWriter
+from postgrest_stub import InMemoryPostgREST
+
+
+TABLE = "marketing_rag"
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(retry, "RETRY_BASE_DELAY_S", 0.0)
+    monkeypatch.setattr(retry.random, "uniform", lambda a, b: 0.0)
+
+
+def make_rows(count, id_conta="loja", dims=64):
+    return [
+        {
+            "ID_Conta": id_conta,
+            "content_hash": f"hash-{i}",
+            "content": f"Pergunta {i}? Resposta {i}.",
+            "embedding": [i / 1000.0] * dims,
+        }
+        for i in range(count)
+    ]
+
+
+def assert_one_row_per_hash(server, rows):
+    stored = server.rows(TABLE)
+    keys = [(r["ID_Conta"], r["content_hash"]) for r in stored]
+    assert len(keys) == len(set(keys))
+    assert set(keys) == {(r["ID_Conta"], r["content_hash"]) for r in rows}
+
+
+def test_split_and_retry_writes_one_row_per_hash():
+    rows = make_rows(40)
+    writer = SupabaseBulkWriter(None, TABLE, max_batch_rows=20, concurrency=2)
+    # O servidor aceita só ~1/4 do lote montado pelo writer: os lotes são divididos ao meio
+    first_batch = writer.make_batches([writer.prepare_row(r) for r in rows])[0]
+    batch_bytes = len(json.dumps(first_batch).encode("utf-8"))
+    server = InMemoryPostgREST(max_body_bytes=batch_bytes // 3)
+    server.fail_next(2)  # e as duas primeiras requisições aceitas falham (503)
+    writer.client = server
+
+    result = writer.write(rows)
+
+    assert result.splits > 0
+    assert server.rejected_413 > 0
+    assert_one_row_per_hash(server, rows)
+
+
+def test_replayed_batch_does_not_duplicate_rows():
+    rows = make_rows(30)
+    server = InMemoryPostgREST()
+    server.fail_next(1, status_code=504, after_commit=True)  # grava, mas a resposta se perde
+    writer = SupabaseBulkWriter(server, TABLE, max_batch_rows=10, concurrency=1)
+
+    writer.write(rows)
+    writer.write(rows)  # reexecução da ingestão inteira
+
+    assert server.requests == 3 + 1 + 3
+    assert_one_row_per_hash(server, rows)
+
+
+def test_same_hash_in_other_account_is_kept():
+    rows = make_rows(5, "loja_a") + make_rows(5, "loja_b")
+    server = InMemoryPostgREST()
+
+    SupabaseBulkWriter(server, TABLE).write(rows)
+
+    assert len(server.rows(TABLE)) == 10
+
+
+def test_non_retryable_error_is_raised():
+    server = InMemoryPostgREST()
+    server.fail_next(1, status_code=400)
+
+    with pytest.raises(Exception, match="400"):
+        SupabaseBulkWriter(server, TABLE).write(make_rows(3))